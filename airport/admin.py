@@ -7,6 +7,8 @@ from .models import (
     AirplaneType,
     Airplane,
     Flight,
+    FlightSchedule,
+    SeatHold,
     Order,
     Ticket,
 )
@@ -17,5 +19,7 @@ admin.site.register(Route)
 admin.site.register(AirplaneType)
 admin.site.register(Airplane)
 admin.site.register(Flight)
+admin.site.register(FlightSchedule)
+admin.site.register(SeatHold)
 admin.site.register(Order)
 admin.site.register(Ticket)
@@ -0,0 +1,133 @@
+import math
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from airport.models import Flight, OrderQueueEntry
+
+# first key of the advisory locks taken on the queue of a flight
+ADMISSION_LOCK_KEY = 0x41444D
+ORDER_QUEUE_LIMIT = 1000
+# waiting users who stopped retrying for this long leave the queue
+ORDER_QUEUE_POLL_TIMEOUT = timedelta(seconds=30)
+# slots of workers that died mid-order are taken back after this long
+ORDER_SLOT_TIMEOUT = timedelta(seconds=60)
+# rough time one order holds a slot, used for Retry-After
+ORDER_SLOT_SECONDS = 1
+
+
+class OrderQueued(APIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_code = "order_queued"
+
+    def __init__(self, flight_id, position, wait):
+        if position is None:
+            detail = f"Booking queue of flight {flight_id} is full"
+        else:
+            detail = (
+                f"Flight {flight_id} is busy, you are number {position} "
+                f"in the queue"
+            )
+        super().__init__(detail)
+        # kept as is, numbers would be turned into error strings otherwise
+        self.detail = {
+            "detail": self.detail,
+            "flight": flight_id,
+            "queue_position": position,
+            "retry_after": wait,
+        }
+        # exception handler sends it as the Retry-After header
+        self.wait = wait
+
+
+def admit(flight_id, concurrency, user):
+    """Take a booking slot of the flight for the user or raise OrderQueued.
+
+    Slots are handed out under a transaction level advisory lock of the
+    flight, never the flight row lock that running orders hold. The lock
+    is only tried: while another worker hands out slots the user is told
+    to retry, so no request waits on a lock here.
+    """
+    now = timezone.now()
+    queue = OrderQueueEntry.objects.filter(flight_id=flight_id)
+    entry = queue.filter(user=user).first()
+    if entry is None:
+        if queue.count() >= ORDER_QUEUE_LIMIT:
+            raise OrderQueued(
+                flight_id,
+                None,
+                int(ORDER_QUEUE_POLL_TIMEOUT.total_seconds()),
+            )
+        entry, _ = OrderQueueEntry.objects.get_or_create(
+            flight_id=flight_id, user=user, defaults={"seen_at": now}
+        )
+    if entry.admitted_at is not None:
+        return entry
+    queue.filter(pk=entry.pk).update(seen_at=now)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_try_advisory_xact_lock(%s, %s)",
+                [ADMISSION_LOCK_KEY, flight_id % 2 ** 31],
+            )
+            (locked,) = cursor.fetchone()
+
+        free_slots = 0
+        if locked:
+            queue.filter(
+                Q(
+                    admitted_at__isnull=True,
+                    seen_at__lt=now - ORDER_QUEUE_POLL_TIMEOUT,
+                )
+                | Q(admitted_at__lt=now - ORDER_SLOT_TIMEOUT)
+            ).delete()
+            free_slots = (
+                concurrency - queue.filter(admitted_at__isnull=False).count()
+            )
+        position = queue.filter(
+            admitted_at__isnull=True, id__lte=entry.id
+        ).count()
+        if 0 < position <= free_slots:
+            queue.filter(pk=entry.pk).update(admitted_at=now)
+            return entry
+
+    raise OrderQueued(
+        flight_id,
+        max(position, 1),
+        math.ceil(max(position, 1) / concurrency) * ORDER_SLOT_SECONDS,
+    )
+
+
+def release(entries):
+    OrderQueueEntry.objects.filter(
+        id__in=[entry.id for entry in entries]
+    ).delete()
+
+
+@contextmanager
+def order_admission(user, flight_ids):
+    """Hold a booking slot of every queued flight of the order.
+
+    Flights without booking_concurrency are not queued.
+    """
+    queued_flights = (
+        Flight.objects.filter(
+            pk__in=flight_ids, booking_concurrency__isnull=False
+        )
+        .order_by("pk")
+        .values_list("pk", "booking_concurrency")
+    )
+    entries = []
+    try:
+        for flight_id, concurrency in queued_flights:
+            entries.append(admit(flight_id, concurrency, user))
+        yield
+    finally:
+        if entries:
+            release(entries)
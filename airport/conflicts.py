@@ -0,0 +1,71 @@
+import heapq
+from itertools import groupby
+
+from airport.models import Flight
+
+
+def sweep_overlaps(intervals):
+    """Yield overlapping pairs of (resource, start, end, flight_id)
+    intervals sorted by resource and start.
+
+    A sweep line over the starts of every resource keeps a heap of the
+    intervals still open, so each interval is only compared with the ones
+    it actually overlaps.
+    """
+    for resource, resource_intervals in groupby(
+        intervals, key=lambda interval: interval[0]
+    ):
+        active = []
+        for _, start, end, flight_id in resource_intervals:
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for active_end, active_start, active_flight_id in active:
+                yield (
+                    resource,
+                    active_flight_id,
+                    flight_id,
+                    max(start, active_start),
+                    min(end, active_end),
+                )
+            heapq.heappush(active, (end, start, flight_id))
+
+
+def find_conflicts(date_from, date_to):
+    """Airplanes and crew members assigned to overlapping flights within
+    [date_from, date_to), found in one pass over each sorted query"""
+    flights = Flight.overlapping(date_from, date_to).order_by()
+    airplane_intervals = flights.order_by(
+        "airplane_id", "departure_time"
+    ).values_list("airplane_id", "departure_time", "arrival_time", "id")
+    crew_intervals = (
+        Flight.crew.through.objects.filter(flight__in=flights)
+        .order_by("crew_id", "flight__departure_time")
+        .values_list(
+            "crew_id",
+            "flight__departure_time",
+            "flight__arrival_time",
+            "flight_id",
+        )
+    )
+
+    return {
+        resource_name: [
+            {
+                resource_name: resource,
+                "flights": [first_flight, second_flight],
+                "overlap_start": overlap_start,
+                "overlap_end": overlap_end,
+            }
+            for (
+                resource,
+                first_flight,
+                second_flight,
+                overlap_start,
+                overlap_end,
+            ) in sweep_overlaps(intervals.iterator())
+        ]
+        for resource_name, intervals in (
+            ("airplane", airplane_intervals),
+            ("crew", crew_intervals),
+        )
+    }
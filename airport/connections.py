@@ -0,0 +1,160 @@
+import bisect
+import heapq
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, Max
+
+from airport.models import Flight
+
+GRAPH_CACHE_SIZE = 8
+# connecting legs of itineraries started late in the day depart next day
+GRAPH_WINDOW = timedelta(days=2)
+
+_graph_cache = OrderedDict()
+_graph_cache_lock = threading.Lock()
+
+
+class FlightGraph:
+    """Flights as a time-dependent graph: legs are grouped by departure
+    airport and sorted by departure time, so the flights leaving an airport
+    within a connection window are found with a binary search.
+
+    A leg is a (flight_id, source_id, destination_id, departure, arrival)
+    tuple.
+    """
+
+    def __init__(self, legs):
+        self.departures = defaultdict(list)
+        self.sources_into = defaultdict(set)
+        for leg in legs:
+            self.departures[leg[1]].append(leg)
+            self.sources_into[leg[2]].add(leg[1])
+
+        self.departure_times = {}
+        for airport_id, airport_legs in self.departures.items():
+            airport_legs.sort(key=lambda leg: (leg[3], leg[0]))
+            self.departure_times[airport_id] = [leg[3] for leg in airport_legs]
+
+    @classmethod
+    def for_day(cls, day):
+        """Graph of flights departing from day to the end of GRAPH_WINDOW,
+        cached per worker until flights of the window change"""
+        window = Flight.objects.filter(
+            departure_time__gte=day, departure_time__lt=day + GRAPH_WINDOW
+        )
+        fingerprint = tuple(
+            window.order_by()
+            .aggregate(count=Count("id"), updated=Max("updated_at"))
+            .values()
+        )
+
+        with _graph_cache_lock:
+            cached = _graph_cache.get(day)
+            if cached and cached[0] == fingerprint:
+                _graph_cache.move_to_end(day)
+                return cached[1]
+
+        graph = cls(
+            window.order_by()
+            .values_list(
+                "id",
+                "route__source_id",
+                "route__destination_id",
+                "departure_time",
+                "arrival_time",
+            )
+            .iterator(chunk_size=10000)
+        )
+
+        with _graph_cache_lock:
+            _graph_cache[day] = (fingerprint, graph)
+            _graph_cache.move_to_end(day)
+            while len(_graph_cache) > GRAPH_CACHE_SIZE:
+                _graph_cache.popitem(last=False)
+        return graph
+
+    def legs_from(self, airport_id, not_before, before):
+        """Legs departing from the airport in [not_before, before)"""
+        times = self.departure_times.get(airport_id)
+        if not times:
+            return []
+        start = bisect.bisect_left(times, not_before)
+        end = bisect.bisect_left(times, before, lo=start)
+        return self.departures[airport_id][start:end]
+
+    def itineraries(
+        self,
+        sources,
+        destinations,
+        earliest_departure,
+        latest_departure,
+        max_stops=2,
+        min_connection=timedelta(minutes=60),
+        max_connection=timedelta(hours=6),
+        limit=20,
+    ):
+        """Itineraries with up to max_stops connections, earliest arrival
+        first.
+
+        Partial itineraries are expanded in order of arrival time, so the
+        search stops as soon as limit of them reached a destination. Only
+        legs landing at airports which can still reach a destination with
+        the stops left are followed, and every airport is expanded at most
+        limit times per number of legs flown.
+        """
+        destinations = set(destinations)
+        reachable = [destinations]
+        for _ in range(max_stops):
+            reachable.append(
+                reachable[-1].union(
+                    *(self.sources_into[dest] for dest in reachable[-1])
+                )
+            )
+
+        queue = []
+        for source in set(sources):
+            for leg in self.legs_from(
+                source, earliest_departure, latest_departure
+            ):
+                if leg[2] in reachable[max_stops]:
+                    queue.append((leg[4], 1, leg[3], leg[0], (leg,)))
+        heapq.heapify(queue)
+
+        found = []
+        expanded = Counter()
+        while queue and len(found) < limit:
+            arrival, legs_count, _, _, path = heapq.heappop(queue)
+            airport_id = path[-1][2]
+            if airport_id in destinations:
+                found.append(path)
+                continue
+
+            stops_left = max_stops - (legs_count - 1)
+            expanded[airport_id, legs_count] += 1
+            if not stops_left or expanded[airport_id, legs_count] > limit:
+                continue
+
+            visited = {leg[1] for leg in path}
+            for leg in self.legs_from(
+                airport_id,
+                arrival + min_connection,
+                arrival + max_connection + timedelta(microseconds=1),
+            ):
+                if (
+                    leg[2] not in visited
+                    and leg[2] in reachable[stops_left - 1]
+                ):
+                    heapq.heappush(
+                        queue,
+                        (
+                            leg[4],
+                            legs_count + 1,
+                            path[0][3],
+                            leg[0],
+                            path + (leg,),
+                        ),
+                    )
+
+        return found
@@ -0,0 +1,504 @@
+import math
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from airport.db import copy_connection
+from airport.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    Crew,
+    Flight,
+    Order,
+    Route,
+    Ticket,
+)
+from airport.schedules import iter_chunks
+
+# flights written with their crew, orders and tickets in one transaction
+DATASET_CHUNK_SIZE = 1000
+DATASET_PASSWORD = "passenger"
+
+# name, rows, seats in row, how common the type is
+AIRPLANE_TYPES = (
+    ("Airbus A320", 30, 6, 30),
+    ("Boeing 737-800", 32, 6, 30),
+    ("Embraer E190", 25, 4, 12),
+    ("ATR 72", 18, 4, 8),
+    ("Bombardier CRJ900", 22, 4, 6),
+    ("Airbus A330-300", 45, 8, 6),
+    ("Boeing 787-9", 42, 9, 5),
+    ("Boeing 777-300ER", 50, 10, 3),
+)
+AIRPORT_TYPES = (("civilian", 90), ("cargo", 7), ("military", 3))
+COUNTRIES = (
+    "Ukraine",
+    "Poland",
+    "Germany",
+    "France",
+    "Spain",
+    "Italy",
+    "United Kingdom",
+    "United States",
+    "Canada",
+    "Turkey",
+    "Japan",
+    "Brazil",
+)
+FIRST_NAMES = (
+    "Olena", "Andrii", "Maria", "Ivan", "Anna", "Petro", "Sofia", "Taras",
+    "Emma", "Lucas", "Mia", "Noah", "Chloe", "Leon", "Laura", "Marco",
+)
+LAST_NAMES = (
+    "Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko",
+    "Nowak", "Muller", "Martin", "Garcia", "Rossi", "Smith", "Brown",
+    "Yilmaz", "Tanaka", "Silva", "Dubois",
+)
+# share of orders holding that many tickets
+ORDER_SIZES = (1, 2, 3, 4, 5, 6)
+ORDER_SIZE_WEIGHTS = (50, 28, 10, 8, 3, 1)
+# spread of the load factor around its mean, higher is narrower
+LOAD_FACTOR_CONCENTRATION = 8
+CRUISE_SPEED_KMH = 800
+
+
+def airport_code(number, length):
+    """Distinct uppercase letter code of the number"""
+    code = ""
+    for _ in range(length):
+        number, letter = divmod(number, 26)
+        code = chr(ord("A") + letter) + code
+    return code
+
+
+def great_circle_km(source, destination):
+    (lat1, lon1), (lat2, lon2) = (
+        map(math.radians, source),
+        map(math.radians, destination),
+    )
+    haversine = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return round(12742 * math.asin(math.sqrt(haversine)))
+
+
+def reserve_ids(cursor, model, count):
+    """First of count consecutive ids taken from the model id sequence.
+
+    Rows are COPYed with these explicit ids so other rows can point at
+    them. Meant for a database nobody else writes to meanwhile.
+    """
+    if not count:
+        return None
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id'))",
+        [model._meta.db_table],
+    )
+    first = cursor.fetchone()[0]
+    if count > 1:
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+            [model._meta.db_table, first + count - 1],
+        )
+    return first
+
+
+def copy_rows(cursor, table, columns, rows):
+    with cursor.copy(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    ) as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+class DatasetGenerator:
+    """Seeded synthetic airport data of a production-like shape.
+
+    Airports get random coordinates and a long-tailed popularity, so a
+    few hubs have most routes and flights. Every airplane flies legs one
+    after another with a turnaround in between, which keeps the airplane
+    no-overlap constraint satisfied. Crew members are split into teams of
+    the airplanes and only fly legs of their own airplane, so they are
+    never assigned to overlapping flights either. Flights are filled to a
+    beta distributed load factor around the mean the ticket count asks
+    for, tickets take distinct seats and are grouped into orders of
+    mostly one or two passengers from users among whom a few fly a lot.
+
+    Reference data is saved with bulk_create, users, flights, crew
+    assignments, orders and tickets are COPYed with reserved ids.
+    Given the same seed and start the generated data is the same.
+    """
+
+    def __init__(
+        self,
+        airports,
+        routes,
+        airplanes,
+        crew,
+        users,
+        flights,
+        tickets,
+        seed=0,
+        start=None,
+        log=None,
+    ):
+        if airports < 2 or airports > 26 ** 3:
+            raise ValueError(f"Airports must be between 2 and {26 ** 3}")
+        if routes > airports * (airports - 1):
+            raise ValueError("More routes than airport pairs")
+        if flights and min(routes, airplanes) < 1:
+            raise ValueError("Flights need routes and airplanes")
+        if tickets and users < 1:
+            raise ValueError("Tickets need users")
+        self.counts = {
+            "airports": airports,
+            "routes": routes,
+            "airplanes": airplanes,
+            "crew": crew,
+            "users": users,
+            "flights": flights,
+            "tickets": tickets,
+        }
+        self.rng = random.Random(seed)
+        self.start = start or datetime.combine(
+            datetime.now().date(), datetime.min.time()
+        )
+        self.log = log or (lambda message: None)
+
+    def run(self):
+        # airplane models are picked first, so a ticket count that does
+        # not fit in the flights is rejected before anything is written
+        airplane_models = self.pick_airplane_models()
+        load = self.load_factor(airplane_models)
+        airports = self.generate_airports()
+        routes = self.generate_routes(airports)
+        airplanes = self.generate_airplanes(airplane_models)
+        crew_ids = self.generate_crew()
+        self.log(
+            f"{len(airports)} airports, {len(routes)} routes, "
+            f"{len(airplanes)} airplanes, {len(crew_ids)} crew"
+        )
+
+        with copy_connection() as copy_db, copy_db.cursor() as cursor:
+            user_ids = self.generate_users(cursor)
+            self.log(f"{len(user_ids)} users")
+            summary = self.generate_flights(
+                cursor, routes, airplanes, crew_ids, user_ids, load
+            )
+
+        return {
+            "airports": len(airports),
+            "routes": len(routes),
+            "airplanes": len(airplanes),
+            "crew": len(crew_ids),
+            "users": len(user_ids),
+            **summary,
+        }
+
+    def generate_airports(self):
+        rng = self.rng
+        types, type_weights = zip(*AIRPORT_TYPES)
+        airports = Airport.objects.bulk_create(
+            Airport(
+                name=f"{airport_code(number, 3).title()} International",
+                city=f"{airport_code(number, 3).title()}ville",
+                country=rng.choice(COUNTRIES),
+                airport_type=rng.choices(types, type_weights)[0],
+                iata_code=airport_code(number, 3),
+                icao_code=airport_code(number, 4),
+            )
+            for number in range(self.counts["airports"])
+        )
+        for airport in airports:
+            airport.location = (rng.uniform(-45, 65), rng.uniform(-180, 180))
+            airport.popularity = rng.paretovariate(1.2)
+        return airports
+
+    def generate_routes(self, airports):
+        rng = self.rng
+        count = self.counts["routes"]
+        cum_weights = list(
+            accumulate(airport.popularity for airport in airports)
+        )
+        pairs = {}
+        for _ in range(count * 20):
+            if len(pairs) == count:
+                break
+            source, destination = rng.choices(
+                airports, cum_weights=cum_weights, k=2
+            )
+            if source is not destination:
+                pairs.setdefault(
+                    (source.id, destination.id), (source, destination)
+                )
+        # pairs of quiet airports are rarely drawn, fill up with any pairs
+        while len(pairs) < count:
+            source, destination = rng.sample(airports, 2)
+            pairs.setdefault((source.id, destination.id), (source, destination))
+
+        routes = Route.objects.bulk_create(
+            Route(
+                source=source,
+                destination=destination,
+                distance=max(
+                    great_circle_km(source.location, destination.location),
+                    100,
+                ),
+            )
+            for source, destination in pairs.values()
+        )
+        for route in routes:
+            route.popularity = (
+                route.source.popularity * route.destination.popularity
+            )
+        return routes
+
+    def pick_airplane_models(self):
+        """Index in AIRPLANE_TYPES of every airplane"""
+        return self.rng.choices(
+            range(len(AIRPLANE_TYPES)),
+            [weight for *_, weight in AIRPLANE_TYPES],
+            k=self.counts["airplanes"],
+        )
+
+    def flights_per_airplane(self):
+        legs, extra = divmod(self.counts["flights"], self.counts["airplanes"])
+        return [
+            legs + (number < extra)
+            for number in range(self.counts["airplanes"])
+        ]
+
+    def load_factor(self, airplane_models):
+        """Mean share of seats sold on a flight"""
+        if not self.counts["flights"]:
+            return 0
+        capacity = sum(
+            AIRPLANE_TYPES[model][1] * AIRPLANE_TYPES[model][2] * legs
+            for model, legs in zip(
+                airplane_models, self.flights_per_airplane()
+            )
+        )
+        if self.counts["tickets"] > capacity:
+            raise ValueError(
+                f"{self.counts['tickets']} tickets do not fit in "
+                f"{capacity} seats of the flights"
+            )
+        return self.counts["tickets"] / capacity
+
+    def generate_airplanes(self, airplane_models):
+        airplane_types = AirplaneType.objects.bulk_create(
+            AirplaneType(name=name) for name, *_ in AIRPLANE_TYPES
+        )
+        return Airplane.objects.bulk_create(
+            Airplane(
+                name=f"{AIRPLANE_TYPES[model][0]} #{number}",
+                rows=AIRPLANE_TYPES[model][1],
+                seats_in_row=AIRPLANE_TYPES[model][2],
+                airplane_type=airplane_types[model],
+            )
+            for number, model in enumerate(airplane_models, start=1)
+        )
+
+    def generate_crew(self):
+        rng = self.rng
+        return [
+            crew.id
+            for crew in Crew.objects.bulk_create(
+                Crew(
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                )
+                for _ in range(self.counts["crew"])
+            )
+        ]
+
+    def generate_users(self, cursor):
+        rng = self.rng
+        count = self.counts["users"]
+        if not count:
+            return []
+        first_id = reserve_ids(cursor, get_user_model(), count)
+        # hashing is slow on purpose, every user shares the same password
+        password = make_password(DATASET_PASSWORD)
+        copy_rows(
+            cursor,
+            get_user_model()._meta.db_table,
+            (
+                "id",
+                "password",
+                "is_superuser",
+                "is_staff",
+                "is_active",
+                "first_name",
+                "last_name",
+                "email",
+                "date_joined",
+            ),
+            (
+                (
+                    user_id,
+                    password,
+                    False,
+                    False,
+                    True,
+                    rng.choice(FIRST_NAMES),
+                    rng.choice(LAST_NAMES),
+                    f"passenger{user_id}@example.com",
+                    self.start - timedelta(days=rng.randint(0, 1000)),
+                )
+                for user_id in range(first_id, first_id + count)
+            ),
+        )
+        return list(range(first_id, first_id + count))
+
+    def iter_flights(self, routes, airplanes):
+        """(route, airplane, departure, arrival) of every flight, flown
+        by the airplanes in turns"""
+        rng = self.rng
+        cum_weights = list(accumulate(route.popularity for route in routes))
+        for airplane, legs in zip(airplanes, self.flights_per_airplane()):
+            departure = self.start + timedelta(minutes=rng.randrange(0, 1440))
+            for _ in range(legs):
+                route = rng.choices(routes, cum_weights=cum_weights)[0]
+                minutes = route.distance * 60 // CRUISE_SPEED_KMH + 30
+                arrival = departure + timedelta(minutes=minutes - minutes % 5)
+                yield route, airplane, departure, arrival
+                departure = arrival + timedelta(
+                    minutes=rng.randrange(45, 240, 5)
+                )
+
+    def generate_flights(
+        self, cursor, routes, airplanes, crew_ids, user_ids, load
+    ):
+        rng = self.rng
+        summary = {"flights": 0, "orders": 0, "tickets": 0}
+        flights = self.counts["flights"]
+        if not flights:
+            return summary
+
+        user_weights = list(
+            accumulate(rng.paretovariate(1.5) for _ in user_ids)
+        )
+        shuffled_crew = rng.sample(crew_ids, len(crew_ids))
+        teams = {
+            airplane.id: shuffled_crew[number::len(airplanes)]
+            for number, airplane in enumerate(airplanes)
+        }
+        flight_id = reserve_ids(cursor, Flight, flights)
+        now = datetime.now()
+
+        for chunk in iter_chunks(
+            self.iter_flights(routes, airplanes), DATASET_CHUNK_SIZE
+        ):
+            flight_rows, crew_rows, orders, tickets = [], [], [], []
+            for route, airplane, departure, arrival in chunk:
+                seats = airplane.capacity
+                if 0 < load < 1:
+                    sold = round(
+                        seats
+                        * rng.betavariate(
+                            load * LOAD_FACTOR_CONCENTRATION,
+                            (1 - load) * LOAD_FACTOR_CONCENTRATION,
+                        )
+                    )
+                else:
+                    sold = round(seats * load)
+                flight_rows.append(
+                    (
+                        flight_id,
+                        route.id,
+                        airplane.id,
+                        departure,
+                        arrival,
+                        sold,
+                        0,
+                        now,
+                    )
+                )
+                team = teams[airplane.id]
+                crew_rows.extend(
+                    (flight_id, crew_id)
+                    for crew_id in rng.sample(
+                        team, min(len(team), rng.randint(2, 5))
+                    )
+                )
+
+                # distinct seats, so ticket uniqueness holds
+                taken = rng.sample(range(seats), sold)
+                while taken:
+                    size = rng.choices(ORDER_SIZES, ORDER_SIZE_WEIGHTS)[0]
+                    booked, taken = taken[:size], taken[size:]
+                    orders.append(
+                        (
+                            rng.choices(user_ids, cum_weights=user_weights)[0],
+                            departure
+                            - timedelta(minutes=rng.randint(60, 90 * 1440)),
+                        )
+                    )
+                    tickets.extend(
+                        (
+                            index // airplane.seats_in_row + 1,
+                            index % airplane.seats_in_row + 1,
+                            flight_id,
+                            len(orders) - 1,
+                        )
+                        for index in booked
+                    )
+                flight_id += 1
+
+            with cursor.connection.transaction():
+                first_order_id = reserve_ids(cursor, Order, len(orders))
+                copy_rows(
+                    cursor,
+                    Flight._meta.db_table,
+                    (
+                        "id",
+                        "route_id",
+                        "airplane_id",
+                        "departure_time",
+                        "arrival_time",
+                        "seats_sold",
+                        "seats_held",
+                        "updated_at",
+                    ),
+                    flight_rows,
+                )
+                copy_rows(
+                    cursor,
+                    Flight.crew.through._meta.db_table,
+                    ("flight_id", "crew_id"),
+                    crew_rows,
+                )
+                copy_rows(
+                    cursor,
+                    Order._meta.db_table,
+                    ("id", "user_id", "created_at"),
+                    (
+                        (first_order_id + number, user_id, created_at)
+                        for number, (user_id, created_at) in enumerate(orders)
+                    ),
+                )
+                copy_rows(
+                    cursor,
+                    Ticket._meta.db_table,
+                    ("row", "seat", "flight_id", "order_id"),
+                    (
+                        (row, seat, ticket_flight_id, first_order_id + order)
+                        for row, seat, ticket_flight_id, order in tickets
+                    ),
+                )
+
+            summary["flights"] += len(flight_rows)
+            summary["orders"] += len(orders)
+            summary["tickets"] += len(tickets)
+            self.log(
+                f"{summary['flights']} flights, {summary['orders']} orders, "
+                f"{summary['tickets']} tickets"
+            )
+
+        return summary
@@ -0,0 +1,36 @@
+import psycopg
+from django.conf import settings
+from django.db import connection
+
+COPY_CONNECTION_PARAMS = ("dbname", "user", "password", "host", "port")
+
+
+def copy_connection():
+    """New psycopg 3 connection to the default database.
+
+    Django talks to Postgres through psycopg2, which can only COPY into a
+    file object; psycopg 3 hands COPY data out as an iterator of chunks
+    that a response can stream. The connection sees committed data only.
+    """
+    params = connection.get_connection_params()
+    params["dbname"] = params.pop("database")
+    return psycopg.connect(
+        autocommit=True,
+        options=f"-c timezone={settings.TIME_ZONE}",
+        **{
+            name: params[name]
+            for name in COPY_CONNECTION_PARAMS
+            if params.get(name)
+        },
+    )
+
+
+def copy_to_stdout(queryset, copy_options="FORMAT csv"):
+    """Yield raw chunks of COPY (queryset) TO STDOUT"""
+    sql, sql_params = queryset.query.sql_with_params()
+    with copy_connection() as copy_db, copy_db.cursor() as cursor:
+        with cursor.copy(
+            f"COPY ({sql}) TO STDOUT WITH ({copy_options})", sql_params
+        ) as copy:
+            for chunk in copy:
+                yield bytes(chunk)
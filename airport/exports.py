@@ -0,0 +1,170 @@
+import csv
+import json
+import zlib
+from itertools import chain
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from airport.db import copy_to_stdout
+from airport.models import Flight, Ticket
+from airport.schedules import iter_chunks
+
+EXPORT_CHUNK_SIZE = 2000
+# lines are sent to the client in pieces of about this many bytes
+STREAM_BUFFER_SIZE = 64 * 1024
+
+MANIFEST_FIELDS = (
+    "row",
+    "seat",
+    "order",
+    "email",
+    "first_name",
+    "last_name",
+)
+
+TIMETABLE_FIELDS = {
+    "id": "id",
+    "departure_time": "departure_time",
+    "arrival_time": "arrival_time",
+    "source_iata": "route__source__iata_code",
+    "source_icao": "route__source__icao_code",
+    "destination_iata": "route__destination__iata_code",
+    "destination_icao": "route__destination__icao_code",
+    "distance": "route__distance",
+    "airplane": "airplane__name",
+    "airplane_type": "airplane__airplane_type__name",
+    "updated_at": "updated_at",
+    # annotations are selected after fields in SQL, which COPY output
+    # follows, so they must stay last here
+    "capacity": "capacity",
+}
+
+
+class Echo:
+    """File-like object handing written lines back to csv.writer callers"""
+
+    def write(self, value):
+        return value
+
+
+def manifest_rows(flight):
+    """Passengers of the flight as tuples of MANIFEST_FIELDS, read through
+    a server-side cursor in EXPORT_CHUNK_SIZE pieces"""
+    return (
+        Ticket.objects.filter(flight=flight)
+        .order_by("row", "seat")
+        .values_list(
+            "row",
+            "seat",
+            "order_id",
+            "order__user__email",
+            "order__user__first_name",
+            "order__user__last_name",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def timetable_rows(date_from, date_to, changed_since=None):
+    """Flights departing in [date_from, date_to) with their route, airports
+    and airplane, as a queryset of tuples of TIMETABLE_FIELDS"""
+    queryset = Flight.objects.filter(
+        departure_time__gte=date_from, departure_time__lt=date_to
+    )
+    if changed_since is not None:
+        queryset = queryset.filter(updated_at__gt=changed_since)
+    return (
+        queryset.annotate(
+            capacity=F("airplane__rows") * F("airplane__seats_in_row")
+        )
+        .order_by("departure_time", "id")
+        .values_list(*TIMETABLE_FIELDS.values())
+    )
+
+
+def iter_csv(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def iter_columns(fields, rows):
+    """Compact columnar JSON Lines: the field names, then one line per
+    EXPORT_CHUNK_SIZE rows holding a list of values for every field"""
+    yield json.dumps({"columns": list(fields)}) + "\n"
+    for block in iter_chunks(rows, EXPORT_CHUNK_SIZE):
+        yield json.dumps(
+            [list(column) for column in zip(*block)], cls=DjangoJSONEncoder
+        ) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv"),
+    "jsonl": (iter_jsonl, "application/x-ndjson"),
+}
+
+TIMETABLE_FORMATS = ("csv", "jsonl", "columns")
+
+
+def timetable_stream(output, queryset):
+    """Gzip compressed timetable export.
+
+    CSV rows come straight from Postgres through COPY TO STDOUT, the
+    JSON formats are built from a server-side cursor.
+    """
+    fields = list(TIMETABLE_FIELDS)
+    if output == "csv":
+        chunks = chain(
+            [next(iter_csv(fields, [])).encode()],
+            copy_to_stdout(queryset, "FORMAT csv"),
+        )
+    else:
+        iter_lines = iter_jsonl if output == "jsonl" else iter_columns
+        chunks = buffered(
+            iter_lines(fields, queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        )
+    return gzipped(chunks)
+
+
+def buffered(lines, size=STREAM_BUFFER_SIZE):
+    """Join lines into chunks of about size bytes.
+
+    The first line is sent on its own, so the client gets the first
+    byte before the database has returned any rows.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    yield first.encode()
+
+    chunk, length = [], 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(chunk).encode()
+            chunk, length = [], 0
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+def gzipped(chunks):
+    """Compress the stream into a single gzip member. The first chunk is
+    flushed right away so the client does not wait for a full block."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    chunks = iter(chunks)
+    first = next(chunks, b"")
+    yield compressor.compress(first) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import zlib
+from contextlib import contextmanager
+
+from django.db import connection
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from airport.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# first key of the advisory locks taken on idempotency keys
+IDEMPOTENCY_LOCK_KEY = 0x49444D
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = (
+        "Idempotency key was already used for a different request"
+    )
+    default_code = "idempotency_key_reused"
+
+
+def request_hash(data):
+    """Fingerprint of the request body, independent of key order"""
+    body = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+@contextmanager
+def key_lock(user_id, key):
+    """Session level advisory lock of the key, held for the whole request.
+
+    A duplicate sent while the first request still runs waits here and
+    then replays its response instead of running the request again.
+    """
+    lock = (
+        IDEMPOTENCY_LOCK_KEY,
+        zlib.crc32(f"{user_id}:{key}".encode()) - 2 ** 31,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s, %s)", lock)
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s, %s)", lock)
+
+
+def idempotent(request, handler):
+    """Run handler() once per Idempotency-Key of the user.
+
+    Successful responses are stored and replayed for requests repeating
+    the key; failed ones are not, so the client may retry them.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return handler()
+    max_length = IdempotencyKey._meta.get_field("key").max_length
+    if not 1 <= len(key) <= max_length:
+        raise ValidationError(
+            {IDEMPOTENCY_HEADER: f"Expected 1 to {max_length} characters"}
+        )
+
+    fingerprint = request_hash(request.data)
+    with key_lock(request.user.id, key):
+        stored = (
+            IdempotencyKey.objects.active()
+            .filter(user=request.user, key=key)
+            .first()
+        )
+        if stored is not None:
+            if stored.request_hash != fingerprint:
+                raise IdempotencyKeyReused()
+            return Response(
+                stored.response,
+                status=stored.status_code,
+                headers={REPLAYED_HEADER: "true"},
+            )
+
+        response = handler()
+        if status.is_success(response.status_code):
+            IdempotencyKey.objects.update_or_create(
+                user=request.user,
+                key=key,
+                defaults={
+                    "request_hash": fingerprint,
+                    "status_code": response.status_code,
+                    "response": response.data,
+                    "created_at": timezone.now(),
+                },
+            )
+        return response
@@ -0,0 +1,403 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from airport.db import copy_connection
+from airport.models import Airplane, Airport, Flight, Route
+from airport.schedules import iter_chunks
+
+IMPORT_CHUNK_SIZE = 10000
+IMPORT_FORMATS = ("csv", "jsonl")
+# only the first errors are listed, all of them are counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_rows(lines, input_format):
+    """Yield (line number, dict or None) for every record of the stream.
+
+    None stands for a line that could not be parsed at all.
+    """
+    if input_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+class CodeLookup:
+    """Ids of rows by their id and codes, read once into memory. Codes
+    shared by several rows are rejected, such rows must be given by id"""
+
+    def __init__(self, name, rows):
+        """rows are (id, *codes) tuples"""
+        self.name = name
+        self.ids = {}
+        ambiguous = set()
+        for row_id, *codes in rows:
+            self.ids[str(row_id)] = row_id
+            for code in codes:
+                if self.ids.setdefault(code.upper(), row_id) != row_id:
+                    ambiguous.add(code.upper())
+        for code in ambiguous:
+            self.ids[code] = None
+
+    def __call__(self, value):
+        code = str(value or "").strip().upper()
+        if not code:
+            raise ValidationError("This field cannot be blank.")
+        if code not in self.ids:
+            raise ValidationError(f"Unknown {self.name} {code}")
+        if self.ids[code] is None:
+            raise ValidationError(
+                f"{code} belongs to several {self.name}s, use the id"
+            )
+        return self.ids[code]
+
+
+class ReferenceImport(ABC):
+    """Chunked upsert of rows through a staging table.
+
+    Every chunk is COPYed into a temporary table and merged with one
+    UPDATE of changed rows matching key_columns and one INSERT of rows
+    with new keys, under a lock keeping concurrent imports from inserting
+    the same keys twice. Columns not imported get the SQL expressions of
+    insert_values on INSERT and of update_values on both statements.
+    """
+
+    model = None
+    key_columns = ()
+    value_columns = ()
+    staging_types = {}
+    insert_values = {}
+    update_values = {}
+
+    def __init__(self):
+        self.table = self.model._meta.db_table
+        self.staging = f"import_{self.table}"
+        self.columns = self.key_columns + self.value_columns
+
+    @abstractmethod
+    def clean(self, row):
+        """Return the tuple of self.columns values of the row or raise
+        ValidationError with a message dict"""
+
+    def reject(self, cursor):
+        """Delete rows that can not be merged from the staging table and
+        return {key: error messages} of them"""
+        return {}
+
+    def run(self, rows, chunk_size=IMPORT_CHUNK_SIZE):
+        summary = {
+            "rows": 0,
+            "created": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "failed": 0,
+            "errors": [],
+        }
+
+        def add_error(line_number, errors):
+            summary["failed"] += 1
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append(
+                    {"line": line_number, "errors": errors}
+                )
+
+        def valid_rows():
+            for line_number, row in rows:
+                summary["rows"] += 1
+                try:
+                    if row is None:
+                        raise ValidationError("Line could not be parsed")
+                    yield line_number, self.clean(row)
+                except ValidationError as error:
+                    add_error(
+                        line_number,
+                        getattr(error, "message_dict", error.messages),
+                    )
+
+        with copy_connection() as copy_db:
+            copy_db.execute(
+                f"CREATE TEMPORARY TABLE {self.staging} ("
+                + ", ".join(
+                    f"{column} {self.staging_types[column]}"
+                    for column in self.columns
+                )
+                + ")"
+            )
+            for chunk in iter_chunks(valid_rows(), chunk_size):
+                # the last row of a key within the chunk wins
+                chunk = {
+                    values[:len(self.key_columns)]: (line_number, values)
+                    for line_number, values in chunk
+                }
+                created, updated, rejected = self.merge(
+                    copy_db, [values for _, values in chunk.values()]
+                )
+                for key, errors in rejected.items():
+                    add_error(chunk[key][0], errors)
+                summary["created"] += created
+                summary["updated"] += updated
+                # several stored rows may share a key, never go below 0
+                summary["unchanged"] += max(
+                    len(chunk) - len(rejected) - created - updated, 0
+                )
+
+        return summary
+
+    def merge(self, copy_db, rows):
+        columns = ", ".join(self.columns)
+        matches = " AND ".join(
+            f"target.{column} = staging.{column}"
+            for column in self.key_columns
+        )
+        changes = ", ".join(
+            [f"{column} = staging.{column}" for column in self.value_columns]
+            + [
+                f"{column} = {value}"
+                for column, value in self.update_values.items()
+            ]
+        )
+        inserted_values = {**self.insert_values, **self.update_values}
+        insert_columns = ", ".join([*self.columns, *inserted_values])
+        insert_values = ", ".join([*self.columns, *inserted_values.values()])
+        target_values = ", ".join(
+            f"target.{column}" for column in self.value_columns
+        )
+        staging_values = ", ".join(
+            f"staging.{column}" for column in self.value_columns
+        )
+
+        with copy_db.transaction(), copy_db.cursor() as cursor:
+            cursor.execute(
+                f"LOCK TABLE {self.table} IN SHARE ROW EXCLUSIVE MODE"
+            )
+            cursor.execute(f"TRUNCATE {self.staging}")
+            with cursor.copy(
+                f"COPY {self.staging} ({columns}) FROM STDIN"
+            ) as copy:
+                for row in rows:
+                    copy.write_row(row)
+            rejected = self.reject(cursor)
+
+            cursor.execute(
+                f"UPDATE {self.table} AS target SET {changes} "
+                f"FROM {self.staging} AS staging "
+                f"WHERE {matches} AND ROW({target_values}) "
+                f"IS DISTINCT FROM ROW({staging_values})"
+            )
+            updated = cursor.rowcount
+            cursor.execute(
+                f"INSERT INTO {self.table} ({insert_columns}) "
+                f"SELECT {insert_values} FROM {self.staging} AS staging "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {self.table} AS target "
+                f"WHERE {matches})"
+            )
+            created = cursor.rowcount
+
+        return created, updated, rejected
+
+
+class AirportImport(ReferenceImport):
+    """Airports keyed by ICAO code"""
+
+    model = Airport
+    key_columns = ("icao_code",)
+    value_columns = ("name", "city", "country", "airport_type", "iata_code")
+    staging_types = dict.fromkeys(key_columns + value_columns, "text")
+
+    def clean(self, row):
+        values = []
+        errors = {}
+        for column in self.columns:
+            field = Airport._meta.get_field(column)
+            value = str(row.get(column) or "").strip()
+            if not value and field.has_default():
+                value = field.get_default()
+            if column in ("icao_code", "iata_code"):
+                value = value.upper()
+            try:
+                values.append(field.clean(value, None))
+            except ValidationError as error:
+                errors[column] = error.messages
+        if errors:
+            raise ValidationError(errors)
+        return tuple(values)
+
+
+class RouteImport(ReferenceImport):
+    """Routes keyed by source and destination, given as airport id, IATA
+    or ICAO code"""
+
+    model = Route
+    key_columns = ("source_id", "destination_id")
+    value_columns = ("distance",)
+    staging_types = {
+        "source_id": "bigint",
+        "destination_id": "bigint",
+        "distance": "integer",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.airport_id = CodeLookup(
+            "airport",
+            Airport.objects.values_list("id", "iata_code", "icao_code"),
+        )
+
+    def clean(self, row):
+        values = {}
+        errors = {}
+        for column in ("source", "destination"):
+            try:
+                values[column] = self.airport_id(row.get(column))
+            except ValidationError as error:
+                errors[column] = error.messages
+        try:
+            values["distance"] = Route._meta.get_field("distance").clean(
+                row.get("distance"), None
+            )
+            if values["distance"] <= 0:
+                raise ValidationError("Distance must be positive")
+        except ValidationError as error:
+            errors["distance"] = error.messages
+        if not errors and values["source"] == values["destination"]:
+            errors["destination"] = ["Route must lead to another airport"]
+        if errors:
+            raise ValidationError(errors)
+        return values["source"], values["destination"], values["distance"]
+
+
+class FlightImport(ReferenceImport):
+    """Flights keyed by airplane and departure time. The route is given by
+    its source and destination airports, the airplane by id or name.
+    Crew is not imported, it is assigned to the flights afterwards"""
+
+    model = Flight
+    key_columns = ("airplane_id", "departure_time")
+    value_columns = ("route_id", "arrival_time")
+    staging_types = {
+        "airplane_id": "bigint",
+        "departure_time": "timestamptz",
+        "route_id": "bigint",
+        "arrival_time": "timestamptz",
+    }
+    insert_values = {"seats_sold": "0", "seats_held": "0"}
+    # keeps timetable exports and connection graphs up to date
+    update_values = {"updated_at": "now()"}
+
+    def __init__(self):
+        super().__init__()
+        self.airport_id = CodeLookup(
+            "airport",
+            Airport.objects.values_list("id", "iata_code", "icao_code"),
+        )
+        self.airplane_id = CodeLookup(
+            "airplane", Airplane.objects.values_list("id", "name")
+        )
+        self.route_ids = {}
+        for route_id, source_id, destination_id in Route.objects.order_by(
+            "id"
+        ).values_list("id", "source_id", "destination_id"):
+            self.route_ids.setdefault((source_id, destination_id), route_id)
+
+    def clean(self, row):
+        values = {}
+        errors = {}
+        lookups = (
+            ("source", self.airport_id),
+            ("destination", self.airport_id),
+            ("airplane", self.airplane_id),
+        )
+        for column, lookup in lookups:
+            try:
+                values[column] = lookup(row.get(column))
+            except ValidationError as error:
+                errors[column] = error.messages
+        for column in ("departure_time", "arrival_time"):
+            try:
+                values[column] = self.stored_datetime(
+                    Flight._meta.get_field(column).clean(
+                        str(row.get(column) or "").strip(), None
+                    )
+                )
+            except ValidationError as error:
+                errors[column] = error.messages
+        if "source" in values and "destination" in values:
+            route = (values["source"], values["destination"])
+            if route not in self.route_ids:
+                errors["destination"] = ["No route between the airports"]
+        if (
+            "departure_time" in values
+            and "arrival_time" in values
+            and values["arrival_time"] <= values["departure_time"]
+        ):
+            errors["arrival_time"] = ["Arrival must be after departure"]
+        if errors:
+            raise ValidationError(errors)
+        return (
+            values["airplane"],
+            values["departure_time"],
+            self.route_ids[(values["source"], values["destination"])],
+            values["arrival_time"],
+        )
+
+    def reject(self, cursor):
+        """Flights overlapping other flights of their airplane, stored or
+        imported, would break flight_airplane_no_overlap"""
+        overlaps = (
+            "other.airplane_id = staging.airplane_id "
+            "AND other.departure_time <> staging.departure_time "
+            "AND other.departure_time < staging.arrival_time "
+            "AND other.arrival_time > staging.departure_time"
+        )
+        cursor.execute(
+            f"DELETE FROM {self.staging} AS staging "
+            f"WHERE EXISTS (SELECT 1 FROM {self.table} AS other "
+            f"WHERE {overlaps}) "
+            f"OR EXISTS (SELECT 1 FROM {self.staging} AS other "
+            f"WHERE {overlaps}) "
+            f"RETURNING airplane_id, departure_time"
+        )
+        return {
+            (airplane_id, self.stored_datetime(departure_time)): {
+                "departure_time": [
+                    "Airplane is assigned to an overlapping flight"
+                ]
+            }
+            for airplane_id, departure_time in cursor.fetchall()
+        }
+
+    @staticmethod
+    def stored_datetime(value):
+        """Datetimes are naive in TIME_ZONE without USE_TZ, the staging
+        table hands them back aware"""
+        if settings.USE_TZ or timezone.is_naive(value):
+            return value
+        return timezone.make_naive(value)
+
+
+IMPORTERS = {
+    "airports": AirportImport,
+    "routes": RouteImport,
+    "flights": FlightImport,
+}
+
+
+def import_reference_data(kind, lines, input_format):
+    """Upsert airports, routes or flights from CSV or JSON Lines text lines
+    and return a summary with the errors of rejected rows"""
+    return IMPORTERS[kind]().run(read_rows(lines, input_format))
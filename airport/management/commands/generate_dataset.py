@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from airport.datasets import DATASET_PASSWORD, DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with seeded synthetic airports, routes, "
+        "airplanes, crew, users, flights, orders and tickets"
+    )
+
+    def add_arguments(self, parser):
+        for name, default in (
+            ("airports", 300),
+            ("routes", 3000),
+            ("airplanes", 500),
+            ("crew", 2000),
+            ("users", 50000),
+            ("flights", 20000),
+            ("tickets", 1000000),
+        ):
+            parser.add_argument(
+                f"--{name}",
+                type=int,
+                default=default,
+                help=f"Number of {name} to generate (default {default})",
+            )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--start",
+            type=datetime.fromisoformat,
+            help="First departure day, today by default",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            generator = DatasetGenerator(
+                airports=options["airports"],
+                routes=options["routes"],
+                airplanes=options["airplanes"],
+                crew=options["crew"],
+                users=options["users"],
+                flights=options["flights"],
+                tickets=options["tickets"],
+                seed=options["seed"],
+                start=options["start"],
+                log=(
+                    self.stdout.write
+                    if options["verbosity"] > 1
+                    else None
+                ),
+            )
+            summary = generator.run()
+        except ValueError as error:
+            raise CommandError(error)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Generated "
+                + ", ".join(f"{count} {name}" for name, count in summary.items())
+                + f". Users log in with password {DATASET_PASSWORD!r}"
+            )
+        )
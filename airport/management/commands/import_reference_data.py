@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from airport.imports import (
+    IMPORT_FORMATS,
+    IMPORTERS,
+    import_reference_data,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert airports, routes or flights from a CSV or JSON Lines file"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path", help="File to read, - for stdin")
+        parser.add_argument(
+            "--input",
+            choices=IMPORT_FORMATS,
+            help="Input format, guessed from the file extension by default",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["input"] or path.rsplit(".", 1)[-1]
+        if input_format not in IMPORT_FORMATS:
+            raise CommandError("Pass --input, the format can not be guessed")
+
+        if path == "-":
+            summary = import_reference_data(
+                options["kind"], sys.stdin, input_format
+            )
+        else:
+            with open(path, encoding="utf-8", newline="") as lines:
+                summary = import_reference_data(
+                    options["kind"], lines, input_format
+                )
+
+        for error in summary["errors"]:
+            self.stderr.write(f"Line {error['line']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{summary['rows']} row(s): {summary['created']} created, "
+                f"{summary['updated']} updated, "
+                f"{summary['unchanged']} unchanged, "
+                f"{summary['failed']} failed"
+            )
+        )
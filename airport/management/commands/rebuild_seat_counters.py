@@ -0,0 +1,107 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from airport.models import Flight, SeatHold, Ticket
+from airport.seat_holds import sweep_expired_holds
+
+
+def count_subquery(model):
+    """Number of rows of the model pointing at the outer flight"""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(flight=OuterRef("pk"))
+            .order_by()
+            .values("flight")
+            .annotate(count=Count("id"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def tickets_count_subquery():
+    """Number of tickets sold for the outer flight"""
+    return count_subquery(Ticket)
+
+
+def holds_count_subquery():
+    """Number of seats held on the outer flight"""
+    return count_subquery(SeatHold)
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify and rebuild Flight.seats_sold and Flight.seats_held "
+        "counters from tickets and seat holds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report flights with drifted counters, exit 1 if any",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            sweep_expired_holds()
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {Ticket._meta.db_table}, "
+                    f"{SeatHold._meta.db_table} IN SHARE MODE"
+                )
+
+            drifted = list(
+                Flight.objects.annotate(
+                    tickets_count=tickets_count_subquery(),
+                    holds_count=holds_count_subquery(),
+                )
+                .filter(
+                    ~Q(seats_sold=F("tickets_count"))
+                    | ~Q(seats_held=F("holds_count"))
+                )
+                .values_list(
+                    "id",
+                    "seats_sold",
+                    "tickets_count",
+                    "seats_held",
+                    "holds_count",
+                )
+            )
+
+            for (
+                flight_id,
+                seats_sold,
+                tickets_count,
+                seats_held,
+                holds_count,
+            ) in drifted:
+                self.stdout.write(
+                    f"Flight {flight_id}: stored {seats_sold} sold and "
+                    f"{seats_held} held, actual {tickets_count} sold and "
+                    f"{holds_count} held"
+                )
+
+            if options["check"]:
+                if drifted:
+                    raise CommandError(
+                        f"{len(drifted)} flight counter(s) out of sync"
+                    )
+                self.stdout.write(self.style.SUCCESS("All counters in sync"))
+                return
+
+            updated = Flight.objects.filter(
+                id__in=[flight_id for flight_id, *_ in drifted]
+            ).update(
+                seats_sold=tickets_count_subquery(),
+                seats_held=holds_count_subquery(),
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {updated} flight counter(s)")
+        )
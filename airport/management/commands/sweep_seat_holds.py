@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from airport.seat_holds import SWEEP_BATCH_SIZE, sweep_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Delete expired seat holds and give their seats back to flights"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=SWEEP_BATCH_SIZE,
+            help="Number of flights swept in one transaction",
+        )
+
+    def handle(self, *args, **options):
+        swept = sweep_expired_holds(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {swept} expired seat hold(s)")
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 4.0.4 on 2026-10-17 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0007_flight_order_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="airport",
+            index=models.Index(fields=["iata_code"], name="airport_iata_code_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="airport",
+            index=models.Index(fields=["icao_code"], name="airport_icao_code_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["route", "departure_time"], name="flight_route_departure_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="route",
+            index=models.Index(
+                fields=["source", "destination"], name="route_source_destination_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.0.4 on 2026-10-17 04:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0009_flight_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FlightSchedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "days_of_week",
+                    models.CharField(
+                        help_text="ISO weekdays the flight operates on, ex. 135",
+                        max_length=7,
+                    ),
+                ),
+                ("departure_time", models.TimeField()),
+                ("duration", models.DurationField()),
+                ("valid_from", models.DateField()),
+                ("valid_until", models.DateField()),
+            ],
+            options={
+                "ordering": ("valid_from", "departure_time"),
+            },
+        ),
+        migrations.AddField(
+            model_name="flightschedule",
+            name="airplane",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="schedules",
+                to="airport.airplane",
+            ),
+        ),
+        migrations.AddField(
+            model_name="flightschedule",
+            name="crew",
+            field=models.ManyToManyField(
+                blank=True, related_name="schedules", to="airport.crew"
+            ),
+        ),
+        migrations.AddField(
+            model_name="flightschedule",
+            name="route",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="schedules",
+                to="airport.route",
+            ),
+        ),
+        migrations.AddField(
+            model_name="flight",
+            name="schedule",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="flights",
+                to="airport.flightschedule",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="flight",
+            constraint=models.UniqueConstraint(
+                fields=("schedule", "departure_time"),
+                name="flight_schedule_departure_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.0.4 on 2026-10-17 04:18
+
+import airport.models
+import django.contrib.postgres.constraints
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0010_flight_schedule"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["airplane", "departure_time"],
+                name="flight_airplane_departure_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="flight",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    (
+                        "arrival_time__gt",
+                        django.db.models.expressions.F("departure_time"),
+                    )
+                ),
+                name="flight_arrival_after_departure",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="flight",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                expressions=[
+                    (
+                        airport.models.Int8Range(
+                            "airplane",
+                            "airplane",
+                            django.db.models.expressions.Value("[]"),
+                        ),
+                        "&&",
+                    ),
+                    (airport.models.TsTzRange("departure_time", "arrival_time"), "&&"),
+                ],
+                name="flight_airplane_no_overlap",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.0.4 on 2026-10-17 04:27
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('airport', '0012_seat_holds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='booking_concurrency',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Number of orders booked at once, others wait in the queue. Empty means no limit.', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.CreateModel(
+            name='OrderQueueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('seen_at', models.DateTimeField()),
+                ('admitted_at', models.DateTimeField(blank=True, null=True)),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_queue', to='airport.flight')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_queue_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('id',),
+                'unique_together': {('flight', 'user')},
+            },
+        ),
+    ]
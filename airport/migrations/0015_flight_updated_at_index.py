@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-17 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0014_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['updated_at'], name='flight_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.4 on 2026-10-17 05:07
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0015_flight_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='airplane',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('rows'), '*', django.db.models.expressions.F('seats_in_row')), name='airplane_capacity_idx'),
+        ),
+    ]
@@ -2,8 +2,14 @@ import os
 import uuid
 
 from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import RangeOperators
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import F, Func, Prefetch, Q, Value
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext as _
 
@@ -40,6 +46,10 @@ class Airport(models.Model):
 
     class Meta:
         ordering = ("name",)
+        indexes = [
+            models.Index(fields=["iata_code"], name="airport_iata_code_idx"),
+            models.Index(fields=["icao_code"], name="airport_icao_code_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -60,6 +70,12 @@ class Route(models.Model):
 
     class Meta:
         ordering = ("source", "destination")
+        indexes = [
+            models.Index(
+                fields=["source", "destination"],
+                name="route_source_destination_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Route {self.source}-{self.destination}"
@@ -98,6 +114,13 @@ class Airplane(models.Model):
 
     class Meta:
         ordering = ("name",)
+        indexes = [
+            # serves the capacity_gte and capacity_lte airplane filters
+            models.Index(
+                F("rows") * F("seats_in_row"),
+                name="airplane_capacity_idx",
+            ),
+        ]
 
     @property
     def capacity(self) -> int:
@@ -107,6 +130,50 @@ class Airplane(models.Model):
         return f"{self.name} ({self.airplane_type})"
 
 
+class TsTzRange(Func):
+    function = "TSTZRANGE"
+
+
+class Int8Range(Func):
+    function = "INT8RANGE"
+
+
+class FlightSchedule(models.Model):
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name="schedules",
+    )
+    airplane = models.ForeignKey(
+        Airplane,
+        on_delete=models.CASCADE,
+        related_name="schedules",
+    )
+    crew = models.ManyToManyField(
+        Crew,
+        related_name="schedules",
+        blank=True,
+    )
+    days_of_week = models.CharField(
+        max_length=7,
+        help_text=_("ISO weekdays the flight operates on, ex. 135"),
+    )
+    departure_time = models.TimeField()
+    duration = models.DurationField()
+    valid_from = models.DateField()
+    valid_until = models.DateField()
+
+    class Meta:
+        ordering = ("valid_from", "departure_time")
+
+    @property
+    def weekdays(self) -> set:
+        return {int(day) for day in self.days_of_week}
+
+    def __str__(self):
+        return f"Schedule: {str(self.route)} at {self.departure_time}"
+
+
 class Flight(models.Model):
     route = models.ForeignKey(
         Route,
@@ -123,18 +190,208 @@ class Flight(models.Model):
         related_name="flights",
         blank=True,
     )
+    schedule = models.ForeignKey(
+        FlightSchedule,
+        on_delete=models.SET_NULL,
+        related_name="flights",
+        null=True,
+        blank=True,
+    )
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
+    seats_sold = models.PositiveIntegerField(default=0, editable=False)
+    seats_held = models.PositiveIntegerField(default=0, editable=False)
+    booking_concurrency = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        help_text=_(
+            "Number of orders booked at once, others wait in the queue. "
+            "Empty means no limit."
+        ),
+    )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = _("flight")
         verbose_name_plural = _("flights")
         ordering = ("departure_time",)
+        indexes = [
+            models.Index(
+                fields=["departure_time", "id"],
+                name="flight_departure_time_id_idx",
+            ),
+            models.Index(
+                fields=["route", "departure_time"],
+                name="flight_route_departure_idx",
+            ),
+            models.Index(
+                fields=["airplane", "departure_time"],
+                name="flight_airplane_departure_idx",
+            ),
+            models.Index(
+                fields=["updated_at"],
+                name="flight_updated_at_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["schedule", "departure_time"],
+                name="flight_schedule_departure_unique",
+            ),
+            models.CheckConstraint(
+                check=Q(arrival_time__gt=F("departure_time")),
+                name="flight_arrival_after_departure",
+            ),
+            # airplane equality is expressed as a single-value range, so the
+            # constraint only needs the core GiST range operator class
+            ExclusionConstraint(
+                name="flight_airplane_no_overlap",
+                expressions=[
+                    (
+                        Int8Range("airplane", "airplane", Value("[]")),
+                        RangeOperators.OVERLAPS,
+                    ),
+                    (
+                        TsTzRange("departure_time", "arrival_time"),
+                        RangeOperators.OVERLAPS,
+                    ),
+                ],
+            ),
+        ]
+
+    @property
+    def seats_available(self) -> int:
+        return self.airplane.capacity - self.seats_sold - self.seats_held
+
+    @staticmethod
+    def overlapping(departure_time, arrival_time):
+        """Flights in the air at some moment of [departure, arrival)"""
+        return Flight.objects.filter(
+            departure_time__lt=arrival_time, arrival_time__gt=departure_time
+        )
+
+    @staticmethod
+    def lock(flight_ids):
+        """Lock flight rows in id order, the same order counters use"""
+        list(
+            Flight.objects.select_for_update()
+            .filter(pk__in=flight_ids)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    @staticmethod
+    def update_seats_sold(seats_by_flight):
+        """Shift stored seats_sold counters by {flight_id: delta}.
+
+        Rows are updated in id order, so concurrent orders lock flights
+        in the same order.
+        """
+        Flight._shift_counter("seats_sold", seats_by_flight)
+
+    @staticmethod
+    def update_seats_held(seats_by_flight):
+        """Shift stored seats_held counters by {flight_id: delta}"""
+        Flight._shift_counter("seats_held", seats_by_flight)
+
+    @staticmethod
+    def _shift_counter(name, seats_by_flight):
+        for flight_id, delta in sorted(seats_by_flight.items()):
+            if delta:
+                Flight.objects.filter(pk=flight_id).update(
+                    **{name: F(name) + delta}
+                )
 
     def __str__(self):
         return f"Flight: {str(self.route)}"
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_tickets(self):
+        """Prefetch tickets together with the flight summary they show"""
+        return self.prefetch_related(
+            Prefetch(
+                "tickets",
+                queryset=Ticket.objects.select_related(
+                    "flight__route__source", "flight__route__destination"
+                ),
+            )
+        )
+
+
+class SeatHoldQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class SeatHold(models.Model):
+    """A seat reserved for a user while they fill out the order.
+
+    Holds stop other users from picking the seat until expires_at and
+    are turned into tickets when the same user orders the seat.
+    """
+
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    flight = models.ForeignKey(
+        Flight,
+        on_delete=models.CASCADE,
+        related_name="seat_holds",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = SeatHoldQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("flight", "row", "seat")
+        ordering = ("flight", "row", "seat")
+
+    def __str__(self):
+        return (
+            f"Hold of {self.user.email}: {str(self.flight)} "
+            f"(row: {self.row}, seat: {self.seat})"
+        )
+
+
+class OrderQueueEntry(models.Model):
+    """A user waiting for, or holding, one of the booking slots of a flight.
+
+    Entries are served in id order; admitted_at is set once the user may
+    place the order and the entry is deleted when the order is done.
+    """
+
+    flight = models.ForeignKey(
+        Flight,
+        on_delete=models.CASCADE,
+        related_name="order_queue",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="order_queue_entries",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    seen_at = models.DateTimeField()
+    admitted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("flight", "user")
+        ordering = ("id",)
+
+    def __str__(self):
+        return f"{self.user.email} in the queue of {str(self.flight)}"
+
+
 class Order(models.Model):
     created_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(
@@ -143,13 +400,57 @@ class Order(models.Model):
         related_name="orders",
     )
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ("created_at",)
+        indexes = [
+            models.Index(
+                fields=["user", "created_at", "id"],
+                name="order_user_created_at_id_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Order of {self.user.email}, time: {self.created_at}"
 
 
+class IdempotencyKeyQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(
+            created_at__gt=timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        )
+
+    def expired(self):
+        return self.filter(
+            created_at__lte=timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        )
+
+
+class IdempotencyKey(models.Model):
+    """Response of a request sent with an Idempotency-Key header, replayed
+    when the client sends the same request again"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys",
+    )
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("user", "key")
+
+    def __str__(self):
+        return f"Idempotency key {self.key} of {self.user.email}"
+
+
 class Ticket(models.Model):
     row = models.IntegerField()
     seat = models.IntegerField()
@@ -0,0 +1,61 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class DefaultPagination(PageNumberPagination):
+    page_size = 10
+    max_page_size = 100
+
+
+class FlightCursorPagination(CursorPagination):
+    page_size = 10
+    ordering = ("departure_time", "id")
+
+
+class OrderCursorPagination(CursorPagination):
+    page_size = 10
+    ordering = ("created_at", "id")
+
+
+class CursorOptInPagination(DefaultPagination):
+    """Page number pagination that switches to keyset pagination for
+    clients sending ?pagination=cursor, skipping COUNT(*) and OFFSET"""
+
+    cursor_pagination_class = None
+    mode_query_param = "pagination"
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == "cursor":
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        cursor_paginator = self.cursor_pagination_class()
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Use 'cursor' for keyset pagination",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            },
+            *cursor_paginator.get_schema_operation_parameters(view),
+        ]
+
+
+class FlightPagination(CursorOptInPagination):
+    cursor_pagination_class = FlightCursorPagination
+
+
+class OrderPagination(CursorOptInPagination):
+    cursor_pagination_class = OrderCursorPagination
@@ -0,0 +1,19 @@
+from datetime import datetime, time
+
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def param_to_datetime(name, value):
+    """Converts a date or datetime query param to a datetime"""
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            parsed_date = parse_date(value)
+            if parsed_date is None:
+                raise ValueError
+            parsed = datetime.combine(parsed_date, time.min)
+    except ValueError:
+        # well formatted but not a real date, ex. 2024-13-45
+        raise ValidationError({name: "Expected date or datetime"})
+    return parsed
@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from airport.conflicts import sweep_overlaps
+from airport.models import Flight
+
+PUBLISH_CHUNK_SIZE = 1000
+
+
+def iter_departures(schedule):
+    """Yield departure datetimes of the schedule in its validity period"""
+    weekdays = schedule.weekdays
+    day = schedule.valid_from
+    while day <= schedule.valid_until:
+        if day.isoweekday() in weekdays:
+            yield datetime.combine(day, schedule.departure_time)
+        day += timedelta(days=1)
+
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def busy_crew(schedule, crew_ids):
+    """Ids of the crew members assigned to flights of other schedules, or
+    to single flights, overlapping occurrences of the schedule"""
+    departures = list(iter_departures(schedule))
+    if not crew_ids or not departures:
+        return []
+
+    other_intervals = (
+        Flight.crew.through.objects.filter(
+            crew_id__in=crew_ids,
+            flight__departure_time__lt=departures[-1] + schedule.duration,
+            flight__arrival_time__gt=departures[0],
+        )
+        .exclude(flight__schedule=schedule)
+        .values_list(
+            "crew_id",
+            "flight__departure_time",
+            "flight__arrival_time",
+            "flight_id",
+        )
+    )
+    # occurrences of the schedule have no flight id yet, 0 stands for them
+    intervals = sorted(
+        [
+            (crew_id, departure, departure + schedule.duration, 0)
+            for crew_id in crew_ids
+            for departure in departures
+        ]
+        + list(other_intervals),
+        key=lambda interval: interval[:2],
+    )
+    return sorted(
+        {
+            crew_id
+            for crew_id, first, second, _, _ in sweep_overlaps(intervals)
+            if (first == 0) != (second == 0)
+        }
+    )
+
+
+def publish_schedule(schedule, dry_run=False, chunk_size=PUBLISH_CHUNK_SIZE):
+    """Expand the weekly pattern of the schedule into Flight rows.
+
+    Missing flights are streamed into chunked bulk inserts together with
+    their crew, flights whose route, airplane or arrival changed are
+    updated and flights no longer in the pattern are deleted unless seats
+    were sold or held on them. Publishing an unchanged pattern again
+    changes nothing. Crew busy on other flights during an occurrence is
+    rejected with a ValidationError before anything is written.
+    """
+    summary = dict.fromkeys(
+        ("created", "updated", "unchanged", "deleted", "kept"), 0
+    )
+    crew_ids = list(schedule.crew.values_list("id", flat=True))
+    busy = busy_crew(schedule, crew_ids)
+    if busy:
+        raise serializers.ValidationError(
+            {
+                "crew": f"Crew member(s) {busy} are assigned to flights "
+                        f"overlapping the schedule"
+            }
+        )
+    existing = {
+        flight.departure_time: flight
+        for flight in schedule.flights.order_by().only(
+            "id",
+            "route_id",
+            "airplane_id",
+            "departure_time",
+            "arrival_time",
+            "seats_sold",
+            "seats_held",
+        )
+    }
+    scheduled_ids = []
+    changed = []
+
+    def new_flights():
+        for departure_time in iter_departures(schedule):
+            arrival_time = departure_time + schedule.duration
+            flight = existing.pop(departure_time, None)
+            if flight is None:
+                yield Flight(
+                    route_id=schedule.route_id,
+                    airplane_id=schedule.airplane_id,
+                    schedule=schedule,
+                    departure_time=departure_time,
+                    arrival_time=arrival_time,
+                )
+                continue
+
+            scheduled_ids.append(flight.id)
+            if (flight.route_id, flight.airplane_id, flight.arrival_time) == (
+                schedule.route_id,
+                schedule.airplane_id,
+                arrival_time,
+            ):
+                summary["unchanged"] += 1
+            else:
+                flight.route_id = schedule.route_id
+                flight.airplane_id = schedule.airplane_id
+                flight.arrival_time = arrival_time
+                flight.updated_at = timezone.now()
+                changed.append(flight)
+
+    with transaction.atomic():
+        for chunk in iter_chunks(new_flights(), chunk_size):
+            summary["created"] += len(chunk)
+            if not dry_run:
+                Flight.objects.bulk_create(chunk)
+                scheduled_ids.extend(flight.id for flight in chunk)
+
+        stale_ids = [
+            flight.id
+            for flight in existing.values()
+            if not flight.seats_sold and not flight.seats_held
+        ]
+        summary["updated"] = len(changed)
+        summary["deleted"] = len(stale_ids)
+        summary["kept"] = len(existing) - len(stale_ids)
+        if dry_run:
+            return summary
+
+        Flight.objects.bulk_update(
+            changed,
+            ["route", "airplane", "arrival_time", "updated_at"],
+            batch_size=chunk_size,
+        )
+        for chunk in iter_chunks(stale_ids, chunk_size):
+            Flight.objects.filter(id__in=chunk).delete()
+
+        FlightCrew = Flight.crew.through
+        FlightCrew.objects.filter(flight__schedule=schedule).exclude(
+            crew_id__in=crew_ids
+        ).delete()
+        for chunk in iter_chunks(scheduled_ids, chunk_size):
+            FlightCrew.objects.bulk_create(
+                [
+                    FlightCrew(flight_id=flight_id, crew_id=crew_id)
+                    for flight_id in chunk
+                    for crew_id in crew_ids
+                ],
+                ignore_conflicts=True,
+            )
+
+    return summary
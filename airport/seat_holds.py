@@ -0,0 +1,215 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+
+from airport.models import Flight, SeatHold, Ticket
+from airport.seat_map import SeatMap
+
+SWEEP_BATCH_SIZE = 100
+
+
+def seats_filter(seats):
+    """Q matching any of the (row, seat) pairs"""
+    query = Q()
+    for row, seat in seats:
+        query |= Q(row=row, seat=seat)
+    return query
+
+
+def held_by_others(seats, user=None):
+    """(flight_id, row, seat) of the seats with active holds of users
+    other than the given one, for (flight_id, row, seat) triples"""
+    query = Q()
+    for flight_id, row, seat in seats:
+        query |= Q(flight_id=flight_id, row=row, seat=seat)
+    held = SeatHold.objects.active().filter(query).order_by()
+    if user is not None:
+        held = held.exclude(user=user)
+    return sorted(held.values_list("flight_id", "row", "seat"))
+
+
+def active_holds_count():
+    """Number of active holds of the outer flight. Unlike seats_held it
+    skips expired holds the sweep has not deleted yet."""
+    return Coalesce(
+        Subquery(
+            SeatHold.objects.active()
+            .filter(flight=OuterRef("pk"))
+            .order_by()
+            .values("flight")
+            .annotate(count=Count("id"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def invalidate_seat_maps(flight_ids):
+    for flight_id in flight_ids:
+        transaction.on_commit(
+            lambda flight_id=flight_id: SeatMap.invalidate(flight_id)
+        )
+
+
+def hold_seats(user, flight, seats):
+    """Reserve (row, seat) pairs on the flight for the user.
+
+    Seats the user already holds get a new expiry; seats sold or held by
+    somebody else are rejected. Every hold change locks the flight row
+    first, so holds of one flight are never created concurrently.
+    """
+    expires_at = timezone.now() + settings.SEAT_HOLD_DURATION
+
+    with transaction.atomic():
+        sweep_expired_holds([flight.id])
+        Flight.lock([flight.id])
+
+        sold = (
+            Ticket.objects.filter(flight=flight)
+            .filter(seats_filter(seats))
+            .order_by()
+            .values_list("row", "seat")
+        )
+        if sold:
+            raise serializers.ValidationError(
+                {
+                    "seats": [
+                        seat_error(seat, "is already taken")
+                        for seat in sorted(sold)
+                    ]
+                }
+            )
+
+        held = {
+            (row, seat): user_id
+            for row, seat, user_id in SeatHold.objects.filter(flight=flight)
+            .filter(seats_filter(seats))
+            .values_list("row", "seat", "user_id")
+        }
+        held_by_others = sorted(
+            seat for seat, user_id in held.items() if user_id != user.id
+        )
+        if held_by_others:
+            raise serializers.ValidationError(
+                {
+                    "seats": [
+                        seat_error(seat, "is held by another passenger")
+                        for seat in held_by_others
+                    ]
+                }
+            )
+
+        if held:
+            SeatHold.objects.filter(flight=flight, user=user).filter(
+                seats_filter(held)
+            ).update(expires_at=expires_at)
+
+        new_holds = [
+            SeatHold(
+                flight=flight,
+                user=user,
+                row=row,
+                seat=seat,
+                expires_at=expires_at,
+            )
+            for row, seat in seats
+            if (row, seat) not in held
+        ]
+        Flight.update_seats_held({flight.id: len(new_holds)})
+        try:
+            SeatHold.objects.bulk_create(new_holds)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"seats": "Some of the seats have just been taken"}
+            )
+        invalidate_seat_maps([flight.id])
+
+    return list(
+        SeatHold.objects.filter(flight=flight, user=user).filter(
+            seats_filter(seats)
+        )
+    )
+
+
+def release_holds(holds):
+    """Delete the holds and give their seats back to the flights"""
+    holds_by_flight = Counter(hold.flight_id for hold in holds)
+    with transaction.atomic():
+        Flight.lock(holds_by_flight)
+        deleted = Counter(
+            SeatHold.objects.filter(
+                id__in=[hold.id for hold in holds]
+            ).values_list("flight_id", flat=True)
+        )
+        SeatHold.objects.filter(id__in=[hold.id for hold in holds]).delete()
+        Flight.update_seats_held(
+            {flight_id: -count for flight_id, count in deleted.items()}
+        )
+        invalidate_seat_maps(deleted)
+
+
+def convert_holds(user, seats_by_flight):
+    """Delete the user's active holds on seats they are ordering now.
+
+    Must run with the flights already locked. Returns
+    {flight_id: -converted holds}, ready for Flight.update_seats_held.
+    """
+    converted = {}
+    for flight_id, seats in sorted(seats_by_flight.items()):
+        count, _ = (
+            SeatHold.objects.active()
+            .filter(flight_id=flight_id, user=user)
+            .filter(seats_filter(seats))
+            .delete()
+        )
+        if count:
+            converted[flight_id] = -count
+    return converted
+
+
+def sweep_expired_holds(flight_ids=None, batch_size=SWEEP_BATCH_SIZE):
+    """Delete expired holds in batches of flights, return how many.
+
+    Each batch locks its flights in id order before touching the holds,
+    the same order orders and new holds use, so the sweep never
+    deadlocks with them.
+    """
+    swept = 0
+    while True:
+        expired = SeatHold.objects.expired().order_by()
+        if flight_ids is not None:
+            expired = expired.filter(flight_id__in=flight_ids)
+        # looked up outside of the transaction, so a sweep without
+        # expired holds costs a single query
+        batch = list(
+            expired.order_by("flight_id")
+            .values_list("flight_id", flat=True)
+            .distinct()[:batch_size]
+        )
+        if not batch:
+            return swept
+
+        with transaction.atomic():
+            Flight.lock(batch)
+            released = Counter(
+                expired.filter(flight_id__in=batch).values_list(
+                    "flight_id", flat=True
+                )
+            )
+            expired.filter(flight_id__in=batch).delete()
+            Flight.update_seats_held(
+                {flight_id: -count for flight_id, count in released.items()}
+            )
+            invalidate_seat_maps(released)
+            swept += sum(released.values())
+
+
+def seat_error(seat, message):
+    row, seat = seat
+    return f"Seat (row: {row}, seat: {seat}) {message}"
@@ -0,0 +1,191 @@
+import base64
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from airport.models import SeatHold, Ticket
+
+SEAT_MAP_CACHE_TIMEOUT = 60 * 60
+
+
+def seat_map_cache_key(flight_id):
+    return f"airport:seat-map:{flight_id}"
+
+
+class SeatMap:
+    """Occupancy of an airplane as a bitset of rows * seats_in_row bits.
+
+    Seat (row, seat) is stored in bit (row - 1) * seats_in_row + (seat - 1),
+    most significant bit of every byte first.
+    """
+
+    def __init__(self, rows, seats_in_row, bits=None):
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        self.bits = bytearray(bits or (rows * seats_in_row + 7) // 8)
+        self.holds_expire_at = None
+
+    @classmethod
+    def from_flight(cls, flight):
+        """Build the map of sold and actively held seats.
+
+        holds_expire_at is set to the moment the first of the holds
+        expires and the map goes stale.
+        """
+        seat_map = cls(flight.airplane.rows, flight.airplane.seats_in_row)
+        for row, seat in (
+            Ticket.objects.filter(flight=flight)
+            .order_by()
+            .values_list("row", "seat")
+        ):
+            seat_map.take(row, seat)
+        for row, seat, expires_at in (
+            SeatHold.objects.active()
+            .filter(flight=flight)
+            .order_by()
+            .values_list("row", "seat", "expires_at")
+        ):
+            seat_map.take(row, seat)
+            if (
+                seat_map.holds_expire_at is None
+                or expires_at < seat_map.holds_expire_at
+            ):
+                seat_map.holds_expire_at = expires_at
+        return seat_map
+
+    @classmethod
+    def for_flight(cls, flight):
+        """Return the cached map, rebuilding it if seats were sold or held
+        since"""
+        key = seat_map_cache_key(flight.id)
+        cached = cache.get(key)
+        if cached and (cached["seats_sold"], cached["seats_held"]) == (
+            flight.seats_sold,
+            flight.seats_held,
+        ):
+            seat_map = cls(cached["rows"], cached["seats_in_row"], cached["bits"])
+            if (seat_map.rows, seat_map.seats_in_row) == (
+                flight.airplane.rows,
+                flight.airplane.seats_in_row,
+            ):
+                return seat_map
+
+        seat_map = cls.from_flight(flight)
+        timeout = SEAT_MAP_CACHE_TIMEOUT
+        if seat_map.holds_expire_at:
+            seconds_left = (
+                seat_map.holds_expire_at - timezone.now()
+            ).total_seconds()
+            timeout = max(1, min(timeout, int(seconds_left)))
+        cache.set(
+            key,
+            {
+                "rows": seat_map.rows,
+                "seats_in_row": seat_map.seats_in_row,
+                "bits": bytes(seat_map.bits),
+                "seats_sold": flight.seats_sold,
+                "seats_held": flight.seats_held,
+            },
+            timeout,
+        )
+        return seat_map
+
+    @staticmethod
+    def invalidate(flight_id):
+        cache.delete(seat_map_cache_key(flight_id))
+
+    @property
+    def capacity(self):
+        return self.rows * self.seats_in_row
+
+    def _position(self, row, seat):
+        index = (row - 1) * self.seats_in_row + (seat - 1)
+        return index // 8, 0x80 >> (index % 8)
+
+    def is_taken(self, row, seat):
+        byte, mask = self._position(row, seat)
+        return bool(self.bits[byte] & mask)
+
+    def take(self, row, seat):
+        byte, mask = self._position(row, seat)
+        self.bits[byte] |= mask
+
+    def taken_seats(self):
+        return [
+            (row, seat)
+            for row in range(1, self.rows + 1)
+            for seat in range(1, self.seats_in_row + 1)
+            if self.is_taken(row, seat)
+        ]
+
+    def free_runs(self, row):
+        """Yield (first_seat, length) of contiguous free seats in the row"""
+        start = None
+        for seat in range(1, self.seats_in_row + 2):
+            if seat <= self.seats_in_row and not self.is_taken(row, seat):
+                if start is None:
+                    start = seat
+            elif start is not None:
+                yield start, seat - start
+                start = None
+
+    def allocate(self, count):
+        """Take count free seats and return them as (row, seat) pairs.
+
+        Prefers the tightest contiguous run of seats in a single row, then
+        the smallest block of neighbouring rows. Returns None if the flight
+        does not have enough free seats.
+        """
+        if count > self.capacity - self.taken_count():
+            return None
+
+        best_run = None
+        for row in range(1, self.rows + 1):
+            for start, length in self.free_runs(row):
+                if length >= count and (
+                    best_run is None or length - count < best_run[0]
+                ):
+                    best_run = (length - count, row, start)
+        if best_run:
+            _, row, start = best_run
+            seats = [(row, seat) for seat in range(start, start + count)]
+        else:
+            seats = self._allocate_rows_block(count)
+
+        for row, seat in seats:
+            self.take(row, seat)
+        return seats
+
+    def _allocate_rows_block(self, count):
+        free = [
+            sum(length for _, length in self.free_runs(row))
+            for row in range(1, self.rows + 1)
+        ]
+        best_block = None
+        first, total = 0, 0
+        for last in range(self.rows):
+            total += free[last]
+            while total - free[first] >= count:
+                total -= free[first]
+                first += 1
+            if total >= count and (
+                best_block is None
+                or last - first < best_block[1] - best_block[0]
+            ):
+                best_block = (first, last)
+
+        seats = []
+        first, last = best_block
+        for row in range(first + 1, last + 2):
+            runs = sorted(self.free_runs(row), key=lambda run: -run[1])
+            for start, length in runs:
+                for seat in range(start, start + length):
+                    if len(seats) < count:
+                        seats.append((row, seat))
+        return sorted(seats)
+
+    def taken_count(self):
+        return sum(bin(byte).count("1") for byte in self.bits)
+
+    def to_base64(self):
+        return base64.b64encode(self.bits).decode("ascii")
@@ -1,5 +1,8 @@
+from collections import Counter
+
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from rest_framework import serializers
 
 from airport.models import (
@@ -9,9 +12,20 @@ from airport.models import (
     Airplane,
     Route,
     Flight,
+    FlightSchedule,
+    SeatHold,
     Ticket,
     Order,
 )
+from airport.seat_holds import (
+    convert_holds,
+    held_by_others,
+    hold_seats,
+    invalidate_seat_maps,
+    sweep_expired_holds,
+)
+from airport.seat_map import SeatMap
+from airport_system.metrics import BOOKING_CONFLICTS
 
 
 class CrewSerializer(serializers.ModelSerializer):
@@ -106,7 +120,72 @@ class FlightSerializer(serializers.ModelSerializer):
             "crew",
             "departure_time",
             "arrival_time",
+            "booking_concurrency",
+        )
+
+    def validate(self, attrs):
+        data = super(FlightSerializer, self).validate(attrs=attrs)
+
+        def current(name):
+            if name in attrs:
+                return attrs[name]
+            return getattr(self.instance, name, None)
+
+        departure_time = current("departure_time")
+        arrival_time = current("arrival_time")
+        if arrival_time <= departure_time:
+            raise serializers.ValidationError(
+                {"arrival_time": "Arrival must be after departure"}
+            )
+
+        overlapping = Flight.overlapping(departure_time, arrival_time)
+        if self.instance:
+            overlapping = overlapping.exclude(pk=self.instance.pk)
+
+        busy_flights = list(
+            overlapping.filter(airplane=current("airplane"))
+            .order_by()
+            .values_list("id", flat=True)
+        )
+        if busy_flights:
+            raise serializers.ValidationError(
+                {
+                    "airplane": f"Airplane is assigned to overlapping "
+                                f"flight(s): {busy_flights}"
+                }
+            )
+
+        if "crew" in attrs:
+            crew = attrs["crew"]
+        elif self.instance:
+            crew = self.instance.crew.all()
+        else:
+            crew = []
+        busy_crew = sorted(
+            set(
+                overlapping.filter(crew__in=crew)
+                .order_by()
+                .values_list("crew", flat=True)
+            )
         )
+        if busy_crew:
+            raise serializers.ValidationError(
+                {
+                    "crew": f"Crew member(s) {busy_crew} are assigned to "
+                            f"overlapping flights"
+                }
+            )
+
+        return data
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"airplane": "Airplane is assigned to an overlapping flight"}
+            )
 
 
 class FlightListSerializer(FlightSerializer):
@@ -125,7 +204,7 @@ class FlightListSerializer(FlightSerializer):
     crew = serializers.SlugRelatedField(
         many=True, read_only=True, slug_field="full_name"
     )
-    tickets_available = serializers.IntegerField(read_only=True)
+    tickets_available = serializers.SerializerMethodField()
 
     class Meta:
         model = Flight
@@ -141,6 +220,12 @@ class FlightListSerializer(FlightSerializer):
             "tickets_available",
         )
 
+    def get_tickets_available(self, flight) -> int:
+        """Free seats counting active holds annotated by the view"""
+        return (
+            flight.airplane.capacity - flight.seats_sold - flight.active_holds
+        )
+
 
 class FlightDetailSerializer(FlightSerializer):
     route = RouteListSerializer(many=False, read_only=True)
@@ -161,6 +246,53 @@ class FlightDetailSerializer(FlightSerializer):
         )
 
 
+class FlightScheduleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FlightSchedule
+        fields = (
+            "id",
+            "route",
+            "airplane",
+            "crew",
+            "days_of_week",
+            "departure_time",
+            "duration",
+            "valid_from",
+            "valid_until",
+        )
+
+    def validate_days_of_week(self, value):
+        days = set(value)
+        if not days or days - set("1234567") or len(days) != len(value):
+            raise serializers.ValidationError(
+                "Expected distinct ISO weekdays 1-7, ex. 135"
+            )
+        return "".join(sorted(value))
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        valid_from = attrs.get(
+            "valid_from", getattr(self.instance, "valid_from", None)
+        )
+        valid_until = attrs.get(
+            "valid_until", getattr(self.instance, "valid_until", None)
+        )
+        if valid_from and valid_until and valid_until < valid_from:
+            raise serializers.ValidationError(
+                {"valid_until": "Must not be before valid_from"}
+            )
+        return data
+
+
+class FlightSchedulePublishSerializer(serializers.Serializer):
+    dry_run = serializers.BooleanField(default=False, write_only=True)
+    created = serializers.IntegerField(read_only=True)
+    updated = serializers.IntegerField(read_only=True)
+    unchanged = serializers.IntegerField(read_only=True)
+    deleted = serializers.IntegerField(read_only=True)
+    kept = serializers.IntegerField(read_only=True)
+
+
 class RouteDetailSerializer(RouteListSerializer):
     flights = serializers.HyperlinkedRelatedField(
         many=True,
@@ -179,7 +311,108 @@ class RouteDetailSerializer(RouteListSerializer):
         )
 
 
+class TicketFlightField(serializers.PrimaryKeyRelatedField):
+    """Primary key field which can resolve flights from a preloaded batch"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.preloaded = {}
+
+    def preload(self, pks):
+        self.preloaded = (
+            self.get_queryset()
+            .select_related("airplane")
+            .in_bulk([pk for pk in pks if str(pk).isdigit()])
+        )
+
+    def to_internal_value(self, data):
+        if not isinstance(data, bool):
+            try:
+                return self.preloaded[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+class TicketBulkSerializer(serializers.ListSerializer):
+    """Validate a batch of tickets with one query for flights and one for
+    seats that are already sold"""
+
+    def to_internal_value(self, data):
+        flight_field = self.child.fields.get("flight")
+        if isinstance(flight_field, TicketFlightField) and isinstance(
+            data, list
+        ):
+            # other values are left for the field to reject
+            flight_field.preload(
+                {
+                    item["flight"]
+                    for item in data
+                    if isinstance(item, dict)
+                    and type(item.get("flight")) in (int, str)
+                }
+            )
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        seats = [
+            (ticket["flight"].id, ticket["row"], ticket["seat"])
+            for ticket in attrs
+        ]
+        duplicates = [
+            seat for seat, count in Counter(seats).items() if count > 1
+        ]
+        if duplicates:
+            raise serializers.ValidationError(
+                [
+                    self.seat_error(seat, "is repeated in the order")
+                    for seat in sorted(duplicates)
+                ]
+            )
+
+        taken_filter = Q()
+        for flight_id, row, seat in seats:
+            taken_filter |= Q(flight_id=flight_id, row=row, seat=seat)
+        taken = (
+            Ticket.objects.filter(taken_filter)
+            .order_by()
+            .values_list("flight_id", "row", "seat")
+        )
+        if taken:
+            raise serializers.ValidationError(
+                [
+                    self.seat_error(seat, "is already taken")
+                    for seat in sorted(taken)
+                ]
+            )
+
+        request = self.context.get("request")
+        held = held_by_others(
+            seats, request.user if request is not None else None
+        )
+        if held:
+            raise serializers.ValidationError(self.held_errors(held))
+
+        return attrs
+
+    @classmethod
+    def held_errors(cls, held):
+        return [
+            cls.seat_error(seat, "is held by another passenger")
+            for seat in held
+        ]
+
+    @staticmethod
+    def seat_error(seat, message):
+        flight_id, row, seat = seat
+        return (
+            f"Seat (row: {row}, seat: {seat}) on flight {flight_id} {message}"
+        )
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    serializer_related_field = TicketFlightField
+
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
         Ticket.validate_ticket(
@@ -193,6 +426,9 @@ class TicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "flight")
+        list_serializer_class = TicketBulkSerializer
+        # seats are checked for the whole order at once in TicketBulkSerializer
+        validators = []
 
 
 class TicketListSerializer(TicketSerializer):
@@ -209,6 +445,50 @@ class TicketSeatsSerializer(TicketSerializer):
         fields = ("row", "seat")
 
 
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SeatHold
+        fields = ("id", "flight", "row", "seat", "expires_at")
+
+
+class SeatHoldCreateSerializer(serializers.Serializer):
+    flight = serializers.PrimaryKeyRelatedField(
+        queryset=Flight.objects.select_related("airplane")
+    )
+    seats = SeatSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        seats = [(seat["row"], seat["seat"]) for seat in attrs["seats"]]
+        duplicates = [
+            seat for seat, count in Counter(seats).items() if count > 1
+        ]
+        if duplicates:
+            raise serializers.ValidationError(
+                {"seats": "Seats must not repeat"}
+            )
+        for row, seat in seats:
+            Ticket.validate_ticket(
+                row,
+                seat,
+                attrs["flight"].airplane,
+                serializers.ValidationError,
+            )
+        attrs["seats"] = seats
+        return attrs
+
+    def create(self, validated_data):
+        return hold_seats(
+            self.context["request"].user,
+            validated_data["flight"],
+            validated_data["seats"],
+        )
+
+
 class OrderSerializer(serializers.ModelSerializer):
     tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
 
@@ -220,10 +500,121 @@ class OrderSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
             order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
+            self.create_tickets(order, tickets_data)
+            return order
+
+    @staticmethod
+    def create_tickets(order, tickets_data):
+        """Insert all tickets of the order with a single query.
+
+        Flight counters are updated first, which locks the flight rows
+        before any seat is inserted, and the unique constraint on
+        (flight, row, seat) rejects seats taken by a concurrent order.
+        Holds are checked again once the flights are locked, a concurrent
+        hold may have been taken since the order was validated. Seats the
+        user holds are released as their tickets are created.
+        """
+        tickets = [
+            Ticket(order=order, **ticket_data) for ticket_data in tickets_data
+        ]
+        seats_by_flight = Counter(ticket.flight_id for ticket in tickets)
+        Flight.update_seats_sold(seats_by_flight)
+
+        held = held_by_others(
+            [(ticket.flight_id, ticket.row, ticket.seat) for ticket in tickets],
+            order.user,
+        )
+        if held:
+            raise serializers.ValidationError(
+                {"tickets": TicketBulkSerializer.held_errors(held)}
+            )
+
+        seats = {}
+        for ticket in tickets:
+            seats.setdefault(ticket.flight_id, []).append(
+                (ticket.row, ticket.seat)
+            )
+        Flight.update_seats_held(convert_holds(order.user, seats))
+
+        try:
+            Ticket.objects.bulk_create(tickets)
+        except IntegrityError:
+            BOOKING_CONFLICTS.inc()
+            raise serializers.ValidationError(
+                {"tickets": "Some of the seats have just been taken"}
+            )
+        invalidate_seat_maps(seats_by_flight)
+        return tickets
+
+
+class OrderAutoAssignSerializer(OrderSerializer):
+    flight = serializers.PrimaryKeyRelatedField(
+        queryset=Flight.objects.all(), write_only=True
+    )
+    passengers = serializers.IntegerField(min_value=1, write_only=True)
+    tickets = TicketSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ("id", "flight", "passengers", "tickets", "created_at")
+
+    def create(self, validated_data):
+        flight = validated_data.pop("flight")
+        passengers = validated_data.pop("passengers")
+
+        sweep_expired_holds([flight.pk])
+        with transaction.atomic():
+            flight = (
+                Flight.objects.select_for_update(of=("self",))
+                .select_related("airplane")
+                .get(pk=flight.pk)
+            )
+            seats = SeatMap.from_flight(flight).allocate(passengers)
+            if seats is None:
+                raise serializers.ValidationError(
+                    {
+                        "passengers": f"Only {flight.seats_available} "
+                                      f"seats are left on the flight"
+                    }
+                )
+
+            order = Order.objects.create(**validated_data)
+            self.create_tickets(
+                order,
+                [
+                    {"flight": flight, "row": row, "seat": seat}
+                    for row, seat in seats
+                ],
+            )
             return order
 
 
 class OrderListSerializer(OrderSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+
+class FlightSummarySerializer(serializers.ModelSerializer):
+    route_source = serializers.CharField(
+        read_only=True, source="route.source.name"
+    )
+    route_destination = serializers.CharField(
+        read_only=True, source="route.destination.name"
+    )
+
+    class Meta:
+        model = Flight
+        fields = (
+            "id",
+            "route_source",
+            "route_destination",
+            "departure_time",
+            "arrival_time",
+        )
+
+
+class TicketExpandedSerializer(TicketSerializer):
+    flight = FlightSummarySerializer(many=False, read_only=True)
+
+
+class OrderExpandedListSerializer(OrderSerializer):
+    tickets = TicketExpandedSerializer(many=True, read_only=True)
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from airport.models import Flight, Ticket
+from airport.seat_map import SeatMap
+
+
+@receiver(post_save, sender=Ticket)
+def count_sold_seat(sender, instance, created, **kwargs):
+    """Keep Flight.seats_sold in step with tickets saved one by one"""
+    if created:
+        Flight.update_seats_sold({instance.flight_id: 1})
+    transaction.on_commit(lambda: SeatMap.invalidate(instance.flight_id))
+
+
+@receiver(post_delete, sender=Ticket)
+def release_sold_seat(sender, instance, **kwargs):
+    """Give the seat back to the flight when a ticket is deleted"""
+    Flight.update_seats_sold({instance.flight_id: -1})
+    transaction.on_commit(lambda: SeatMap.invalidate(instance.flight_id))
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.admission import ORDER_SLOT_TIMEOUT
+from airport.models import OrderQueueEntry
+from airport.tests.test_order_view import order_payload
+from airport.tests.test_seat_counters import sample_flight
+
+ORDER_URL = reverse("airport:order-list")
+
+
+class OrderAdmissionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.other = get_user_model().objects.create_user(
+            "other@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight(booking_concurrency=1)
+
+    def order(self):
+        return self.client.post(
+            ORDER_URL, order_payload(self.flight, [(1, 1)]), format="json"
+        )
+
+    def test_order_is_queued_while_slots_are_taken(self):
+        busy = OrderQueueEntry.objects.create(
+            flight=self.flight,
+            user=self.other,
+            seen_at=timezone.now(),
+            admitted_at=timezone.now(),
+        )
+
+        res = self.order()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res.data["queue_position"], 1)
+        self.assertEqual(res["Retry-After"], "1")
+        self.assertTrue(
+            OrderQueueEntry.objects.filter(
+                user=self.user, admitted_at__isnull=True
+            ).exists()
+        )
+
+        busy.delete()
+        res = self.order()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(OrderQueueEntry.objects.exists())
+
+    def test_queue_is_served_in_order(self):
+        OrderQueueEntry.objects.create(
+            flight=self.flight, user=self.other, seen_at=timezone.now()
+        )
+
+        res = self.order()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res.data["queue_position"], 2)
+
+    def test_abandoned_slot_is_taken_back(self):
+        long_ago = timezone.now() - ORDER_SLOT_TIMEOUT - timedelta(seconds=1)
+        OrderQueueEntry.objects.create(
+            flight=self.flight,
+            user=self.other,
+            seen_at=long_ago,
+            admitted_at=long_ago,
+        )
+
+        res = self.order()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_slot_is_released_after_failed_order(self):
+        res = self.client.post(
+            ORDER_URL, order_payload(self.flight, [(100, 1)]), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(OrderQueueEntry.objects.exists())
@@ -3,7 +3,9 @@ import os
 
 from PIL import Image
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework.test import APIClient
@@ -130,6 +132,31 @@ class AuthenticatedMovieApiTests(TestCase):
         self.assertIn(serializer2.data, res.data["results"])
         self.assertNotIn(serializer3.data, res.data["results"])
 
+    def test_filter_airplanes_by_capacity(self):
+        sample_airplane(name="Small", rows=10, seats_in_row=4)
+        medium = sample_airplane(name="Medium", rows=30, seats_in_row=6)
+        sample_airplane(name="Large", rows=50, seats_in_row=10)
+
+        res = self.client.get(
+            AIRPLANE_URL, {"capacity_gte": 100, "capacity_lte": 180}
+        )
+
+        self.assertEqual(
+            [airplane["id"] for airplane in res.data["results"]], [medium.id]
+        )
+
+    def test_capacity_filter_served_by_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(AIRPLANE_URL, {"capacity_gte": 100})
+
+        with connection.cursor() as cursor:
+            # the few test rows are cheaper to scan than to look up
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {queries[-1]['sql']}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+
+        self.assertIn("airplane_capacity_idx", plan)
+
     def test_retrieve_airplane_detail(self):
         airplane = sample_airplane(
             rows=10,
@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.connections import FlightGraph
+from airport.models import Airport, Flight, Route
+from airport.tests.test_airplane_view import sample_airplane
+
+CONNECTIONS_URL = reverse("airport:flight-connections")
+DAY = datetime(2024, 5, 1)
+
+
+def leg(flight_id, source, destination, departure_hour, hours):
+    departure = DAY + timedelta(hours=departure_hour)
+    return (
+        flight_id,
+        source,
+        destination,
+        departure,
+        departure + timedelta(hours=hours),
+    )
+
+
+class FlightGraphTests(TestCase):
+    def setUp(self):
+        self.graph = FlightGraph(
+            [
+                leg(1, "A", "B", 8, 2),
+                leg(2, "B", "C", 10, 2),  # 0 min connection, too short
+                leg(3, "B", "C", 11, 2),
+                leg(4, "A", "C", 9, 6),
+                leg(5, "B", "D", 11, 1),
+                leg(6, "D", "C", 13, 1),
+                leg(7, "C", "A", 14, 1),
+                leg(8, "B", "C", 20, 1),  # 8 h connection, too long
+            ]
+        )
+
+    def search(self, **kwargs):
+        return [
+            [flight[0] for flight in path]
+            for path in self.graph.itineraries(
+                ["A"], ["C"], DAY, DAY + timedelta(days=1), **kwargs
+            )
+        ]
+
+    def test_itineraries_sorted_by_arrival(self):
+        self.assertEqual(self.search(), [[1, 3], [1, 5, 6], [4]])
+
+    def test_max_stops(self):
+        self.assertEqual(self.search(max_stops=0), [[4]])
+        self.assertEqual(self.search(max_stops=1), [[1, 3], [4]])
+
+    def test_connection_time_bounds(self):
+        self.assertEqual(
+            self.search(
+                max_stops=1,
+                min_connection=timedelta(0),
+                max_connection=timedelta(hours=10),
+            ),
+            [[1, 2], [1, 3], [4], [1, 8]],
+        )
+
+
+class ConnectionsApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+
+        airplane = sample_airplane()
+        self.airports = {
+            code: Airport.objects.create(
+                name=code,
+                city="city",
+                country="country",
+                icao_code=f"X{code}",
+                iata_code=code,
+            )
+            for code in ("KBP", "WAW", "JFK")
+        }
+        self.flights = [
+            Flight.objects.create(
+                route=Route.objects.create(
+                    source=self.airports[source],
+                    destination=self.airports[destination],
+                    distance=1000,
+                ),
+                airplane=airplane,
+                departure_time=DAY + timedelta(hours=departure_hour),
+                arrival_time=DAY + timedelta(hours=departure_hour + 2),
+            )
+            for source, destination, departure_hour in (
+                ("KBP", "WAW", 8),
+                ("WAW", "JFK", 12),
+            )
+        ]
+
+    def test_connections(self):
+        res = self.client.get(
+            CONNECTIONS_URL,
+            {"source": "KBP", "destination": "jfk", "date": "2024-05-01"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["stops"], 1)
+        self.assertEqual(
+            [flight["id"] for flight in res.data[0]["flights"]],
+            [flight.id for flight in self.flights],
+        )
+
+    def test_graph_rebuilt_when_flights_change(self):
+        params = {"source": "KBP", "destination": "JFK", "date": "2024-05-01"}
+        self.client.get(CONNECTIONS_URL, params)
+
+        self.flights[1].departure_time = DAY + timedelta(hours=10, minutes=30)
+        self.flights[1].arrival_time = DAY + timedelta(hours=12, minutes=30)
+        self.flights[1].save()
+        res = self.client.get(CONNECTIONS_URL, params)
+
+        self.assertEqual(res.data, [])
+
+    def test_required_params(self):
+        res = self.client.get(CONNECTIONS_URL, {"source": "KBP"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_date_rejected(self):
+        res = self.client.get(
+            CONNECTIONS_URL,
+            {"source": "KBP", "destination": "JFK", "date": "2024-02-30"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("date", res.data)
@@ -0,0 +1,122 @@
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TransactionTestCase
+
+from airport.conflicts import find_conflicts
+from airport.models import Airplane, Airport, Flight, Order, Route, Ticket
+
+
+def generate(**options):
+    options = {
+        "airports": 20,
+        "routes": 60,
+        "airplanes": 6,
+        "crew": 30,
+        "users": 40,
+        "flights": 50,
+        "tickets": 3000,
+        "seed": 7,
+        "start": datetime(2024, 5, 1),
+        **options,
+    }
+    call_command(
+        "generate_dataset",
+        *(f"--{name}={value}" for name, value in options.items()),
+        stdout=StringIO(),
+    )
+
+
+def dataset_signature():
+    return (
+        list(Airport.objects.values_list("iata_code", "country")),
+        list(
+            Route.objects.order_by("id").values_list(
+                "source__iata_code", "destination__iata_code", "distance"
+            )
+        ),
+        list(
+            Flight.objects.order_by("id").values_list(
+                "route__source__iata_code",
+                "airplane__name",
+                "departure_time",
+                "seats_sold",
+            )
+        ),
+    )
+
+
+class GenerateDatasetTests(TransactionTestCase):
+    """Rows are COPYed through their own connection, so the data is
+    committed"""
+
+    def test_generate_dataset(self):
+        generate()
+
+        self.assertEqual(Airport.objects.count(), 20)
+        self.assertEqual(Route.objects.count(), 60)
+        self.assertEqual(Airplane.objects.count(), 6)
+        self.assertEqual(get_user_model().objects.count(), 40)
+        self.assertEqual(Flight.objects.count(), 50)
+        self.assertAlmostEqual(Ticket.objects.count(), 3000, delta=300)
+        self.assertFalse(Order.objects.filter(tickets=None).exists())
+        self.assertFalse(
+            Ticket.objects.filter(
+                row__gt=F("flight__airplane__rows")
+            ).exists()
+        )
+        self.assertFalse(
+            Route.objects.filter(source=F("destination")).exists()
+        )
+        self.assertTrue(
+            get_user_model().objects.first().check_password("passenger")
+        )
+        call_command("rebuild_seat_counters", "--check", stdout=StringIO())
+
+    def test_same_seed_generates_same_data(self):
+        generate()
+        signature = dataset_signature()
+        Airport.objects.all().delete()
+        get_user_model().objects.all().delete()
+
+        generate()
+
+        self.assertEqual(dataset_signature(), signature)
+
+    def test_new_rows_get_ids_after_generated_ones(self):
+        generate(tickets=100)
+
+        order = Order.objects.create(user=get_user_model().objects.first())
+
+        self.assertFalse(Order.objects.filter(id__gt=order.id).exists())
+
+    def test_too_many_tickets_rejected(self):
+        with self.assertRaisesMessage(CommandError, "do not fit"):
+            generate(flights=2, tickets=10000)
+
+        self.assertFalse(Airport.objects.exists())
+
+    def test_airplanes_fly_in_turns(self):
+        generate(flights=200, tickets=0)
+
+        self.assertEqual(
+            set(
+                Airplane.objects.annotate(
+                    flights_count=Count("flights")
+                ).values_list("flights_count", flat=True)
+            ),
+            {33, 34},
+        )
+
+    def test_no_airplane_or_crew_conflicts(self):
+        generate(flights=200, tickets=0)
+
+        self.assertEqual(
+            find_conflicts(datetime(2024, 1, 1), datetime(2025, 1, 1)),
+            {"airplane": [], "crew": []},
+        )
+        self.assertTrue(Flight.crew.through.objects.exists())
@@ -0,0 +1,158 @@
+import threading
+import time
+
+import psycopg2
+from django.db import connection
+from django.db.utils import load_backend
+from django.test import TestCase
+from prometheus_client import REGISTRY
+
+from airport_system.db_pool.base import close_pools, pool_stats
+from airport_system.db_pool.pool import ConnectionPool, PoolTimeout
+
+
+def backend_pid(pooled):
+    with pooled.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        return cursor.fetchone()[0]
+
+
+class ConnectionPoolTests(TestCase):
+    def make_pool(self, **options):
+        params = connection.get_connection_params()
+        pool = ConnectionPool(lambda: psycopg2.connect(**params), **options)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_connection_reused(self):
+        pool = self.make_pool()
+
+        first = pool.getconn()
+        pool.putconn(first)
+        second = pool.getconn()
+        pool.putconn(second)
+
+        self.assertIs(first, second)
+        stats = pool.get_stats()
+        self.assertEqual(stats["requests_num"], 2)
+        self.assertEqual(stats["connections_num"], 1)
+        self.assertEqual(stats["pool_available"], 1)
+
+    def test_timeout_when_all_connections_in_use(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+
+        self.assertEqual(pool.get_stats()["requests_errors"], 1)
+
+    def test_waits_for_returned_connection(self):
+        pool = self.make_pool(max_size=1, timeout=5)
+        taken = pool.getconn()
+        timer = threading.Timer(0.05, pool.putconn, [taken])
+        timer.start()
+
+        self.assertIs(pool.getconn(), taken)
+
+        timer.join()
+        stats = pool.get_stats()
+        self.assertEqual(stats["requests_waiting"], 1)
+        self.assertGreater(stats["requests_wait_ms"], 0)
+
+    def test_dead_connection_replaced(self):
+        pool = self.make_pool(check_idle=0)
+        dead = pool.getconn()
+        pool.putconn(dead)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_terminate_backend(%s)", [dead.get_backend_pid()]
+            )
+
+        alive = pool.getconn()
+
+        self.assertIsNot(alive, dead)
+        with alive.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.assertEqual(pool.get_stats()["connections_lost"], 1)
+
+    def test_connection_closed_after_max_lifetime(self):
+        pool = self.make_pool(max_lifetime=0)
+        first = pool.getconn()
+        pool.putconn(first)
+
+        self.assertTrue(first.closed)
+        self.assertIsNot(pool.getconn(), first)
+        self.assertEqual(pool.get_stats()["connections_num"], 2)
+
+    def test_idle_connections_over_min_size_expire(self):
+        pool = self.make_pool(min_size=1, max_idle=0.01)
+        connections = [pool.getconn(), pool.getconn()]
+        for taken in connections:
+            pool.putconn(taken)
+        time.sleep(0.02)
+
+        pool.getconn()
+
+        self.assertEqual(pool.get_stats()["connections_expired"], 1)
+        self.assertEqual(len(pool), 1)
+
+    def test_returned_connection_reset(self):
+        pool = self.make_pool()
+        used = pool.getconn()
+        with used.cursor() as cursor:
+            cursor.execute("SET statement_timeout = 1000")
+            cursor.execute("SELECT pg_advisory_lock(1)")
+            cursor.execute("SELECT 1")
+        pool.putconn(used)
+
+        reused = pool.getconn()
+
+        self.assertIs(reused, used)
+        with reused.cursor() as cursor:
+            cursor.execute("SHOW statement_timeout")
+            self.assertEqual(cursor.fetchone()[0], "0")
+            cursor.execute(
+                "SELECT count(*) FROM pg_locks "
+                "WHERE locktype = 'advisory' AND pid = pg_backend_pid()"
+            )
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class PooledBackendTests(TestCase):
+    def setUp(self):
+        self.addCleanup(close_pools)
+        backend = load_backend("airport_system.db_pool")
+        self.pooled = backend.DatabaseWrapper(
+            {
+                **connection.settings_dict,
+                "ENGINE": "airport_system.db_pool",
+                "POOL": {"MAX_SIZE": 2},
+            },
+            "pooled",
+        )
+        self.key = ("pooled", connection.settings_dict["NAME"])
+
+    def test_closed_connection_returned_to_pool(self):
+        first = backend_pid(self.pooled)
+        self.pooled.close()
+        second = backend_pid(self.pooled)
+        self.pooled.close()
+
+        self.assertEqual(first, second)
+        stats = pool_stats()[self.key]
+        self.assertEqual(stats["requests_num"], 2)
+        self.assertEqual(stats["connections_num"], 1)
+        self.assertEqual(stats["pool_max"], 2)
+
+    def test_pool_metrics(self):
+        backend_pid(self.pooled)
+        self.pooled.close()
+
+        labels = {"alias": "pooled", "database": self.key[1]}
+        self.assertEqual(
+            REGISTRY.get_sample_value("db_pool_requests_total", labels), 1
+        )
+        self.assertEqual(
+            REGISTRY.get_sample_value("db_pool_available", labels), 1
+        )
@@ -0,0 +1,144 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.conflicts import sweep_overlaps
+from airport.models import Crew, Flight
+from airport.tests.test_airplane_view import sample_airplane
+from airport.tests.test_seat_counters import sample_flight
+
+FLIGHT_URL = reverse("airport:flight-list")
+CONFLICTS_URL = reverse("airport:flight-conflicts")
+
+
+def flight_detail_url(flight_id):
+    return reverse("airport:flight-detail", args=[flight_id])
+
+
+class SweepOverlapsTests(TestCase):
+    def test_sweep_overlaps(self):
+        intervals = [
+            ("A", 1, 5, 1),
+            ("A", 2, 3, 2),
+            ("A", 3, 6, 3),
+            ("A", 6, 7, 4),
+            ("B", 1, 2, 5),
+            ("B", 2, 3, 6),
+        ]
+
+        self.assertEqual(
+            list(sweep_overlaps(intervals)),
+            [("A", 1, 2, 2, 3), ("A", 1, 3, 3, 5)],
+        )
+
+
+class FlightOverlapTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "password", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.crew = Crew.objects.create(first_name="Jane", last_name="Doe")
+        self.flight = sample_flight(
+            departure_time=datetime(2024, 5, 1, 10),
+            arrival_time=datetime(2024, 5, 1, 12),
+        )
+        self.flight.crew.add(self.crew)
+
+    def payload(self, **params):
+        payload = {
+            "route": self.flight.route_id,
+            "airplane": self.flight.airplane_id,
+            "crew": [],
+            "departure_time": "2024-05-01T11:00:00",
+            "arrival_time": "2024-05-01T13:00:00",
+        }
+        payload.update(params)
+        return payload
+
+    def test_airplane_double_booking_rejected(self):
+        res = self.client.post(FLIGHT_URL, self.payload(), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("airplane", res.data)
+
+    def test_crew_double_booking_rejected(self):
+        res = self.client.post(
+            FLIGHT_URL,
+            self.payload(airplane=sample_airplane().id, crew=[self.crew.id]),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("crew", res.data)
+
+    def test_back_to_back_flights_allowed(self):
+        res = self.client.post(
+            FLIGHT_URL,
+            self.payload(
+                crew=[self.crew.id],
+                departure_time="2024-05-01T12:00:00",
+                arrival_time="2024-05-01T14:00:00",
+            ),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_update_does_not_conflict_with_itself(self):
+        res = self.client.patch(
+            flight_detail_url(self.flight.id),
+            {"arrival_time": "2024-05-01T12:30:00"},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_arrival_before_departure_rejected(self):
+        res = self.client.post(
+            FLIGHT_URL,
+            self.payload(
+                departure_time="2024-05-02T12:00:00",
+                arrival_time="2024-05-02T10:00:00",
+            ),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_database_rejects_airplane_overlap(self):
+        with self.assertRaises(IntegrityError):
+            Flight.objects.create(
+                route=self.flight.route,
+                airplane=self.flight.airplane,
+                departure_time=datetime(2024, 5, 1, 11),
+                arrival_time=datetime(2024, 5, 1, 13),
+            )
+
+    def test_conflicts_report(self):
+        other = Flight.objects.create(
+            route=self.flight.route,
+            airplane=sample_airplane(),
+            departure_time=datetime(2024, 5, 1, 11),
+            arrival_time=datetime(2024, 5, 1, 13),
+        )
+        other.crew.add(self.crew)
+
+        res = self.client.get(
+            CONFLICTS_URL, {"date_from": "2024-05-01", "date_to": "2024-05-02"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["airplane"], [])
+        self.assertEqual(len(res.data["crew"]), 1)
+        self.assertEqual(res.data["crew"][0]["crew"], self.crew.id)
+        self.assertEqual(
+            res.data["crew"][0]["flights"], [self.flight.id, other.id]
+        )
@@ -0,0 +1,122 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+
+from airport.models import Airport, Flight, Route
+from airport.tests.test_seat_counters import sample_flight
+from airport.views import FlightViewSet
+
+FLIGHT_URL = reverse("airport:flight-list")
+
+
+def flight_list_queryset(**params):
+    request = Request(APIRequestFactory().get(FLIGHT_URL, params))
+    return FlightViewSet(action="list", request=request).get_queryset()
+
+
+class FlightSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+
+        self.flight = sample_flight(
+            departure_time=datetime(2024, 5, 1, 23, 30),
+            arrival_time=datetime(2024, 5, 2, 1, 30),
+        )
+        other_airport = Airport.objects.create(
+            name="Other",
+            city="city",
+            country="country",
+            icao_code="OTHR",
+            iata_code="OTH",
+        )
+        self.other_flight = Flight.objects.create(
+            route=Route.objects.create(
+                source=other_airport,
+                destination=self.flight.route.destination,
+                distance=500,
+            ),
+            airplane=self.flight.airplane,
+            departure_time=datetime(2024, 5, 2, 8),
+            arrival_time=datetime(2024, 5, 2, 10),
+        )
+
+    def search(self, **params):
+        res = self.client.get(FLIGHT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [flight["id"] for flight in res.data["results"]]
+
+    def test_filter_by_airport_codes_and_id(self):
+        self.assertEqual(self.search(source="src"), [self.flight.id])
+        self.assertEqual(self.search(source="OTHR"), [self.other_flight.id])
+        self.assertEqual(
+            self.search(destination=self.flight.route.destination_id),
+            [self.flight.id, self.other_flight.id],
+        )
+
+    def test_filter_by_date_uses_whole_day(self):
+        self.assertEqual(self.search(date="2024-05-01"), [self.flight.id])
+        self.assertEqual(self.search(date="2024-05-02"), [self.other_flight.id])
+
+    def test_filter_by_departure_window(self):
+        self.assertEqual(
+            self.search(
+                departure_after="2024-05-02T00:00",
+                departure_before="2024-05-02T12:00",
+            ),
+            [self.other_flight.id],
+        )
+
+    def test_filter_by_min_seats(self):
+        Flight.objects.filter(pk=self.flight.pk).update(seats_sold=38)
+
+        self.assertEqual(self.search(min_seats=3), [self.other_flight.id])
+
+    def test_invalid_params_rejected(self):
+        for params in (
+            {"source": "TOOLONG"},
+            {"date": "yesterday"},
+            {"date": "2024-13-45"},
+            {"departure_after": "2024-04-01T25:00"},
+        ):
+            res = self.client.get(FLIGHT_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+
+class FlightSearchPlanTests(TestCase):
+    """The search predicates must be able to use the indexes; sequential
+    scans are disabled so the planner picks an index whenever it can"""
+
+    def setUp(self):
+        sample_flight()
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_date_filter_uses_departure_index(self):
+        plan = flight_list_queryset(date="2024-04-01").explain()
+
+        self.assertIn("flight_departure_time_id_idx", plan)
+
+    def test_route_search_uses_composite_indexes(self):
+        plan = flight_list_queryset(
+            source="SRC",
+            destination="DEST",
+            departure_after="2024-04-01T00:00",
+            departure_before="2024-04-02T00:00",
+        ).explain()
+
+        self.assertIn("airport_iata_code_idx", plan)
+        self.assertIn("airport_icao_code_idx", plan)
+        self.assertIn("flight_route_departure_idx", plan)
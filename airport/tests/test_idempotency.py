@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import IdempotencyKey, Order, Ticket
+from airport.tests.test_order_view import order_payload
+from airport.tests.test_seat_counters import sample_flight
+
+ORDER_URL = reverse("airport:order-list")
+
+
+class IdempotentOrderTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def order(self, seats, key="order-1"):
+        return self.client.post(
+            ORDER_URL,
+            order_payload(self.flight, seats),
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_repeated_request_replays_response(self):
+        first = self.order([(1, 1), (1, 2)])
+        second = self.order([(1, 1), (1, 2)])
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_sold, 2)
+
+    def test_key_reused_for_other_request(self):
+        self.order([(1, 1)])
+
+        res = self.order([(1, 2)])
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_failed_request_is_not_stored(self):
+        res = self.order([(11, 1)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_expired_key_runs_request_again(self):
+        self.order([(1, 1)])
+        Ticket.objects.all().delete()
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        )
+
+        res = self.order([(1, 1)])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", res)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_purge_expired_keys(self):
+        self.order([(1, 1)], key="old")
+        self.order([(1, 2)], key="new")
+        IdempotencyKey.objects.filter(key="old").update(
+            created_at=timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        )
+
+        call_command("purge_idempotency_keys", stdout=StringIO())
+
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list("key", flat=True)),
+            ["new"],
+        )
+
+
+class ConcurrentIdempotentOrderTests(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.flight = sample_flight()
+
+    def order(self, _):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return client.post(
+                ORDER_URL,
+                {"flight": self.flight.id, "passengers": 2},
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="retry-storm",
+            ).data
+        finally:
+            connections.close_all()
+
+    def test_concurrent_duplicates_create_one_order(self):
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            responses = list(executor.map(self.order, range(6)))
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(
+            {response["id"] for response in responses},
+            {Order.objects.get().id},
+        )
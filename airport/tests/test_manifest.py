@@ -0,0 +1,100 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import Order, Ticket
+from airport.tests.test_seat_counters import sample_flight
+
+
+def manifest_url(flight_id):
+    return reverse("airport:flight-manifest", args=[flight_id])
+
+
+class FlightManifestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            "admin@test.com",
+            "testpass",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.admin)
+        self.flight = sample_flight()
+        passenger = get_user_model().objects.create_user(
+            "passenger@test.com",
+            "testpass",
+            first_name="Ann",
+            last_name="Lee",
+        )
+        self.order = Order.objects.create(user=passenger)
+        for row, seat in ((2, 1), (1, 3)):
+            Ticket.objects.create(
+                row=row, seat=seat, flight=self.flight, order=self.order
+            )
+
+    def test_manifest_csv(self):
+        res = self.client.get(manifest_url(self.flight.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "text/csv")
+        self.assertEqual(
+            b"".join(res.streaming_content).decode().splitlines(),
+            [
+                "row,seat,order,email,first_name,last_name",
+                f"1,3,{self.order.id},passenger@test.com,Ann,Lee",
+                f"2,1,{self.order.id},passenger@test.com,Ann,Lee",
+            ],
+        )
+
+    def test_manifest_jsonl(self):
+        res = self.client.get(
+            manifest_url(self.flight.id), {"output": "jsonl"}
+        )
+
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            json.loads(lines[0]),
+            {
+                "row": 1,
+                "seat": 3,
+                "order": self.order.id,
+                "email": "passenger@test.com",
+                "first_name": "Ann",
+                "last_name": "Lee",
+            },
+        )
+
+    def test_csv_header_is_sent_before_query(self):
+        res = self.client.get(manifest_url(self.flight.id))
+        content = iter(res.streaming_content)
+
+        with CaptureQueriesContext(connection) as queries:
+            header = next(content)
+        rest = b"".join(content)
+
+        self.assertEqual(
+            header, b"row,seat,order,email,first_name,last_name\r\n"
+        )
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(len(rest.splitlines()), 2)
+
+    def test_unknown_output_rejected(self):
+        res = self.client.get(manifest_url(self.flight.id), {"output": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_manifest_staff_only(self):
+        self.client.force_authenticate(self.order.user)
+
+        res = self.client.get(manifest_url(self.flight.id))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,223 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from rest_framework.throttling import UserRateThrottle
+from rest_framework import status
+
+from airport.models import Ticket
+from airport.tests.test_seat_counters import sample_flight
+
+FLIGHT_URL = reverse("airport:flight-list")
+ORDER_URL = reverse("airport:order-list")
+METRICS_URL = reverse("metrics")
+
+# increments the booking conflicts counter in a separate worker process
+WORKER_SCRIPT = """
+import django
+django.setup()
+from airport_system.metrics import BOOKING_CONFLICTS
+BOOKING_CONFLICTS.inc()
+"""
+
+
+def sample_value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def login_staff(self):
+        # /metrics is a plain Django view, it sees the session user only
+        self.client.force_login(
+            get_user_model().objects.create_user(
+                "staff@test.com", "testpass", is_staff=True
+            )
+        )
+
+    def test_request_metrics_labelled_by_action(self):
+        sample_flight()
+        labels = {"view": "FlightViewSet.list"}
+        requests = sample_value(
+            "http_request_duration_seconds_count",
+            method="GET",
+            status="200",
+            **labels,
+        )
+        queries = sample_value("db_queries_per_request_sum", **labels)
+        serialized = sample_value(
+            "serializer_duration_seconds_count",
+            serializer="FlightListSerializer[]",
+        )
+
+        self.client.get(FLIGHT_URL)
+
+        self.assertEqual(
+            sample_value(
+                "http_request_duration_seconds_count",
+                method="GET",
+                status="200",
+                **labels,
+            ),
+            requests + 1,
+        )
+        self.assertEqual(
+            sample_value("db_queries_per_request_sum", **labels), queries + 3
+        )
+        self.assertEqual(
+            sample_value(
+                "serializer_duration_seconds_count",
+                serializer="FlightListSerializer[]",
+            ),
+            serialized + 1,
+        )
+        self.assertGreater(
+            sample_value("http_response_size_bytes_sum", **labels), 0
+        )
+
+    def test_serializer_output_timed_by_renderer(self):
+        flight = sample_flight()
+        rendered = sample_value(
+            "serializer_duration_seconds_count",
+            serializer="FlightDetailSerializer",
+        )
+
+        self.client.get(reverse("airport:flight-detail", args=[flight.id]))
+
+        self.assertEqual(
+            sample_value(
+                "serializer_duration_seconds_count",
+                serializer="FlightDetailSerializer",
+            ),
+            rendered + 1,
+        )
+        # serializers are left as DRF defines them
+        self.assertEqual(
+            serializers.BaseSerializer.data.fget.__module__,
+            "rest_framework.serializers",
+        )
+
+    def test_throttled_requests_counted(self):
+        throttled = sample_value(
+            "throttled_requests_total", view="FlightViewSet.list"
+        )
+
+        with mock.patch.object(
+            UserRateThrottle, "THROTTLE_RATES", {"user": "1/day"}
+        ):
+            self.client.get(FLIGHT_URL)
+            res = self.client.get(FLIGHT_URL)
+        cache.clear()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(
+            sample_value("throttled_requests_total", view="FlightViewSet.list"),
+            throttled + 1,
+        )
+
+    def test_booking_conflicts_counted(self):
+        flight = sample_flight()
+        conflicts = sample_value("booking_conflicts_total")
+
+        with mock.patch.object(
+            Ticket.objects, "bulk_create", side_effect=IntegrityError
+        ):
+            res = self.client.post(
+                ORDER_URL,
+                {"tickets": [{"row": 1, "seat": 1, "flight": flight.id}]},
+                format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            sample_value("booking_conflicts_total"), conflicts + 1
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get(FLIGHT_URL)
+        self.login_staff()
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            b'http_request_duration_seconds_bucket{le="0.005",'
+            b'method="GET",status="200",view="FlightViewSet.list"}',
+            res.content,
+        )
+
+    def test_metrics_staff_only_without_token(self):
+        self.assertEqual(
+            APIClient().get(METRICS_URL).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.client.get(METRICS_URL).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        with override_settings(DEBUG=True):
+            self.assertEqual(
+                self.client.get(METRICS_URL).status_code,
+                status.HTTP_200_OK,
+            )
+        self.login_staff()
+        self.assertEqual(
+            self.client.get(METRICS_URL).status_code, status.HTTP_200_OK
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        self.assertEqual(
+            self.client.get(METRICS_URL).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.assertEqual(
+            self.client.get(
+                METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+            ).status_code,
+            status.HTTP_200_OK,
+        )
+
+    def test_metrics_of_worker_processes_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "PROMETHEUS_MULTIPROC_DIR": directory,
+                "DJANGO_SETTINGS_MODULE": "airport_system.settings",
+            }
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, "-c", WORKER_SCRIPT],
+                    env=env,
+                    cwd=settings.BASE_DIR,
+                    check=True,
+                )
+
+            self.login_staff()
+            with mock.patch.dict(
+                os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory}
+            ):
+                res = self.client.get(METRICS_URL)
+
+        self.assertIn(b"booking_conflicts_total 2.0", res.content)
@@ -0,0 +1,240 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import Flight, Order, Ticket
+from airport.tests.test_seat_counters import sample_flight
+
+ORDER_URL = reverse("airport:order-list")
+
+
+def order_payload(flight, seats):
+    return {
+        "tickets": [
+            {"row": row, "seat": seat, "flight": flight.id}
+            for row, seat in seats
+        ]
+    }
+
+
+class OrderCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def test_group_order_query_count_does_not_grow(self):
+        with CaptureQueriesContext(connection) as single:
+            res = self.client.post(
+                ORDER_URL,
+                order_payload(self.flight, [(1, 1)]),
+                format="json",
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        group_seats = [(row, seat) for row in (2, 3, 4) for seat in (1, 2, 3)]
+        with CaptureQueriesContext(connection) as group:
+            res = self.client.post(
+                ORDER_URL,
+                order_payload(self.flight, group_seats),
+                format="json",
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(group), len(single))
+        self.assertLessEqual(len(group), 12)
+        self.assertEqual(Ticket.objects.count(), 10)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_sold, 10)
+
+    def test_taken_seat_rejected(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=self.flight, order=order)
+
+        res = self.client.post(
+            ORDER_URL,
+            order_payload(self.flight, [(1, 1), (1, 2)]),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_repeated_seat_rejected(self):
+        res = self.client.post(
+            ORDER_URL,
+            order_payload(self.flight, [(1, 1), (1, 1)]),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_seat_out_of_airplane_range_rejected(self):
+        res = self.client.post(
+            ORDER_URL,
+            order_payload(self.flight, [(11, 1)]),
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_non_scalar_flight_rejected(self):
+        for flight in ([self.flight.id], {}):
+            res = self.client.post(
+                ORDER_URL,
+                {"tickets": [{"row": 1, "seat": 1, "flight": flight}]},
+                format="json",
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("flight", res.data["tickets"][0])
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+        self.return_flight = Flight.objects.create(
+            route=self.flight.route,
+            airplane=self.flight.airplane,
+            departure_time=self.flight.arrival_time,
+            arrival_time="2024-04-01T18:00:00",
+        )
+
+    def create_orders(self, orders, tickets_per_order):
+        for _ in range(orders):
+            order = Order.objects.create(user=self.user)
+            row = Order.objects.count()
+            for seat in range(1, tickets_per_order + 1):
+                Ticket.objects.create(
+                    row=row,
+                    seat=seat,
+                    flight=self.return_flight if seat % 2 else self.flight,
+                    order=order,
+                )
+
+    def count_list_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ORDER_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_list_queries_do_not_grow_with_orders(self):
+        self.create_orders(orders=1, tickets_per_order=1)
+        few = self.count_list_queries()
+        expanded_few = self.count_list_queries({"expand": "flight"})
+
+        self.create_orders(orders=6, tickets_per_order=4)
+
+        self.assertEqual(self.count_list_queries(), few)
+        self.assertEqual(
+            self.count_list_queries({"expand": "flight"}), expanded_few
+        )
+        self.assertLessEqual(few, 3)
+
+    def test_list_expanded_flight(self):
+        self.create_orders(orders=1, tickets_per_order=1)
+
+        res = self.client.get(ORDER_URL, {"expand": "flight"})
+
+        flight = res.data["results"][0]["tickets"][0]["flight"]
+        self.assertEqual(flight["route_source"], "Source")
+        self.assertEqual(flight["route_destination"], "Destination")
+        self.assertIn("departure_time", flight)
+
+    def test_list_only_own_orders(self):
+        Order.objects.create(
+            user=get_user_model().objects.create_user("other@test.com", "pass")
+        )
+
+        res = self.client.get(ORDER_URL)
+
+        self.assertEqual(res.data["count"], 0)
+
+
+class OrderAutoAssignTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def test_auto_assign_contiguous_seats(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=2, flight=self.flight, order=order)
+
+        res = self.client.post(
+            ORDER_URL,
+            {"flight": self.flight.id, "passengers": 3},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        seats = [
+            (ticket["row"], ticket["seat"]) for ticket in res.data["tickets"]
+        ]
+        self.assertEqual(seats, [(2, 1), (2, 2), (2, 3)])
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_sold, 4)
+
+    def test_auto_assign_not_enough_seats(self):
+        res = self.client.post(
+            ORDER_URL,
+            {"flight": self.flight.id, "passengers": 41},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+
+class ConcurrentAutoAssignTests(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.flight = sample_flight()
+
+    def book(self, passengers):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return client.post(
+                ORDER_URL,
+                {"flight": self.flight.id, "passengers": passengers},
+                format="json",
+            ).status_code
+        finally:
+            connections.close_all()
+
+    def test_concurrent_group_bookings_do_not_overlap(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = list(executor.map(self.book, [3] * 12))
+
+        self.assertEqual(statuses.count(status.HTTP_201_CREATED), 12)
+        self.assertEqual(Ticket.objects.count(), 36)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_sold, 36)
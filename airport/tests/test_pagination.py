@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import Flight, Order
+from airport.tests.test_seat_counters import sample_flight
+
+FLIGHT_URL = reverse("airport:flight-list")
+ORDER_URL = reverse("airport:order-list")
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+
+        flight = sample_flight()
+        departure = datetime(2024, 5, 1, 10)
+        for hours in range(0, 42, 3):
+            Flight.objects.create(
+                route=flight.route,
+                airplane=flight.airplane,
+                departure_time=departure + timedelta(hours=hours),
+                arrival_time=departure + timedelta(hours=hours + 2),
+            )
+
+    def collect_pages(self, url, params):
+        ids = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", res.data)
+            ids.extend(item["id"] for item in res.data["results"])
+            if not res.data["next"]:
+                return ids
+            res = self.client.get(res.data["next"])
+
+    def test_page_number_pagination_is_default(self):
+        res = self.client.get(FLIGHT_URL)
+
+        self.assertEqual(res.data["count"], 15)
+        self.assertEqual(len(res.data["results"]), 10)
+
+    def test_flights_cursor_pagination(self):
+        ids = self.collect_pages(FLIGHT_URL, {"pagination": "cursor"})
+
+        expected = list(
+            Flight.objects.order_by("departure_time", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_orders_cursor_pagination(self):
+        for _ in range(12):
+            Order.objects.create(user=self.user)
+
+        ids = self.collect_pages(ORDER_URL, {"pagination": "cursor"})
+
+        expected = list(
+            Order.objects.order_by("created_at", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
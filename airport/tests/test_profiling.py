@@ -0,0 +1,139 @@
+import pstats
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport.tests.test_seat_counters import sample_flight
+
+FLIGHT_URL = reverse("airport:flight-list")
+PROFILE_URL = reverse("profile-list")
+
+
+def detail_url(profile_id):
+    return reverse("profile-detail", args=[profile_id])
+
+
+def download_url(profile_id):
+    return reverse("profile-download", args=[profile_id])
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(PROFILING_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+        # the middleware authenticates the token before DRF does
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        sample_flight()
+
+    def test_staff_request_with_header_profiled(self):
+        res = self.client.get(FLIGHT_URL, HTTP_X_PROFILE="1")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        profile = self.client.get(detail_url(res["X-Profile-Id"])).data
+        self.assertEqual(profile["trigger"], "header")
+        self.assertEqual(profile["path"], FLIGHT_URL)
+        self.assertEqual(profile["status"], 200)
+        self.assertEqual(profile["user"], "admin@admin.com")
+        self.assertEqual(profile["sql_count"], len(profile["sql"]))
+        self.assertTrue(
+            any(
+                statement["plan"] and "Scan" in statement["plan"]
+                for statement in profile["sql"]
+            )
+        )
+        self.assertTrue(profile["functions"])
+
+    def test_profile_list_and_download(self):
+        profile_id = self.client.get(FLIGHT_URL, HTTP_X_PROFILE="1")[
+            "X-Profile-Id"
+        ]
+
+        profiles = self.client.get(PROFILE_URL).data
+        res = self.client.get(download_url(profile_id))
+
+        self.assertEqual([profile["id"] for profile in profiles], [profile_id])
+        self.assertNotIn("sql", profiles[0])
+        self.assertIn("attachment", res["Content-Disposition"])
+        with tempfile.NamedTemporaryFile(suffix=".prof") as file:
+            file.write(b"".join(res.streaming_content))
+            file.flush()
+            self.assertGreater(pstats.Stats(file.name).total_calls, 0)
+
+    def test_header_of_non_staff_ignored(self):
+        user = get_user_model().objects.create_user("test@test.com", "pass")
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+        )
+
+        res = self.client.get(FLIGHT_URL, HTTP_X_PROFILE="1")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.has_header("X-Profile-Id"))
+        self.assertEqual(
+            self.client.get(PROFILE_URL).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+
+    def test_not_profiled_by_default(self):
+        res = self.client.get(FLIGHT_URL)
+
+        self.assertFalse(res.has_header("X-Profile-Id"))
+        self.assertEqual(self.client.get(PROFILE_URL).data, [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_request_profiled(self):
+        self.client.credentials()
+
+        res = self.client.get(FLIGHT_URL)
+
+        self.client.force_authenticate(self.user)
+        profile = self.client.get(detail_url(res["X-Profile-Id"])).data
+        self.assertEqual(profile["trigger"], "sample")
+        self.assertIsNone(profile["user"])
+
+    @override_settings(PROFILING_KEEP=2)
+    def test_oldest_profiles_deleted(self):
+        profile_ids = [
+            self.client.get(FLIGHT_URL, HTTP_X_PROFILE="1")["X-Profile-Id"]
+            for _ in range(3)
+        ]
+
+        profiles = self.client.get(PROFILE_URL).data
+
+        self.assertEqual(
+            [profile["id"] for profile in profiles], profile_ids[:0:-1]
+        )
+        self.assertEqual(
+            self.client.get(download_url(profile_ids[0])).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    def test_profiles_in_schema_without_warnings(self):
+        schema = StringIO()
+
+        call_command(
+            "spectacular", "--fail-on-warn", stdout=schema, stderr=StringIO()
+        )
+
+        for operation_id in (
+            "profiles_list", "profiles_retrieve", "profiles_download"
+        ):
+            self.assertIn(f"operationId: {operation_id}\n", schema.getvalue())
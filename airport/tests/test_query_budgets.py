@@ -0,0 +1,369 @@
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+from urllib.parse import urlparse
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, resolve, reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport.models import (
+    AirplaneType,
+    Airport,
+    Crew,
+    Flight,
+    FlightSchedule,
+    Order,
+    Route,
+    SeatHold,
+    Ticket,
+)
+from airport.views import CrewViewSet
+from airport.tests.test_airplane_view import sample_airplane
+from airport.tests.test_seat_counters import sample_flight
+from airport_system.middleware import QueryStats, query_budget
+
+DATASET_SIZES = (1, 100)
+DEPARTURE = datetime(2024, 4, 1, 11)
+
+
+def flights_on(flight, count):
+    """Flight and count - 1 more flights of its route and airplane"""
+    return [flight] + [
+        Flight.objects.create(
+            route=flight.route,
+            airplane=flight.airplane,
+            departure_time=DEPARTURE + timedelta(days=number),
+            arrival_time=DEPARTURE + timedelta(days=number, hours=2),
+        )
+        for number in range(1, count)
+    ]
+
+
+def crew(count):
+    return Crew.objects.bulk_create(
+        Crew(first_name=f"First {number}", last_name="Last")
+        for number in range(count)
+    )
+
+
+def budgeted_actions():
+    """(view class name, action) of every query_budgets entry of views
+    routed in the project"""
+
+    def callbacks(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from callbacks(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern):
+                yield pattern.callback
+
+    actions = set()
+    for callback in callbacks(get_resolver().url_patterns):
+        view_class = getattr(callback, "cls", None)
+        budgets = getattr(view_class, "query_budgets", None)
+        if not budgets:
+            continue
+        # plain API views are budgeted by HTTP method
+        names = getattr(callback, "actions", None) or {
+            method: method for method in budgets
+        }
+        actions.update(
+            (view_class.__name__, name)
+            for name in names.values()
+            if name in budgets
+        )
+    return actions
+
+
+class QueryBudgetTests(TestCase):
+    """Every endpoint with a query budget stays within it with 1 and with
+    100 items to list, so queries repeated per item fail the suite"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        # authenticated with a real token, its user lookup is counted
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def assert_within_budget(self, dataset):
+        """dataset(size) creates size items and returns the URL to get"""
+        counts = []
+        for size in DATASET_SIZES:
+            with transaction.atomic():
+                url = dataset(size)
+                budget = query_budget(resolve(urlparse(url).path).func, "GET")
+                self.assertIsNotNone(budget, f"{url} has no query budget")
+                with CaptureQueriesContext(connection) as queries:
+                    res = self.client.get(url)
+                transaction.set_rollback(True)
+
+            self.assertEqual(res.status_code, 200, res.content)
+            self.assertLessEqual(
+                len(queries),
+                budget,
+                f"{url} with {size} item(s) ran {len(queries)} queries: "
+                + "\n".join(query["sql"] for query in queries),
+            )
+            counts.append(len(queries))
+        self.assertEqual(
+            counts[0], counts[-1], f"{url} queries grow with items"
+        )
+
+    def test_crew_list(self):
+        def dataset(size):
+            crew(size)
+            return reverse("airport:crew-list")
+
+        self.assert_within_budget(dataset)
+
+    def test_airport_list(self):
+        def dataset(size):
+            Airport.objects.bulk_create(
+                Airport(name=f"Airport {number}", city="City", country="C")
+                for number in range(size)
+            )
+            return reverse("airport:airport-list")
+
+        self.assert_within_budget(dataset)
+
+    def test_airplane_type_list(self):
+        def dataset(size):
+            AirplaneType.objects.bulk_create(
+                AirplaneType(name=f"Type {number}") for number in range(size)
+            )
+            return reverse("airport:airplanetype-list")
+
+        self.assert_within_budget(dataset)
+
+    def test_airplane_list(self):
+        def dataset(size):
+            for number in range(size):
+                sample_airplane(name=f"Airplane {number}")
+            return reverse("airport:airplane-list")
+
+        self.assert_within_budget(dataset)
+
+    def test_airplane_detail(self):
+        def dataset(size):
+            return reverse(
+                "airport:airplane-detail", args=[sample_airplane().id]
+            )
+
+        self.assert_within_budget(dataset)
+
+    def test_route_list(self):
+        def dataset(size):
+            route = sample_flight().route
+            Route.objects.bulk_create(
+                Route(
+                    source=route.destination,
+                    destination=route.source,
+                    distance=number + 1,
+                )
+                for number in range(size - 1)
+            )
+            return reverse("airport:route-list")
+
+        self.assert_within_budget(dataset)
+
+    def test_route_detail(self):
+        def dataset(size):
+            flight = flights_on(sample_flight(), size)[0]
+            return reverse("airport:route-detail", args=[flight.route_id])
+
+        self.assert_within_budget(dataset)
+
+    def test_flight_list(self):
+        def dataset(size):
+            members = crew(2)
+            for flight in flights_on(sample_flight(), size):
+                flight.crew.set(members)
+            return reverse("airport:flight-list")
+
+        self.assert_within_budget(dataset)
+
+    def test_flight_detail(self):
+        def dataset(size):
+            flight = sample_flight()
+            flight.crew.set(crew(size))
+            return reverse("airport:flight-detail", args=[flight.id])
+
+        self.assert_within_budget(dataset)
+
+    def test_flight_seats(self):
+        def dataset(size):
+            flight = sample_flight(
+                airplane=sample_airplane(rows=25, seats_in_row=4)
+            )
+            order = Order.objects.create(user=self.user)
+            Ticket.objects.bulk_create(
+                Ticket(
+                    flight=flight,
+                    order=order,
+                    row=number // 4 + 1,
+                    seat=number % 4 + 1,
+                )
+                for number in range(size)
+            )
+            return reverse("airport:flight-seats", args=[flight.id])
+
+        self.assert_within_budget(dataset)
+
+    def test_flight_schedule_list(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        def dataset(size):
+            flight = sample_flight()
+            members = crew(2)
+            for number in range(size):
+                schedule = FlightSchedule.objects.create(
+                    route=flight.route,
+                    airplane=flight.airplane,
+                    days_of_week="135",
+                    departure_time=time(10),
+                    duration=timedelta(hours=2),
+                    valid_from=date(2024, 5, 1),
+                    valid_until=date(2024, 6, 1),
+                )
+                schedule.crew.set(members)
+            return reverse("airport:flightschedule-list")
+
+        self.assert_within_budget(dataset)
+
+    def order_dataset(self, size):
+        """size orders of the user with two tickets each"""
+        flights = flights_on(sample_flight(), size)
+        for number, flight in enumerate(flights):
+            order = Order.objects.create(user=self.user)
+            Ticket.objects.bulk_create(
+                Ticket(flight=flight, order=order, row=1, seat=seat)
+                for seat in (1, 2)
+            )
+
+    def test_order_list(self):
+        def dataset(size):
+            self.order_dataset(size)
+            return reverse("airport:order-list")
+
+        self.assert_within_budget(dataset)
+
+    def test_order_list_expanded(self):
+        def dataset(size):
+            self.order_dataset(size)
+            return reverse("airport:order-list") + "?expand=flight"
+
+        self.assert_within_budget(dataset)
+
+    def test_seat_hold_list(self):
+        def dataset(size):
+            flight = sample_flight(
+                airplane=sample_airplane(rows=25, seats_in_row=4)
+            )
+            SeatHold.objects.bulk_create(
+                SeatHold(
+                    flight=flight,
+                    user=self.user,
+                    row=number // 4 + 1,
+                    seat=number % 4 + 1,
+                    expires_at=timezone.now() + timedelta(minutes=10),
+                )
+                for number in range(size)
+            )
+            return reverse("airport:seathold-list")
+
+        self.assert_within_budget(dataset)
+
+    def test_me(self):
+        def dataset(size):
+            return reverse("user:manage")
+
+        self.assert_within_budget(dataset)
+
+    def test_my_orders(self):
+        def dataset(size):
+            self.order_dataset(size)
+            return reverse("user:manage-orders") + "?expand=flight"
+
+        self.assert_within_budget(dataset)
+
+    def test_every_budget_is_tested(self):
+        self.assertEqual(
+            budgeted_actions(),
+            {
+                ("CrewViewSet", "list"),
+                ("AirportViewSet", "list"),
+                ("AirplaneTypeViewSet", "list"),
+                ("AirplaneViewSet", "list"),
+                ("AirplaneViewSet", "retrieve"),
+                ("RouteViewSet", "list"),
+                ("RouteViewSet", "retrieve"),
+                ("FlightViewSet", "list"),
+                ("FlightViewSet", "retrieve"),
+                ("FlightViewSet", "seats"),
+                ("FlightScheduleViewSet", "list"),
+                ("OrderViewSet", "list"),
+                ("SeatHoldViewSet", "list"),
+                ("ManageUserView", "retrieve"),
+                ("UserOrderListView", "get"),
+            },
+        )
+
+
+class QueryStatsMiddlewareTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+
+    @override_settings(QUERY_STATS_HEADERS=True)
+    def test_headers(self):
+        crew(3)
+
+        res = self.client.get(reverse("airport:crew-list"))
+
+        self.assertEqual(res["X-DB-Query-Count"], "1")
+        self.assertEqual(res["X-DB-Query-Budget"], "2")
+        self.assertGreaterEqual(float(res["X-DB-Query-Time-Ms"]), 0)
+        self.assertFalse(res.has_header("X-DB-Duplicate-Queries"))
+
+    @override_settings(QUERY_STATS_HEADERS=True)
+    def test_budget_overrun_logged(self):
+        crew(3)
+
+        with mock.patch.object(CrewViewSet, "query_budgets", {"list": 0}):
+            with self.assertLogs("airport_system.middleware") as logs:
+                self.client.get(reverse("airport:crew-list"))
+
+        self.assertIn("ran 1 queries, its budget is 0", logs.output[0])
+
+    def test_headers_disabled_by_default(self):
+        res = self.client.get(reverse("airport:crew-list"))
+
+        self.assertFalse(res.has_header("X-DB-Query-Count"))
+
+    def test_repeated_statements_share_fingerprint(self):
+        with QueryStats().record() as stats:
+            for number in range(3):
+                list(Crew.objects.filter(first_name=f"First {number}"))
+            list(Crew.objects.filter(id__in=[1, 2]))
+            list(Crew.objects.filter(id__in=[1, 2, 3]))
+
+        self.assertEqual(stats.count, 5)
+        self.assertEqual(
+            [count for _, count in stats.duplicates], [3, 2]
+        )
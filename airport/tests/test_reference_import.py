@@ -0,0 +1,229 @@
+import json
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.imports import ReferenceImport
+from airport.models import Airport, Flight, Route
+from airport.tests.test_airplane_view import sample_airplane
+
+AIRPORT_IMPORT_URL = reverse("airport:airport-import-data")
+ROUTE_IMPORT_URL = reverse("airport:route-import-data")
+FLIGHT_IMPORT_URL = reverse("airport:flight-import-data")
+
+AIRPORTS_CSV = """name,city,country,airport_type,icao_code,iata_code
+Boryspil,Kyiv,Ukraine,,UKBB,KBP
+Lviv,Lviv,Ukraine,civilian,ukll,lwo
+Broken,Nowhere,Nowhere,spaceport,XXXX,XXX
+"""
+
+
+class ReferenceImportTests(TransactionTestCase):
+    """Rows are merged through their own connection, so the data is
+    committed"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "admin@test.com",
+                "testpass",
+                is_staff=True,
+            )
+        )
+
+    def upload(self, url, name, content, **params):
+        return self.client.post(
+            f"{url}?{'&'.join(f'{k}={v}' for k, v in params.items())}",
+            {"file": SimpleUploadedFile(name, content.encode())},
+            format="multipart",
+        )
+
+    def test_import_airports_csv(self):
+        res = self.upload(AIRPORT_IMPORT_URL, "airports.csv", AIRPORTS_CSV)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["rows"], 3)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(res.data["failed"], 1)
+        self.assertEqual(res.data["errors"][0]["line"], 4)
+        self.assertIn("airport_type", res.data["errors"][0]["errors"])
+        lviv = Airport.objects.get(icao_code="UKLL")
+        self.assertEqual(lviv.iata_code, "LWO")
+        self.assertEqual(
+            Airport.objects.get(icao_code="UKBB").airport_type, "civilian"
+        )
+
+    def test_reimport_updates_changed_airports_only(self):
+        self.upload(AIRPORT_IMPORT_URL, "airports.csv", AIRPORTS_CSV)
+
+        res = self.upload(
+            AIRPORT_IMPORT_URL,
+            "airports.csv",
+            AIRPORTS_CSV.replace("Boryspil,", "Boryspil International,"),
+        )
+
+        self.assertEqual(
+            (res.data["created"], res.data["updated"], res.data["unchanged"]),
+            (0, 1, 1),
+        )
+        self.assertEqual(Airport.objects.count(), 2)
+        self.assertTrue(
+            Airport.objects.filter(name="Boryspil International").exists()
+        )
+
+    def test_import_routes_jsonl(self):
+        self.upload(AIRPORT_IMPORT_URL, "airports.csv", AIRPORTS_CSV)
+        lviv = Airport.objects.get(icao_code="UKLL")
+        routes = [
+            {"source": "KBP", "destination": "UKLL", "distance": 470},
+            {"source": str(lviv.id), "destination": "kbp", "distance": 470},
+            {"source": "KBP", "destination": "JFK", "distance": 7500},
+            {"source": "KBP", "destination": "KBP", "distance": 1},
+            {"source": "KBP", "destination": "LWO", "distance": "far"},
+        ]
+        content = "\n".join(json.dumps(route) for route in routes) + "\n{]\n"
+
+        res = self.upload(ROUTE_IMPORT_URL, "routes.txt", content, input="jsonl")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(
+            [error["line"] for error in res.data["errors"]], [3, 4, 5, 6]
+        )
+        self.assertIn("destination", res.data["errors"][0]["errors"])
+        self.assertEqual(
+            Route.objects.filter(source=lviv, distance=470).count(), 1
+        )
+
+    def test_ambiguous_code_must_be_given_as_id(self):
+        for icao_code in ("AAAA", "BBBB"):
+            Airport.objects.create(
+                name=icao_code,
+                city="city",
+                country="country",
+                icao_code=icao_code,
+                iata_code="DUP",
+            )
+
+        res = self.upload(
+            ROUTE_IMPORT_URL,
+            "routes.csv",
+            "source,destination,distance\nDUP,AAAA,100\n",
+        )
+
+        self.assertEqual(res.data["failed"], 1)
+        self.assertIn("source", res.data["errors"][0]["errors"])
+
+    def test_file_not_in_utf8_rejected_before_import(self):
+        with mock.patch.object(ReferenceImport.run, "__defaults__", (1,)):
+            res = self.client.post(
+                AIRPORT_IMPORT_URL,
+                {
+                    "file": SimpleUploadedFile(
+                        "airports.csv",
+                        AIRPORTS_CSV.encode() + "Kraków".encode("latin-1"),
+                    )
+                },
+                format="multipart",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Airport.objects.exists())
+
+    def test_unknown_format_rejected(self):
+        res = self.upload(AIRPORT_IMPORT_URL, "airports.xml", "<airports/>")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_staff_only(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("user@test.com", "testpass")
+        )
+
+        res = self.upload(AIRPORT_IMPORT_URL, "airports.csv", AIRPORTS_CSV)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Airport.objects.exists())
+
+    def test_import_command(self):
+        stdout, stderr = StringIO(), StringIO()
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write(AIRPORTS_CSV)
+            file.flush()
+            call_command(
+                "import_reference_data",
+                "airports",
+                file.name,
+                stdout=stdout,
+                stderr=stderr,
+            )
+
+        self.assertIn("2 created", stdout.getvalue())
+        self.assertIn("Line 4", stderr.getvalue())
+
+    def test_import_flights_csv(self):
+        self.upload(AIRPORT_IMPORT_URL, "airports.csv", AIRPORTS_CSV)
+        kbp = Airport.objects.get(icao_code="UKBB")
+        lwo = Airport.objects.get(icao_code="UKLL")
+        route = Route.objects.create(source=kbp, destination=lwo, distance=470)
+        airplane = sample_airplane(name="UR-PSA")
+        booked = Flight.objects.create(
+            route=route,
+            airplane=airplane,
+            departure_time=datetime(2024, 5, 1, 12, 0),
+            arrival_time=datetime(2024, 5, 1, 13, 30),
+        )
+        Flight.objects.create(
+            route=route,
+            airplane=airplane,
+            departure_time=datetime(2024, 5, 3, 10, 0),
+            arrival_time=datetime(2024, 5, 3, 12, 0),
+        )
+        content = (
+            "source,destination,airplane,departure_time,arrival_time\n"
+            "KBP,LWO,UR-PSA,2024-05-01 08:00,2024-05-01 09:00\n"
+            f"KBP,UKLL,{airplane.id},2024-05-01T12:00,2024-05-01T14:00\n"
+            "KBP,LWO,UR-PSA,2024-05-03 11:00,2024-05-03 13:00\n"
+            "LWO,KBP,UR-PSA,2024-05-02 08:00,2024-05-02 09:00\n"
+            "KBP,LWO,B-737,2024-05-02 08:00,2024-05-02 07:00\n"
+        )
+
+        res = self.upload(FLIGHT_IMPORT_URL, "flights.csv", content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (res.data["created"], res.data["updated"], res.data["failed"]),
+            (1, 1, 3),
+        )
+        self.assertEqual(
+            {
+                error["line"]: sorted(error["errors"])
+                for error in res.data["errors"]
+            },
+            {
+                4: ["departure_time"],
+                5: ["destination"],
+                6: ["airplane", "arrival_time"],
+            },
+        )
+        booked.refresh_from_db()
+        self.assertEqual(booked.arrival_time, datetime(2024, 5, 1, 14, 0))
+        self.assertTrue(
+            Flight.objects.filter(
+                airplane=airplane,
+                departure_time=datetime(2024, 5, 1, 8, 0),
+                seats_sold=0,
+            ).exists()
+        )
@@ -0,0 +1,194 @@
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import (
+    Crew,
+    Flight,
+    FlightSchedule,
+    Order,
+    Route,
+    Ticket,
+)
+from airport.schedules import iter_departures, publish_schedule
+from airport.tests.test_airplane_view import sample_airplane
+from airport.tests.test_seat_counters import sample_flight
+
+SCHEDULE_URL = reverse("airport:flightschedule-list")
+
+
+def publish_url(schedule_id):
+    return reverse("airport:flightschedule-publish", args=[schedule_id])
+
+
+class PublishScheduleTests(TestCase):
+    def setUp(self):
+        flight = sample_flight()
+        self.crew = Crew.objects.create(first_name="Jane", last_name="Doe")
+        self.schedule = FlightSchedule.objects.create(
+            route=flight.route,
+            airplane=flight.airplane,
+            days_of_week="135",
+            departure_time=time(9, 30),
+            duration=timedelta(hours=2),
+            valid_from=date(2024, 5, 1),
+            valid_until=date(2024, 5, 14),
+        )
+        self.schedule.crew.add(self.crew)
+
+    def test_iter_departures(self):
+        self.assertEqual(
+            [departure.day for departure in iter_departures(self.schedule)],
+            [1, 3, 6, 8, 10, 13],
+        )
+
+    def test_publish_creates_flights_with_crew(self):
+        summary = publish_schedule(self.schedule, chunk_size=4)
+
+        self.assertEqual(summary["created"], 6)
+        flights = self.schedule.flights.order_by("departure_time")
+        self.assertEqual(flights.count(), 6)
+        self.assertEqual(
+            flights[0].arrival_time, datetime(2024, 5, 1, 11, 30)
+        )
+        self.assertEqual(
+            Flight.crew.through.objects.filter(
+                flight__schedule=self.schedule, crew=self.crew
+            ).count(),
+            6,
+        )
+
+    def test_publish_is_idempotent(self):
+        publish_schedule(self.schedule)
+
+        summary = publish_schedule(self.schedule)
+
+        self.assertEqual(summary["created"], 0)
+        self.assertEqual(summary["unchanged"], 6)
+        self.assertEqual(self.schedule.flights.count(), 6)
+
+    def test_publish_changed_pattern(self):
+        publish_schedule(self.schedule)
+        sold_flight = self.schedule.flights.get(departure_time__day=8)
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            flight=sold_flight,
+            order=Order.objects.create(
+                user=get_user_model().objects.create_user("a@a.com", "pass")
+            ),
+        )
+
+        self.schedule.days_of_week = "15"
+        self.schedule.duration = timedelta(hours=3)
+        self.schedule.save()
+        summary = publish_schedule(self.schedule)
+
+        self.assertEqual(summary["updated"], 4)
+        self.assertEqual(summary["deleted"], 1)
+        self.assertEqual(summary["kept"], 1)
+        self.assertTrue(Flight.objects.filter(pk=sold_flight.pk).exists())
+        self.assertEqual(self.schedule.flights.count(), 5)
+
+    def test_publish_moves_flights_to_edited_route(self):
+        publish_schedule(self.schedule)
+        route = Route.objects.create(
+            source=self.schedule.route.destination,
+            destination=self.schedule.route.source,
+            distance=1000,
+        )
+        self.schedule.route = route
+        self.schedule.save()
+
+        summary = publish_schedule(self.schedule)
+
+        self.assertEqual(summary["updated"], 6)
+        self.assertEqual(
+            set(self.schedule.flights.values_list("route", flat=True)),
+            {route.id},
+        )
+
+    def test_publish_rejects_busy_crew(self):
+        flight = sample_flight(
+            route=self.schedule.route,
+            airplane=sample_airplane(),
+            departure_time="2024-05-08T10:00:00",
+            arrival_time="2024-05-08T12:00:00",
+        )
+        flight.crew.add(self.crew)
+
+        with self.assertRaises(ValidationError) as error:
+            publish_schedule(self.schedule)
+
+        self.assertIn(str(self.crew.id), str(error.exception))
+        self.assertFalse(self.schedule.flights.exists())
+
+    def test_dry_run_writes_nothing(self):
+        summary = publish_schedule(self.schedule, dry_run=True)
+
+        self.assertEqual(summary["created"], 6)
+        self.assertFalse(self.schedule.flights.exists())
+
+
+class FlightScheduleApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@admin.com", "password", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def test_create_and_publish_schedule(self):
+        res = self.client.post(
+            SCHEDULE_URL,
+            {
+                "route": self.flight.route_id,
+                "airplane": sample_airplane().id,
+                "days_of_week": "71",
+                "departure_time": "06:00",
+                "duration": "01:30:00",
+                "valid_from": "2024-06-01",
+                "valid_until": "2024-06-30",
+            },
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["days_of_week"], "17")
+
+        res = self.client.post(
+            publish_url(res.data["id"]), {"dry_run": True}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["created"], 9)
+        self.assertEqual(Flight.objects.count(), 1)
+
+    def test_invalid_weekdays_rejected(self):
+        res = self.client.post(
+            SCHEDULE_URL,
+            {
+                "route": self.flight.route_id,
+                "airplane": self.flight.airplane_id,
+                "days_of_week": "118",
+                "departure_time": "06:00",
+                "duration": "01:30:00",
+                "valid_from": "2024-06-01",
+                "valid_until": "2024-06-30",
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_schedules_admin_only(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("user@user.com", "password")
+        )
+
+        res = self.client.get(SCHEDULE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,99 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import Flight, Route, Airport, Order, Ticket
+from airport.tests.test_airplane_view import sample_airplane
+
+FLIGHT_URL = reverse("airport:flight-list")
+ORDER_URL = reverse("airport:order-list")
+
+
+def sample_flight(**params):
+    source = Airport.objects.create(
+        name="Source",
+        city="city",
+        country="country",
+        icao_code="SRCE",
+        iata_code="SRC",
+    )
+    destination = Airport.objects.create(
+        name="Destination",
+        city="city",
+        country="country",
+        icao_code="DEST",
+        iata_code="DST",
+    )
+
+    defaults = {
+        "route": Route.objects.create(
+            source=source, destination=destination, distance=1000
+        ),
+        "airplane": sample_airplane(rows=10, seats_in_row=4),
+        "departure_time": "2024-04-01T11:00:00",
+        "arrival_time": "2024-04-01T14:10:00",
+    }
+    defaults.update(params)
+
+    return Flight.objects.create(**defaults)
+
+
+class SeatCountersTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def test_order_creation_updates_seats_sold(self):
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "flight": self.flight.id},
+                {"row": 1, "seat": 2, "flight": self.flight.id},
+            ]
+        }
+        res = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_sold, 2)
+
+    def test_flight_list_reads_stored_counter(self):
+        Flight.objects.filter(pk=self.flight.pk).update(seats_sold=15)
+
+        res = self.client.get(FLIGHT_URL)
+
+        self.assertEqual(res.data["results"][0]["tickets_available"], 25)
+
+    def test_ticket_delete_releases_seat(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=self.flight, order=order)
+        Ticket.objects.create(row=1, seat=2, flight=self.flight, order=order)
+
+        order.delete()
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_sold, 0)
+
+    def test_rebuild_command_fixes_drift(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=self.flight, order=order)
+        Flight.objects.filter(pk=self.flight.pk).update(seats_sold=7)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_seat_counters", "--check", stdout=StringIO())
+
+        call_command("rebuild_seat_counters", stdout=StringIO())
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_sold, 1)
+        call_command("rebuild_seat_counters", "--check", stdout=StringIO())
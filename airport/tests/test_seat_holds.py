@@ -0,0 +1,210 @@
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import Flight, SeatHold, Ticket
+from airport.serializers import OrderSerializer
+from airport.tests.test_seat_counters import sample_flight
+
+SEAT_HOLD_URL = reverse("airport:seathold-list")
+ORDER_URL = reverse("airport:order-list")
+FLIGHT_URL = reverse("airport:flight-list")
+
+
+def seats_url(flight_id):
+    return reverse("airport:flight-seats", args=[flight_id])
+
+
+class SeatHoldApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.other = get_user_model().objects.create_user(
+            "other@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def hold(self, *seats, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.user)
+        return client.post(
+            SEAT_HOLD_URL,
+            {
+                "flight": self.flight.id,
+                "seats": [{"row": row, "seat": seat} for row, seat in seats],
+            },
+            format="json",
+        )
+
+    def test_hold_seats(self):
+        res = self.hold((1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(hold["row"], hold["seat"]) for hold in res.data],
+            [(1, 1), (1, 2)],
+        )
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_held, 2)
+        self.assertEqual(self.flight.seats_available, 38)
+
+    def test_hold_again_extends_expiry(self):
+        self.hold((1, 1))
+        SeatHold.objects.update(
+            expires_at=timezone.now() + timedelta(minutes=1)
+        )
+
+        res = self.hold((1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            SeatHold.objects.get(row=1, seat=1).expires_at
+            > timezone.now() + timedelta(minutes=5)
+        )
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_held, 2)
+
+    def test_seat_held_by_other_user_is_rejected(self):
+        self.hold((1, 1), user=self.other)
+
+        hold_res = self.hold((1, 1))
+        order_res = self.client.post(
+            ORDER_URL,
+            {"tickets": [{"row": 1, "seat": 1, "flight": self.flight.id}]},
+            format="json",
+        )
+
+        self.assertEqual(hold_res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(order_res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("held by another passenger", str(order_res.data))
+
+    def test_hold_taken_after_validation_rejects_order(self):
+        order_serializer = OrderSerializer(
+            data={
+                "tickets": [{"row": 1, "seat": 1, "flight": self.flight.id}]
+            },
+            context={"request": SimpleNamespace(user=self.user)},
+        )
+        self.assertTrue(order_serializer.is_valid())
+        self.hold((1, 1), user=self.other)
+
+        with self.assertRaises(ValidationError) as error:
+            order_serializer.save(user=self.user)
+
+        self.assertIn("held by another passenger", str(error.exception))
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_flight_list_skips_expired_holds(self):
+        self.hold((1, 1), (1, 2), user=self.other)
+        self.hold((1, 3), user=self.other)
+        SeatHold.objects.filter(seat__lte=2).update(
+            expires_at=timezone.now()
+        )
+
+        res = self.client.get(FLIGHT_URL, {"min_seats": 39})
+
+        self.assertEqual(res.data["results"][0]["tickets_available"], 39)
+        # the list only reads, expired holds wait for the sweep
+        self.assertEqual(SeatHold.objects.count(), 3)
+
+    def test_order_converts_own_holds(self):
+        self.hold((2, 1), (2, 2))
+
+        res = self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {"row": 2, "seat": 1, "flight": self.flight.id},
+                    {"row": 2, "seat": 2, "flight": self.flight.id},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_sold, 2)
+        self.assertEqual(self.flight.seats_held, 0)
+
+    def test_release_hold(self):
+        hold_id = self.hold((1, 1)).data[0]["id"]
+
+        res = self.client.delete(
+            reverse("airport:seathold-detail", args=[hold_id])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_held, 0)
+
+    def test_seat_map_counts_active_holds(self):
+        self.client.get(seats_url(self.flight.id))
+        self.hold((1, 3), user=self.other)
+
+        res = self.client.get(
+            seats_url(self.flight.id), {"encoding": "list"}
+        )
+
+        self.assertEqual(res.data["taken"], [(1, 3)])
+        self.assertEqual(res.data["seats_available"], 39)
+
+    def test_auto_assign_skips_held_seats(self):
+        self.hold(*[(1, seat) for seat in range(1, 5)], user=self.other)
+
+        res = self.client.post(
+            ORDER_URL,
+            {"flight": self.flight.id, "passengers": 2},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn(1, [ticket["row"] for ticket in res.data["tickets"]])
+
+
+class SweepSeatHoldsTests(TestCase):
+    def test_sweep_releases_expired_holds(self):
+        user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        flight = sample_flight()
+        now = timezone.now()
+        SeatHold.objects.bulk_create(
+            [
+                SeatHold(
+                    flight=flight,
+                    user=user,
+                    row=1,
+                    seat=seat,
+                    expires_at=now + timedelta(minutes=10 * (seat - 3)),
+                )
+                for seat in range(1, 5)
+            ]
+        )
+        Flight.update_seats_held({flight.id: 4})
+
+        call_command("sweep_seat_holds", stdout=StringIO())
+
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_held, 1)
+        self.assertEqual(
+            list(SeatHold.objects.values_list("seat", flat=True)), [4]
+        )
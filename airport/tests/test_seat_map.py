@@ -0,0 +1,106 @@
+import base64
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import Order, Ticket
+from airport.seat_map import SeatMap
+from airport.tests.test_seat_counters import sample_flight
+
+ORDER_URL = reverse("airport:order-list")
+
+
+def seats_url(flight_id):
+    return reverse("airport:flight-seats", args=[flight_id])
+
+
+class SeatMapTests(TestCase):
+    def test_bit_positions(self):
+        seat_map = SeatMap(rows=3, seats_in_row=3)
+        seat_map.take(1, 1)
+        seat_map.take(3, 3)
+
+        self.assertEqual(bytes(seat_map.bits), b"\x80\x80")
+        self.assertTrue(seat_map.is_taken(3, 3))
+        self.assertFalse(seat_map.is_taken(2, 2))
+        self.assertEqual(seat_map.taken_seats(), [(1, 1), (3, 3)])
+        self.assertEqual(seat_map.taken_count(), 2)
+
+    def test_allocate_prefers_tightest_run_in_one_row(self):
+        seat_map = SeatMap(rows=3, seats_in_row=6)
+        for seat in (1, 2, 3, 4):
+            seat_map.take(1, seat)
+        seat_map.take(2, 4)
+
+        self.assertEqual(seat_map.allocate(3), [(2, 1), (2, 2), (2, 3)])
+        self.assertEqual(seat_map.allocate(2), [(1, 5), (1, 6)])
+
+    def test_allocate_spreads_over_neighbouring_rows(self):
+        seat_map = SeatMap(rows=4, seats_in_row=3)
+        seat_map.take(1, 2)
+        seat_map.take(3, 2)
+
+        seats = seat_map.allocate(5)
+
+        self.assertEqual(seats, [(1, 1), (1, 3), (2, 1), (2, 2), (2, 3)])
+        self.assertEqual(seat_map.taken_count(), 7)
+
+    def test_allocate_not_enough_seats(self):
+        seat_map = SeatMap(rows=1, seats_in_row=2)
+        seat_map.take(1, 1)
+
+        self.assertIsNone(seat_map.allocate(2))
+        self.assertEqual(seat_map.taken_count(), 1)
+
+
+class FlightSeatsApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=2, flight=self.flight, order=order)
+
+    def test_seats_bitset(self):
+        res = self.client.get(seats_url(self.flight.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["encoding"], "bitset")
+        self.assertEqual(res.data["seats_available"], 39)
+        bits = base64.b64decode(res.data["taken"])
+        self.assertEqual(len(bits), 5)
+        self.assertEqual(bits[0], 0b01000000)
+
+    def test_seats_list_fallback(self):
+        res = self.client.get(seats_url(self.flight.id), {"encoding": "list"})
+
+        self.assertEqual(res.data["taken"], [(1, 2)])
+
+    def test_seats_cached_between_requests(self):
+        self.client.get(seats_url(self.flight.id))
+
+        with self.assertNumQueries(1):
+            self.client.get(seats_url(self.flight.id))
+
+    def test_order_creation_invalidates_cache(self):
+        self.client.get(seats_url(self.flight.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                ORDER_URL,
+                {"tickets": [{"row": 4, "seat": 4, "flight": self.flight.id}]},
+                format="json",
+            )
+        res = self.client.get(seats_url(self.flight.id), {"encoding": "list"})
+
+        self.assertEqual(res.data["taken"], [(1, 2), (4, 4)])
@@ -0,0 +1,112 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import Flight
+from airport.tests.test_seat_counters import sample_flight
+
+TIMETABLE_URL = reverse("airport:flight-timetable")
+
+
+class TimetableExportTests(TransactionTestCase):
+    """COPY reads through its own connection, so the data is committed"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            "admin@test.com",
+            "testpass",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.admin)
+        self.flight = sample_flight()
+        self.late_flight = Flight.objects.create(
+            route=self.flight.route,
+            airplane=self.flight.airplane,
+            departure_time="2024-04-02T09:00:00",
+            arrival_time="2024-04-02T11:00:00",
+        )
+
+    def export(self, **params):
+        params = {"date_from": "2024-04-01", "date_to": "2024-04-03", **params}
+        res = self.client.get(TIMETABLE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/gzip")
+        return gzip.decompress(b"".join(res.streaming_content)).decode()
+
+    def test_export_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+
+        self.assertEqual(
+            [int(row["id"]) for row in rows],
+            [self.flight.id, self.late_flight.id],
+        )
+        self.assertEqual(rows[0]["source_iata"], "SRC")
+        self.assertEqual(rows[0]["destination_icao"], "DEST")
+        self.assertEqual(rows[0]["capacity"], "40")
+        self.assertTrue(
+            rows[0]["departure_time"].startswith("2024-04-01 11:00")
+        )
+
+    def test_export_jsonl(self):
+        lines = self.export(output="jsonl").splitlines()
+
+        self.assertEqual(len(lines), 2)
+        flight = json.loads(lines[1])
+        self.assertEqual(flight["id"], self.late_flight.id)
+        self.assertEqual(flight["departure_time"], "2024-04-02T09:00:00")
+        self.assertEqual(flight["distance"], 1000)
+
+    def test_export_columns(self):
+        header, block = self.export(output="columns").splitlines()
+
+        columns = dict(zip(json.loads(header)["columns"], json.loads(block)))
+        self.assertEqual(columns["id"], [self.flight.id, self.late_flight.id])
+        self.assertEqual(columns["capacity"], [40, 40])
+
+    def test_date_range_is_half_open(self):
+        rows = self.export(date_to="2024-04-02", output="jsonl").splitlines()
+
+        self.assertEqual(
+            [json.loads(row)["id"] for row in rows], [self.flight.id]
+        )
+
+    def test_changed_since(self):
+        Flight.objects.filter(pk=self.flight.pk).update(
+            updated_at=datetime(2024, 1, 1)
+        )
+
+        rows = list(
+            csv.DictReader(
+                io.StringIO(self.export(changed_since="2024-03-01T00:00"))
+            )
+        )
+
+        self.assertEqual(
+            [int(row["id"]) for row in rows], [self.late_flight.id]
+        )
+
+    def test_export_requires_date_range(self):
+        res = self.client.get(TIMETABLE_URL, {"date_from": "2024-04-01"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_staff_only(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("user@test.com", "testpass")
+        )
+
+        res = self.client.get(
+            TIMETABLE_URL, {"date_from": "2024-04-01", "date_to": "2024-04-03"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
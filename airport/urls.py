@@ -8,6 +8,8 @@ from airport.views import (
     AirplaneViewSet,
     RouteViewSet,
     FlightViewSet,
+    FlightScheduleViewSet,
+    SeatHoldViewSet,
     OrderViewSet,
 )
 
@@ -18,6 +20,8 @@ router.register("airplane_types", AirplaneTypeViewSet)
 router.register("airplanes", AirplaneViewSet)
 router.register("routes", RouteViewSet)
 router.register("flights", FlightViewSet)
+router.register("flight_schedules", FlightScheduleViewSet)
+router.register("seat_holds", SeatHoldViewSet)
 router.register("orders", OrderViewSet)
 
 
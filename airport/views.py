@@ -1,20 +1,51 @@
-from django.db.models import F, Count, Q
+import codecs
+from datetime import timedelta
+
+from django.db import IntegrityError
+from django.db.models import F
+from django.http import StreamingHttpResponse
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import mixins, status
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from airport.admission import order_admission
+from airport.conflicts import find_conflicts
+from airport.connections import FlightGraph
+from airport.exports import (
+    EXPORT_FORMATS,
+    MANIFEST_FIELDS,
+    TIMETABLE_FORMATS,
+    buffered,
+    manifest_rows,
+    timetable_rows,
+    timetable_stream,
+)
+from airport.idempotency import IDEMPOTENCY_HEADER, idempotent
+from airport.imports import IMPORT_FORMATS, import_reference_data
+from airport.pagination import (
+    DefaultPagination,
+    FlightPagination,
+    OrderPagination,
+)
+from airport.params import param_to_datetime
 from airport.permissions import IsAdminOrIfAuthenticatedReadOnly
+from airport.schedules import publish_schedule
+from airport.seat_holds import active_holds_count, release_holds
+from airport.seat_map import SeatMap
 from airport.models import (
     Crew,
     Airport,
     Airplane,
     Route,
     Flight,
+    FlightSchedule,
+    SeatHold,
     Order, AirplaneType,
 )
 from airport.serializers import (
@@ -30,14 +61,82 @@ from airport.serializers import (
     FlightSerializer,
     FlightListSerializer,
     FlightDetailSerializer,
+    FlightScheduleSerializer,
+    FlightSchedulePublishSerializer,
     OrderSerializer,
     OrderListSerializer,
+    OrderExpandedListSerializer,
+    OrderAutoAssignSerializer,
+    SeatHoldSerializer,
+    SeatHoldCreateSerializer,
 )
 
 
-class DefaultPagination(PageNumberPagination):
-    page_size = 10
-    max_page_size = 100
+class ReferenceImportMixin:
+    """Staff upload of a CSV or JSON Lines file upserting import_kind"""
+
+    import_kind = None
+
+    @extend_schema(
+        request={
+            "multipart/form-data": {
+                "type": "object",
+                "properties": {
+                    "file": {"type": "string", "format": "binary"}
+                },
+            }
+        },
+        parameters=[
+            OpenApiParameter(
+                "input",
+                type=OpenApiTypes.STR,
+                enum=sorted(IMPORT_FORMATS),
+                description=(
+                    "Format of the file, guessed from its extension "
+                    "by default (ex. ?input=jsonl)"
+                ),
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        permission_classes=[IsAdminUser],
+        parser_classes=[MultiPartParser],
+    )
+    def import_data(self, request):
+        """Create or update records from the file, rows with errors are
+        reported and skipped"""
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "No file was submitted"})
+        input_format = request.query_params.get(
+            "input", upload.name.rsplit(".", 1)[-1]
+        )
+        if input_format not in IMPORT_FORMATS:
+            raise ValidationError(
+                {"input": f"Expected one of: {', '.join(IMPORT_FORMATS)}"}
+            )
+
+        # chunks are committed as they are merged, so the whole file is
+        # checked before the first one rather than failing halfway
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            for chunk in upload.chunks():
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise ValidationError({"file": "File must be UTF-8 encoded"})
+        upload.seek(0)
+
+        summary = import_reference_data(
+            self.import_kind,
+            codecs.iterdecode(upload, "utf-8"),
+            input_format,
+        )
+        return Response(summary, status=status.HTTP_200_OK)
 
 
 class CrewViewSet(
@@ -48,17 +147,21 @@ class CrewViewSet(
     queryset = Crew.objects.all()
     serializer_class = CrewSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    query_budgets = {"list": 2}
 
 
 class AirportViewSet(
+    ReferenceImportMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet
 ):
     queryset = Airport.objects.all()
+    import_kind = "airports"
     serializer_class = AirportSerializer
     pagination_class = DefaultPagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    query_budgets = {"list": 3}
 
 
 class AirplaneTypeViewSet(
@@ -69,6 +172,7 @@ class AirplaneTypeViewSet(
     queryset = AirplaneType.objects.all()
     serializer_class = AirplaneTypeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    query_budgets = {"list": 2}
 
 
 class AirplaneViewSet(
@@ -80,6 +184,7 @@ class AirplaneViewSet(
     queryset = Airplane.objects.all().select_related("airplane_type")
     pagination_class = DefaultPagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    query_budgets = {"list": 3, "retrieve": 2}
 
     def get_serializer_class(self):
         if self.action in ("list", "retrieve"):
@@ -162,6 +267,7 @@ class AirplaneViewSet(
 
 
 class RouteViewSet(
+    ReferenceImportMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -172,6 +278,8 @@ class RouteViewSet(
         .select_related("source", "destination")
     )
     pagination_class = DefaultPagination
+    import_kind = "routes"
+    query_budgets = {"list": 3, "retrieve": 3}
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -182,6 +290,7 @@ class RouteViewSet(
 
 
 class FlightViewSet(
+    ReferenceImportMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -196,41 +305,116 @@ class FlightViewSet(
             "airplane__airplane_type",
         )
         .prefetch_related("crew")
-        .annotate(
-            tickets_available=(
-                    F("airplane__rows") * F("airplane__seats_in_row")
-                    - Count("tickets")
-            )
-        )
     )
-    pagination_class = DefaultPagination
+    pagination_class = FlightPagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    import_kind = "flights"
+    query_budgets = {"list": 4, "retrieve": 3, "seats": 4}
 
     @staticmethod
     def _params_to_ints(qs):
         """Converts a list of string IDs to a list of integers"""
         return [int(str_id) for str_id in qs.split(",")]
 
+    @staticmethod
+    def _airport_lookup(name, value, prefix=""):
+        """Builds a lookup for an airport given by id, IATA or ICAO code"""
+        if value.isdigit():
+            return {f"{prefix}id": int(value)}
+
+        code = value.upper()
+        if len(code) == 3:
+            return {f"{prefix}iata_code": code}
+        if len(code) == 4:
+            return {f"{prefix}icao_code": code}
+
+        raise ValidationError({name: "Expected airport id, IATA or ICAO code"})
+
     def get_queryset(self):
-        """Retrieve the flights with filters"""
-        airplanes = self.request.query_params.get("airplanes")
-        routes = self.request.query_params.get("routes")
-        date = self.request.query_params.get("date")
+        """Retrieve the flights with filters.
+
+        Departure filters are plain ranges on departure_time, so they are
+        served by the (departure_time, id) and (route, departure_time)
+        indexes instead of casting every row to a date.
+        """
+        if self.action == "seats":
+            return Flight.objects.select_related("airplane")
+
+        if self.action == "manifest":
+            return Flight.objects.all()
+
+        params = self.request.query_params
+        airplanes = params.get("airplanes")
+        routes = params.get("routes")
+        date = params.get("date")
+        source = params.get("source")
+        destination = params.get("destination")
+        departure_after = params.get("departure_after")
+        departure_before = params.get("departure_before")
+        min_seats = params.get("min_seats")
 
         queryset = self.queryset
 
         if airplanes:
             airplanes_ids = self._params_to_ints(airplanes)
-            queryset = queryset.filter(airplane__id_in=airplanes_ids)
+            queryset = queryset.filter(airplane__id__in=airplanes_ids)
 
         if routes:
             routes_ids = self._params_to_ints(routes)
             queryset = queryset.filter(route__id__in=routes_ids)
 
+        if source:
+            queryset = queryset.filter(
+                **self._airport_lookup("source", source, "route__source__")
+            )
+
+        if destination:
+            queryset = queryset.filter(
+                **self._airport_lookup(
+                    "destination", destination, "route__destination__"
+                )
+            )
+
         if date:
-            queryset = queryset.filter(departure_time__date=date)
+            day = param_to_datetime("date", date).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+            queryset = queryset.filter(
+                departure_time__gte=day,
+                departure_time__lt=day + timedelta(days=1),
+            )
 
-        return queryset.distinct()
+        if departure_after:
+            queryset = queryset.filter(
+                departure_time__gte=param_to_datetime(
+                    "departure_after", departure_after
+                )
+            )
+
+        if departure_before:
+            queryset = queryset.filter(
+                departure_time__lt=param_to_datetime(
+                    "departure_before", departure_before
+                )
+            )
+
+        if min_seats:
+            if not min_seats.isdigit():
+                raise ValidationError({"min_seats": "Expected a number"})
+            queryset = queryset.annotate(
+                free_seats=(
+                    F("airplane__rows") * F("airplane__seats_in_row")
+                    - F("seats_sold")
+                    - active_holds_count()
+                )
+            ).filter(free_seats__gte=int(min_seats))
+
+        if self.action == "list":
+            # availability skips expired holds, deleting them is left to
+            # the sweep_seat_holds job so listing flights never writes
+            queryset = queryset.annotate(active_holds=active_holds_count())
+
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -258,34 +442,518 @@ class FlightViewSet(
                 type=OpenApiTypes.DATE,
                 description="Filter by flight date (ex. ?date=2024-05-01)",
             ),
+            OpenApiParameter(
+                "source",
+                type=OpenApiTypes.STR,
+                description=(
+                    "Filter by source airport id, IATA or ICAO code "
+                    "(ex. ?source=KBP)"
+                ),
+            ),
+            OpenApiParameter(
+                "destination",
+                type=OpenApiTypes.STR,
+                description=(
+                    "Filter by destination airport id, IATA or ICAO code "
+                    "(ex. ?destination=EPWA)"
+                ),
+            ),
+            OpenApiParameter(
+                "departure_after",
+                type=OpenApiTypes.DATETIME,
+                description=(
+                    "Filter by departure at or after "
+                    "(ex. ?departure_after=2024-05-01T06:00)"
+                ),
+            ),
+            OpenApiParameter(
+                "departure_before",
+                type=OpenApiTypes.DATETIME,
+                description=(
+                    "Filter by departure before "
+                    "(ex. ?departure_before=2024-05-01T18:00)"
+                ),
+            ),
+            OpenApiParameter(
+                "min_seats",
+                type=OpenApiTypes.NUMBER,
+                description="Filter by free seats count (ex. ?min_seats=3)",
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @staticmethod
+    def _param_to_minutes(name, value, default):
+        """Converts a number of minutes query param to a timedelta"""
+        if value is None:
+            return timedelta(minutes=default)
+        if not value.isdigit():
+            raise ValidationError({name: "Expected a number of minutes"})
+        return timedelta(minutes=int(value))
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "source",
+                type=OpenApiTypes.STR,
+                required=True,
+                description="Source airport id, IATA or ICAO code",
+            ),
+            OpenApiParameter(
+                "destination",
+                type=OpenApiTypes.STR,
+                required=True,
+                description="Destination airport id, IATA or ICAO code",
+            ),
+            OpenApiParameter(
+                "date",
+                type=OpenApiTypes.DATE,
+                required=True,
+                description="Departure date of the first flight",
+            ),
+            OpenApiParameter(
+                "max_stops",
+                type=OpenApiTypes.NUMBER,
+                description="Number of connections, 0 to 2 (default 2)",
+            ),
+            OpenApiParameter(
+                "min_connection",
+                type=OpenApiTypes.NUMBER,
+                description="Minimum connection time in minutes (default 60)",
+            ),
+            OpenApiParameter(
+                "max_connection",
+                type=OpenApiTypes.NUMBER,
+                description="Maximum connection time in minutes (default 360)",
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=["GET"], detail=False, url_path="connections")
+    def connections(self, request):
+        """Itineraries with up to two connections, earliest arrival first"""
+        params = request.query_params
+        for required in ("source", "destination", "date"):
+            if not params.get(required):
+                raise ValidationError({required: "This parameter is required"})
+
+        sources = Airport.objects.filter(
+            **self._airport_lookup("source", params["source"])
+        ).values_list("id", flat=True)
+        destinations = Airport.objects.filter(
+            **self._airport_lookup("destination", params["destination"])
+        ).values_list("id", flat=True)
+        day = param_to_datetime("date", params["date"]).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        max_stops = params.get("max_stops", "2")
+        if max_stops not in ("0", "1", "2"):
+            raise ValidationError({"max_stops": "Expected 0, 1 or 2"})
+
+        itineraries = FlightGraph.for_day(day).itineraries(
+            list(sources),
+            list(destinations),
+            day,
+            day + timedelta(days=1),
+            max_stops=int(max_stops),
+            min_connection=self._param_to_minutes(
+                "min_connection", params.get("min_connection"), 60
+            ),
+            max_connection=self._param_to_minutes(
+                "max_connection", params.get("max_connection"), 360
+            ),
+        )
+
+        airports = Airport.objects.in_bulk(
+            {
+                airport_id
+                for path in itineraries
+                for leg in path
+                for airport_id in leg[1:3]
+            }
+        )
+        data = [
+            {
+                "departure_time": path[0][3],
+                "arrival_time": path[-1][4],
+                "stops": len(path) - 1,
+                "flights": [
+                    {
+                        "id": flight_id,
+                        "source": airports[source_id].iata_code,
+                        "destination": airports[destination_id].iata_code,
+                        "departure_time": departure_time,
+                        "arrival_time": arrival_time,
+                    }
+                    for (
+                        flight_id,
+                        source_id,
+                        destination_id,
+                        departure_time,
+                        arrival_time,
+                    ) in path
+                ],
+            }
+            for path in itineraries
+        ]
+
+        return Response(data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "date_from",
+                type=OpenApiTypes.DATETIME,
+                required=True,
+                description="Start of the checked period (ex. 2024-05-01)",
+            ),
+            OpenApiParameter(
+                "date_to",
+                type=OpenApiTypes.DATETIME,
+                required=True,
+                description="End of the checked period (ex. 2024-06-01)",
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="conflicts",
+        permission_classes=[IsAdminUser],
+    )
+    def conflicts(self, request):
+        """Airplanes and crew members assigned to overlapping flights"""
+        params = request.query_params
+        for required in ("date_from", "date_to"):
+            if not params.get(required):
+                raise ValidationError({required: "This parameter is required"})
+
+        return Response(
+            find_conflicts(
+                param_to_datetime("date_from", params["date_from"]),
+                param_to_datetime("date_to", params["date_to"]),
+            ),
+            status=status.HTTP_200_OK,
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "encoding",
+                type=OpenApiTypes.STR,
+                enum=["bitset", "list"],
+                description=(
+                    "bitset (default) returns taken seats as base64 of "
+                    "rows * seats_in_row bits, bit (row - 1) * seats_in_row "
+                    "+ (seat - 1), most significant bit first; list returns "
+                    "[row, seat] pairs (ex. ?encoding=list)"
+                ),
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=["GET"], detail=True, url_path="seats")
+    def seats(self, request, pk=None):
+        """Occupancy of the flight seats"""
+        flight = self.get_object()
+        seat_map = SeatMap.for_flight(flight)
+
+        data = {
+            "flight": flight.id,
+            "rows": seat_map.rows,
+            "seats_in_row": seat_map.seats_in_row,
+            "seats_available": seat_map.capacity - seat_map.taken_count(),
+        }
+        if request.query_params.get("encoding") == "list":
+            data["encoding"] = "list"
+            data["taken"] = seat_map.taken_seats()
+        else:
+            data["encoding"] = "bitset"
+            data["taken"] = seat_map.to_base64()
+
+        return Response(data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "output",
+                type=OpenApiTypes.STR,
+                enum=sorted(EXPORT_FORMATS),
+                description="csv (default) or JSON Lines (ex. ?output=jsonl)",
+            ),
+        ],
+        responses={(200, "text/csv"): OpenApiTypes.STR},
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="manifest",
+        permission_classes=[IsAdminUser],
+    )
+    def manifest(self, request, pk=None):
+        """Passenger list of the flight, streamed while it is read"""
+        output = request.query_params.get("output", "csv")
+        if output not in EXPORT_FORMATS:
+            raise ValidationError(
+                {"output": f"Expected one of: {', '.join(EXPORT_FORMATS)}"}
+            )
+        flight = self.get_object()
+        iter_lines, content_type = EXPORT_FORMATS[output]
+
+        response = StreamingHttpResponse(
+            buffered(iter_lines(MANIFEST_FIELDS, manifest_rows(flight))),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="flight-{flight.id}-manifest.{output}"'
+        )
+        return response
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "date_from",
+                type=OpenApiTypes.DATETIME,
+                required=True,
+                description="Flights departing from (ex. 2024-06-01)",
+            ),
+            OpenApiParameter(
+                "date_to",
+                type=OpenApiTypes.DATETIME,
+                required=True,
+                description="Flights departing before (ex. 2024-07-01)",
+            ),
+            OpenApiParameter(
+                "changed_since",
+                type=OpenApiTypes.DATETIME,
+                description=(
+                    "Only flights created or changed after the moment "
+                    "(ex. 2024-05-31T02:00:00)"
+                ),
+            ),
+            OpenApiParameter(
+                "output",
+                type=OpenApiTypes.STR,
+                enum=sorted(TIMETABLE_FORMATS),
+                description=(
+                    "csv (default), jsonl or columns: a line of field "
+                    "names, then lines of value lists per field"
+                ),
+            ),
+        ],
+        responses={(200, "application/gzip"): OpenApiTypes.BINARY},
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="timetable",
+        permission_classes=[IsAdminUser],
+    )
+    def timetable(self, request):
+        """Gzip compressed export of flights with their route, airports
+        and airplane, streamed while it is read"""
+        params = request.query_params
+        for required in ("date_from", "date_to"):
+            if not params.get(required):
+                raise ValidationError({required: "This parameter is required"})
+        output = params.get("output", "csv")
+        if output not in TIMETABLE_FORMATS:
+            raise ValidationError(
+                {"output": f"Expected one of: {', '.join(TIMETABLE_FORMATS)}"}
+            )
+        changed_since = params.get("changed_since")
+        if changed_since:
+            changed_since = param_to_datetime(
+                "changed_since", changed_since
+            )
+
+        queryset = timetable_rows(
+            param_to_datetime("date_from", params["date_from"]),
+            param_to_datetime("date_to", params["date_to"]),
+            changed_since or None,
+        )
+        response = StreamingHttpResponse(
+            timetable_stream(output, queryset),
+            content_type="application/gzip",
+        )
+        extension = "jsonl" if output == "columns" else output
+        response["Content-Disposition"] = (
+            f'attachment; filename="timetable.{extension}.gz"'
+        )
+        return response
+
+
+class FlightScheduleViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    GenericViewSet
+):
+    queryset = (
+        FlightSchedule.objects.all()
+        .select_related("route", "airplane")
+        .prefetch_related("crew")
+    )
+    serializer_class = FlightScheduleSerializer
+    pagination_class = DefaultPagination
+    permission_classes = (IsAdminUser,)
+    query_budgets = {"list": 4}
+
+    def get_serializer_class(self):
+        if self.action == "publish":
+            return FlightSchedulePublishSerializer
+
+        return FlightScheduleSerializer
+
+    @action(methods=["POST"], detail=True, url_path="publish")
+    def publish(self, request, pk=None):
+        """Create, update and delete flights to match the schedule;
+        with dry_run only report what would change"""
+        schedule = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            summary = publish_schedule(
+                schedule, dry_run=serializer.validated_data["dry_run"]
+            )
+        except IntegrityError:
+            raise ValidationError(
+                {"airplane": "Schedule overlaps other flights of the airplane"}
+            )
+
+        return Response(
+            self.get_serializer(summary).data, status=status.HTTP_200_OK
+        )
+
+
+class SeatHoldViewSet(
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet,
+):
+    """Seats reserved by the user while the order is being filled out"""
+
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    permission_classes = (IsAuthenticated,)
+    query_budgets = {"list": 2}
+
+    def get_queryset(self):
+        return self.queryset.active().filter(user=self.request.user)
+
+    def get_serializer_class(self):
+        if self.action == "create":
+            return SeatHoldCreateSerializer
+
+        return SeatHoldSerializer
+
+    @extend_schema(responses=SeatHoldSerializer(many=True))
+    def create(self, request, *args, **kwargs):
+        """Hold the seats for SEAT_HOLD_MINUTES, or extend holds the user
+        already has on them"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        holds = serializer.save()
+
+        return Response(
+            SeatHoldSerializer(holds, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    def perform_destroy(self, instance):
+        release_holds([instance])
+
 
 class OrderViewSet(
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet,
 ):
-    queryset = (
-        Order.objects
-        .select_related("tickets__flight__airplane", "tickets__flight__route")
-        .prefetch_related("tickets__flight__crew")
-    )
+    queryset = Order.objects.with_tickets()
     serializer_class = OrderSerializer
-    pagination_class = DefaultPagination
+    pagination_class = OrderPagination
     permission_classes = (IsAuthenticated,)
+    query_budgets = {"list": 4}
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.action == "list":
+            if self.request.query_params.get("expand") == "flight":
+                return OrderExpandedListSerializer
             return OrderListSerializer
 
+        if self.action == "create" and "passengers" in self.request.data:
+            return OrderAutoAssignSerializer
+
         return OrderSerializer
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "expand",
+                type=OpenApiTypes.STR,
+                enum=["flight"],
+                description=(
+                    "Embed flight summary into tickets instead of a link "
+                    "(ex. ?expand=flight)"
+                ),
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                IDEMPOTENCY_HEADER,
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.HEADER,
+                description=(
+                    "Unique key of the order; repeating a request with the "
+                    "same key returns the response of the first one"
+                ),
+            ),
+        ]
+    )
+    def create(self, request, *args, **kwargs):
+        """Repeated Idempotency-Key replays the stored response. Flights
+        with booking_concurrency let only that many orders in at once,
+        the rest get 429 with their place in the queue"""
+        return idempotent(
+            request, lambda: self._create(request, *args, **kwargs)
+        )
+
+    def _create(self, request, *args, **kwargs):
+        with order_admission(request.user, self._ordered_flight_ids()):
+            return super().create(request, *args, **kwargs)
+
+    def _ordered_flight_ids(self):
+        data = self.request.data
+        if not isinstance(data, dict):
+            return set()
+
+        flight_ids = [data.get("flight")]
+        tickets = data.get("tickets")
+        if isinstance(tickets, list):
+            flight_ids.extend(
+                ticket.get("flight")
+                for ticket in tickets
+                if isinstance(ticket, dict)
+            )
+        return {
+            int(flight_id)
+            for flight_id in flight_ids
+            if str(flight_id).isdigit()
+        }
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -0,0 +1,98 @@
+import os
+import threading
+from functools import partial
+
+from django.db.backends.postgresql import base, creation
+
+from airport_system.db_pool.pool import ConnectionPool
+
+# keys of the POOL database setting and the pool arguments they set
+POOL_SETTINGS = {
+    "MIN_SIZE": "min_size",
+    "MAX_SIZE": "max_size",
+    "TIMEOUT": "timeout",
+    "MAX_LIFETIME": "max_lifetime",
+    "MAX_IDLE": "max_idle",
+    "CHECK_IDLE": "check_idle",
+    "RESET": "reset",
+}
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def process_pools():
+    """(connection params, pool) of this process by (alias, database
+    name). A forked worker starts without the pools of its parent, the
+    parent keeps using their connections. Call with _pools_lock held."""
+    global _pools_pid
+    if _pools_pid != os.getpid():
+        _pools.clear()
+        _pools_pid = os.getpid()
+    return _pools
+
+
+def connection_pool(alias, settings_dict, conn_params, connect):
+    key = (alias, conn_params.get("database"))
+    with _pools_lock:
+        pools = process_pools()
+        pool_params, pool = pools.get(key, (None, None))
+        if pool is None or pool_params != conn_params:
+            if pool is not None:
+                pool.close()
+            pool = ConnectionPool(
+                connect,
+                **{
+                    argument: settings_dict["POOL"][name]
+                    for name, argument in POOL_SETTINGS.items()
+                    if name in settings_dict.get("POOL", {})
+                },
+            )
+            pools[key] = (conn_params, pool)
+        return pool
+
+
+def close_pools():
+    """Close idle connections of every pool of this process"""
+    with _pools_lock:
+        pools = [pool for _, pool in process_pools().values()]
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """get_stats() of every pool of this process by (alias, database)"""
+    with _pools_lock:
+        pools = dict(process_pools())
+    return {key: pool.get_stats() for key, (_, pool) in pools.items()}
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # idle pooled connections would keep the test database in use
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend taking connections from a pool of the process
+    instead of opening one per request. Closing the connection, at the
+    end of every request with CONN_MAX_AGE = 0, returns it to the pool."""
+
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        self.pool = connection_pool(
+            self.alias,
+            self.settings_dict,
+            conn_params,
+            partial(base.DatabaseWrapper.get_new_connection, self, conn_params),
+        )
+        return self.pool.getconn()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import Counter, deque
+
+import psycopg2
+from psycopg2 import extensions
+
+STATS_COUNTERS = (
+    "requests_num",
+    "requests_waiting",
+    "requests_wait_ms",
+    "requests_errors",
+    "connections_num",
+    "connections_ms",
+    "connections_errors",
+    "connections_lost",
+    "connections_expired",
+    "returns_bad",
+)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection was returned to the pool in time"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections.
+
+    Connections are handed out newest returned first, so idle ones at the
+    bottom of the stack age out after max_idle while more than min_size
+    are open. A connection is replaced once it is older than max_lifetime,
+    and one idle for longer than check_idle seconds runs SELECT 1 before
+    it is handed out. Returned connections are rolled back and reset with
+    the reset statement, those that can not be are closed.
+    """
+
+    def __init__(
+        self,
+        connect,
+        min_size=0,
+        max_size=20,
+        timeout=30,
+        max_lifetime=3600,
+        max_idle=600,
+        check_idle=30,
+        reset="DISCARD ALL",
+    ):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_idle = check_idle
+        self.reset = reset
+        self.closed = False
+
+        self._condition = threading.Condition()
+        # (connection, returned at) of idle connections
+        self._idle = deque()
+        self._opened_at = {}
+        self._opening = 0
+        self._waiting = 0
+        self._stats = Counter()
+
+    def __len__(self):
+        """Open connections, idle and in use"""
+        return len(self._opened_at) + self._opening
+
+    def getconn(self):
+        """Idle connection or a new one while the pool is under max_size,
+        otherwise wait for a connection to be returned"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._condition:
+            self._stats["requests_num"] += 1
+        while True:
+            connection, idle_for = self._checkout(deadline, started)
+            if connection is None:
+                return self._open()
+            if idle_for < self.check_idle or self._is_alive(connection):
+                return connection
+            self._discard(connection, "connections_lost")
+
+    def putconn(self, connection):
+        """Return the connection, rolled back and reset, to the pool"""
+        if connection not in self._opened_at:
+            connection.close()
+            return
+        if not self._clean(connection):
+            self._discard(connection, "returns_bad")
+            return
+        if self.closed or self._age(connection) > self.max_lifetime:
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def close(self):
+        """Close idle connections, the ones in use are closed when they
+        are returned"""
+        with self._condition:
+            self.closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection)
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                "pool_min": self.min_size,
+                "pool_max": self.max_size,
+                "pool_size": len(self),
+                "pool_available": len(self._idle),
+                "requests_queued": self._waiting,
+                **{name: self._stats[name] for name in STATS_COUNTERS},
+            }
+
+    def _checkout(self, deadline, started):
+        """(idle connection, seconds it was idle), or (None, None) when a
+        new connection may be opened. The slot of the new connection is
+        taken before it is opened."""
+        with self._condition:
+            if self.closed:
+                raise psycopg2.OperationalError("Connection pool is closed")
+            waited = False
+            while True:
+                self._expire_idle()
+                if self._idle:
+                    connection, returned_at = self._idle.pop()
+                    break
+                if len(self) < self.max_size:
+                    self._opening += 1
+                    connection = returned_at = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["requests_errors"] += 1
+                    raise PoolTimeout(
+                        f"No connection available in {self.timeout} seconds,"
+                        f" all {self.max_size} are in use"
+                    )
+                if not waited:
+                    waited = True
+                    self._stats["requests_waiting"] += 1
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            if waited:
+                self._stats["requests_wait_ms"] += round(
+                    (time.monotonic() - started) * 1000
+                )
+        if connection is None:
+            return None, None
+        return connection, time.monotonic() - returned_at
+
+    def _open(self):
+        """New connection in the slot taken by _checkout"""
+        started = time.monotonic()
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._opening -= 1
+                self._stats["connections_errors"] += 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opening -= 1
+            self._opened_at[connection] = time.monotonic()
+            self._stats["connections_num"] += 1
+            self._stats["connections_ms"] += round(
+                (time.monotonic() - started) * 1000
+            )
+        return connection
+
+    def _expire_idle(self):
+        """Drop idle connections past max_lifetime, and past max_idle
+        while the pool has more than min_size. Runs under the lock."""
+        now = time.monotonic()
+        kept = deque()
+        expired = []
+        for connection, returned_at in self._idle:
+            if now - self._opened_at[connection] > self.max_lifetime or (
+                now - returned_at > self.max_idle
+                and len(self) - len(expired) > self.min_size
+            ):
+                expired.append(connection)
+            else:
+                kept.append((connection, returned_at))
+        self._idle = kept
+        for connection in expired:
+            self._stats["connections_expired"] += 1
+            del self._opened_at[connection]
+            connection.close()
+
+    def _age(self, connection):
+        return time.monotonic() - self._opened_at[connection]
+
+    def _is_alive(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _clean(self, connection):
+        """Roll back and reset the connection, False when it is broken"""
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        try:
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            if self.reset:
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(self.reset)
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, connection, reason=None):
+        with self._condition:
+            self._opened_at.pop(connection, None)
+            if reason:
+                self._stats[reason] += 1
+            self._condition.notify()
+        connection.close()
@@ -0,0 +1,206 @@
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from rest_framework.exceptions import Throttled
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from airport_system.db_pool.base import pool_stats
+from airport_system.middleware import QueryStats, view_action
+from airport_system.profiling import is_staff
+
+# Every worker writes its samples to files of this directory when it is
+# set, /metrics merges the files of all workers
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+UNMATCHED_VIEW = "unmatched"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to build the response, by view action",
+    ("view", "method", "status"),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of response bodies, streamed responses are not counted",
+    ("view",),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+DB_QUERIES = Histogram(
+    "db_queries_per_request",
+    "SQL statements run by a request",
+    ("view",),
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Total time of the SQL statements of a request",
+    ("view",),
+)
+THROTTLED_REQUESTS = Counter(
+    "throttled_requests_total",
+    "Requests rejected by DRF throttles",
+    ("view",),
+)
+BOOKING_CONFLICTS = Counter(
+    "booking_conflicts_total",
+    "Orders rejected because a concurrent order took one of their seats",
+)
+# (name, documentation, pool stats key) of the database pool metrics
+POOL_GAUGES = (
+    ("db_pool_size", "Open connections, idle and in use", "pool_size"),
+    ("db_pool_max_size", "Connections the pool may open", "pool_max"),
+    ("db_pool_available", "Idle connections", "pool_available"),
+    (
+        "db_pool_queued_requests",
+        "Requests waiting for a connection",
+        "requests_queued",
+    ),
+)
+POOL_COUNTERS = (
+    ("db_pool_requests", "Connections requested", "requests_num"),
+    (
+        "db_pool_waited_requests",
+        "Requests that waited for a connection",
+        "requests_waiting",
+    ),
+    (
+        "db_pool_timeouts",
+        "Requests that got no connection in time",
+        "requests_errors",
+    ),
+    ("db_pool_connections_opened", "Connections opened", "connections_num"),
+    (
+        "db_pool_connections_failed",
+        "Connections that failed to open",
+        "connections_errors",
+    ),
+    (
+        "db_pool_connections_lost",
+        "Idle connections that failed the health check",
+        "connections_lost",
+    ),
+    (
+        "db_pool_connections_expired",
+        "Idle connections closed after MAX_IDLE or MAX_LIFETIME",
+        "connections_expired",
+    ),
+    (
+        "db_pool_returns_bad",
+        "Connections returned broken or failing to reset",
+        "returns_bad",
+    ),
+)
+
+
+def view_name(view_func, method):
+    """ViewSet.action label of DRF views, the function name of others"""
+    resolved = view_action(view_func, method)
+    if resolved is None:
+        return getattr(view_func, "__name__", UNMATCHED_VIEW)
+    view_class, action = resolved
+    return f"{view_class.__name__}.{action}"
+
+
+class MetricsMiddleware:
+    """Observe latency, response size and SQL statements of every request
+    labelled by the DRF viewset and action serving it"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.metrics_view = UNMATCHED_VIEW
+        started = time.perf_counter()
+        with QueryStats(fingerprint=False).record() as stats:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = request.metrics_view
+        REQUEST_DURATION.labels(
+            view, request.method, response.status_code
+        ).observe(elapsed)
+        DB_QUERIES.labels(view).observe(stats.count)
+        DB_DURATION.labels(view).observe(stats.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(view).observe(len(response.content))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(view_func, request.method)
+
+
+class PoolCollector:
+    """Statistics of the database connection pools of this process"""
+
+    def collect(self):
+        stats = pool_stats()
+        labels = ("alias", "database")
+        for name, documentation, key in POOL_GAUGES:
+            gauge = GaugeMetricFamily(name, documentation, labels=labels)
+            for (alias, database), values in stats.items():
+                gauge.add_metric((alias, database or ""), values[key])
+            yield gauge
+        for name, documentation, key in POOL_COUNTERS:
+            counter = CounterMetricFamily(name, documentation, labels=labels)
+            for (alias, database), values in stats.items():
+                counter.add_metric((alias, database or ""), values[key])
+            yield counter
+        wait = CounterMetricFamily(
+            "db_pool_wait_seconds",
+            "Time requests waited for a connection",
+            labels=labels,
+        )
+        for (alias, database), values in stats.items():
+            wait.add_metric(
+                (alias, database or ""), values["requests_wait_ms"] / 1000
+            )
+        yield wait
+
+
+POOL_COLLECTOR = PoolCollector()
+REGISTRY.register(POOL_COLLECTOR)
+
+
+def exception_handler(exc, context):
+    """DRF exception handler counting throttled requests"""
+    if isinstance(exc, Throttled):
+        request = context["request"]
+        THROTTLED_REQUESTS.labels(
+            getattr(request, "metrics_view", UNMATCHED_VIEW)
+        ).inc()
+    return drf_exception_handler(exc, context)
+
+
+def metrics(request):
+    """Metrics of all workers in the Prometheus text format, pool metrics
+    are of the worker serving the request. With METRICS_TOKEN set the
+    scraper must send it as a bearer token, without it only staff may
+    read them unless DEBUG is on."""
+    token = settings.METRICS_TOKEN
+    if token:
+        allowed = request.headers.get("Authorization") == f"Bearer {token}"
+    else:
+        allowed = settings.DEBUG or is_staff(request)
+    if not allowed:
+        return HttpResponseForbidden()
+
+    registry = REGISTRY
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # pools of the worker serving the scrape
+        registry.register(POOL_COLLECTOR)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# literals and IN lists are dropped, so the same statement run for
+# different rows gets the same fingerprint
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+SQL_IN_LISTS = re.compile(r"\bIN \((?:%s, )*%s\)")
+SQL_WHITESPACE = re.compile(r"\s+")
+REPORTED_DUPLICATES = 5
+
+
+def sql_fingerprint(sql):
+    sql = SQL_WHITESPACE.sub(" ", sql.strip())
+    sql = SQL_IN_LISTS.sub("IN (...)", SQL_LITERALS.sub("?", sql))
+    return hashlib.sha1(sql.encode()).hexdigest()[:12]
+
+
+class QueryStats:
+    """Count, total time and, with fingerprint on, fingerprints of SQL
+    statements run on every database connection while recording"""
+
+    def __init__(self, fingerprint=True):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            if self.fingerprint:
+                fingerprint = sql_fingerprint(sql)
+                self.fingerprints[fingerprint] += 1
+                self.statements.setdefault(fingerprint, sql)
+
+    @property
+    def duplicates(self):
+        """Fingerprints run more than once, the most repeated first"""
+        return [
+            (fingerprint, count)
+            for fingerprint, count in self.fingerprints.most_common()
+            if count > 1
+        ]
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+
+def view_action(view_func, method):
+    """(view class, action) of a DRF view serving the HTTP method, the
+    action of plain API views is the lowercase method. None for views
+    not built on DRF."""
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return None
+    actions = getattr(view_func, "actions", None)
+    return (
+        view_class,
+        actions.get(method.lower()) if actions else method.lower(),
+    )
+
+
+def query_budget(view_func, method):
+    """Queries the view may run for the HTTP method, from the
+    query_budgets of the view class keyed by action"""
+    resolved = view_action(view_func, method)
+    if resolved is None:
+        return None
+    view_class, action = resolved
+    return (getattr(view_class, "query_budgets", None) or {}).get(action)
+
+
+class QueryStatsMiddleware:
+    """Record the SQL statements of every request.
+
+    With QUERY_STATS_HEADERS on, responses carry the number of queries,
+    their total time in milliseconds, the budget of the view and the
+    fingerprints of statements run more than once, the usual sign of an
+    N+1 query. Requests over their budget are logged as warnings. Queries
+    run while a streaming response is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_STATS_HEADERS:
+            return self.get_response(request)
+
+        request.query_budget = None
+        with QueryStats().record() as stats:
+            response = self.get_response(request)
+
+        response["X-DB-Query-Count"] = stats.count
+        response["X-DB-Query-Time-Ms"] = f"{stats.duration * 1000:.2f}"
+        if stats.duplicates:
+            response["X-DB-Duplicate-Queries"] = ", ".join(
+                f"{fingerprint}={count}"
+                for fingerprint, count in stats.duplicates[
+                    :REPORTED_DUPLICATES
+                ]
+            )
+            for fingerprint, count in stats.duplicates:
+                logger.debug(
+                    "%s run %d times: %s",
+                    fingerprint,
+                    count,
+                    stats.statements[fingerprint],
+                )
+
+        budget = request.query_budget
+        if budget is not None:
+            response["X-DB-Query-Budget"] = budget
+            if stats.count > budget:
+                logger.warning(
+                    "%s %s ran %d queries, its budget is %d",
+                    request.method,
+                    request.path,
+                    stats.count,
+                    budget,
+                )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if settings.QUERY_STATS_HEADERS:
+            request.query_budget = query_budget(view_func, request.method)
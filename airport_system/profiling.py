@@ -0,0 +1,266 @@
+import cProfile
+import json
+import pstats
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections, transaction
+from django.http import FileResponse, Http404
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+# X-Profile request header, looked up in META to not build request.headers
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_ID = re.compile(r"^\d+-[0-9a-f]{8}$")
+# statements explained per profile, the rest are listed without a plan
+EXPLAINED_STATEMENTS = 50
+TOP_FUNCTIONS = 40
+SUMMARY_FIELDS = (
+    "id",
+    "created_at",
+    "trigger",
+    "method",
+    "path",
+    "status",
+    "duration_ms",
+    "user",
+    "sql_count",
+    "sql_duration_ms",
+)
+
+
+class StatementLog:
+    """SQL statements run on every database connection with their
+    parameters and duration"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append(
+                {
+                    "alias": context["connection"].alias,
+                    "sql": sql,
+                    "params": None if many else params,
+                    "duration_ms": round(
+                        (time.perf_counter() - started) * 1000, 3
+                    ),
+                }
+            )
+
+
+def explain(statement):
+    """Plan of a SELECT statement, None for other statements"""
+    is_select = statement["sql"].lstrip()[:6].upper() == "SELECT"
+    if statement["params"] is None or not is_select:
+        return None
+    connection = connections[statement["alias"]]
+    try:
+        with transaction.atomic(using=statement["alias"]):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"EXPLAIN {statement['sql']}", statement["params"]
+                )
+                return "\n".join(row[0] for row in cursor.fetchall())
+    except DatabaseError as error:
+        return f"EXPLAIN failed: {error}"
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    """Functions with the highest cumulative time"""
+    stats = pstats.Stats(profiler).stats
+    functions = sorted(
+        stats.items(), key=lambda item: item[1][3], reverse=True
+    )[:limit]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, total, cumulative, _) in (
+            functions
+        )
+    ]
+
+
+def profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def profile_path(profile_id, suffix):
+    if not PROFILE_ID.match(profile_id):
+        raise Http404
+    path = profile_dir() / f"{profile_id}{suffix}"
+    if not path.exists():
+        raise Http404
+    return path
+
+
+def save_profile(profile, profiler):
+    """Write the profile and its pstats dump, deleting the oldest
+    profiles beyond PROFILING_KEEP"""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(directory / f"{profile['id']}.prof")
+    with open(directory / f"{profile['id']}.json", "w") as file:
+        json.dump(profile, file, cls=DjangoJSONEncoder)
+
+    for stale in sorted(directory.glob("*.json"))[: -settings.PROFILING_KEEP]:
+        stale.with_suffix(".prof").unlink(missing_ok=True)
+        stale.unlink(missing_ok=True)
+
+
+def is_staff(request):
+    """Whether the request comes from a staff session or JWT"""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+class ProfilingMiddleware:
+    """Profile requests of staff sending the X-Profile header and a
+    PROFILING_SAMPLE_RATE share of all requests.
+
+    A profile holds the cProfile functions with the highest cumulative
+    time, a pstats dump and every SQL statement with the EXPLAIN plan of
+    the SELECTs, and is named in the X-Profile-Id response header.
+    Requests that are not profiled only pay for the header lookup and a
+    random number.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if PROFILE_HEADER in request.META:
+            if not is_staff(request):
+                return self.get_response(request)
+            trigger = "header"
+        elif (
+            settings.PROFILING_SAMPLE_RATE
+            and random.random() < settings.PROFILING_SAMPLE_RATE
+        ):
+            trigger = "sample"
+        else:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        log = StatementLog()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            try:
+                profiler.enable()
+            except ValueError:
+                # another profiler is active in this thread
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - started
+
+        for number, statement in enumerate(log.statements):
+            statement["plan"] = (
+                explain(statement) if number < EXPLAINED_STATEMENTS else None
+            )
+        user = getattr(request, "user", None)
+        profile = {
+            "id": f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}",
+            "created_at": datetime.now(),
+            "trigger": trigger,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "user": getattr(user, "email", None),
+            "sql_count": len(log.statements),
+            "sql_duration_ms": round(
+                sum(statement["duration_ms"] for statement in log.statements),
+                3,
+            ),
+            "sql": log.statements,
+            "functions": top_functions(profiler),
+        }
+        save_profile(profile, profiler)
+        response[PROFILE_ID_HEADER] = profile["id"]
+        return response
+
+
+PROFILE_ID_PARAMETER = OpenApiParameter(
+    "id",
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.PATH,
+    description="Id of the profile, sent in the X-Profile-Id header",
+)
+
+
+class ProfileViewSet(viewsets.ViewSet):
+    """Stored request profiles, newest first"""
+
+    permission_classes = (IsAdminUser,)
+    lookup_value_regex = PROFILE_ID.pattern.strip("^$")
+
+    @extend_schema(operation_id="profiles_list", responses=OpenApiTypes.OBJECT)
+    def list(self, request):
+        profiles = []
+        for path in sorted(profile_dir().glob("*.json"), reverse=True):
+            with open(path) as file:
+                profile = json.load(file)
+            profiles.append(
+                {field: profile.get(field) for field in SUMMARY_FIELDS}
+            )
+        return Response(profiles)
+
+    @extend_schema(
+        operation_id="profiles_retrieve",
+        parameters=[PROFILE_ID_PARAMETER],
+        responses=OpenApiTypes.OBJECT,
+    )
+    def retrieve(self, request, pk=None):
+        with open(profile_path(pk, ".json")) as file:
+            return Response(json.load(file))
+
+    @extend_schema(
+        operation_id="profiles_download",
+        parameters=[PROFILE_ID_PARAMETER],
+        responses={
+            (200, "application/octet-stream"): OpenApiTypes.BINARY
+        },
+    )
+    @action(methods=["GET"], detail=True, url_path="download")
+    def download(self, request, pk=None):
+        """pstats dump of the profile, ex. for snakeviz"""
+        return FileResponse(
+            open(profile_path(pk, ".prof"), "rb"),
+            as_attachment=True,
+            filename=f"{pk}.prof",
+            content_type="application/octet-stream",
+        )
@@ -0,0 +1,47 @@
+import time
+
+from prometheus_client import Histogram
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+# Kept out of airport_system.metrics: DRF imports the default renderers
+# while loading its views, which that module imports itself
+SERIALIZER_DURATION = Histogram(
+    "serializer_duration_seconds",
+    "Time to render serializer output into the response body",
+    ("serializer",),
+)
+
+
+def serializer_name(serializer):
+    if isinstance(serializer, serializers.ListSerializer):
+        return f"{type(serializer.child).__name__}[]"
+    return type(serializer).__name__
+
+
+def response_serializer(data):
+    """Top-level serializer of response data, None for data built
+    without one"""
+    serializer = getattr(data, "serializer", None)
+    if serializer is None and isinstance(data, dict):
+        # paginated responses wrap the serialized page
+        serializer = getattr(data.get("results"), "serializer", None)
+    return serializer
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSON renderer observing the time to render serializer output,
+    labelled by the serializer that built it"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        serializer = response_serializer(data)
+        if serializer is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            SERIALIZER_DURATION.labels(serializer_name(serializer)).observe(
+                time.perf_counter() - started
+            )
@@ -55,6 +55,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "airport_system.metrics.MetricsMiddleware",
+    "airport_system.middleware.QueryStatsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -62,6 +64,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "airport_system.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "airport_system.urls"
@@ -98,9 +101,29 @@ DATABASES = {
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
         "HOST": os.environ.get("POSTGRES_HOST"),
         "PORT": os.environ.get("POSTGRES_PORT"),
+        # seconds a connection is kept open for the next requests of the
+        # thread, 0 closes it at the end of every request
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 0)),
     }
 }
 
+# Take connections from a pool of every process instead, closing the
+# connection at the end of a request returns it to the pool
+if os.environ.get("DB_POOL", "") == "True":
+    DATABASES["default"]["ENGINE"] = "airport_system.db_pool"
+    DATABASES["default"]["POOL"] = {
+        "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+        "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 20)),
+        # seconds to wait for a connection when all are in use
+        "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "MAX_LIFETIME": float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600)),
+        "MAX_IDLE": float(os.environ.get("DB_POOL_MAX_IDLE", 600)),
+        # connections idle for longer run SELECT 1 before they are reused
+        "CHECK_IDLE": float(os.environ.get("DB_POOL_CHECK_IDLE", 30)),
+        # releases session locks, settings and temporary tables
+        "RESET": os.environ.get("DB_POOL_RESET", "DISCARD ALL"),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -153,10 +176,18 @@ REST_FRAMEWORK = {
         "rest_framework.throttling.AnonRateThrottle",
         "rest_framework.throttling.UserRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "1000/day", "user": "10000/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": os.environ.get("THROTTLE_RATE_ANON", "1000/day"),
+        "user": os.environ.get("THROTTLE_RATE_USER", "10000/day"),
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "airport_system.renderers.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "EXCEPTION_HANDLER": "airport_system.metrics.exception_handler",
 }
 
 SPECTACULAR_SETTINGS = {
@@ -177,3 +208,28 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": False,
 }
+
+# How long a seat stays reserved for the user who picked it
+SEAT_HOLD_DURATION = timedelta(
+    minutes=int(os.environ.get("SEAT_HOLD_MINUTES", 10))
+)
+
+# Expose SQL query count, time, budget and repeated statements of every
+# request in X-DB-* response headers
+QUERY_STATS_HEADERS = os.environ.get("QUERY_STATS_HEADERS", "") == "True"
+
+# Bearer token /metrics requires, staff only when empty unless DEBUG is on
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Requests of staff sending an X-Profile header are profiled, and this
+# share of all requests. The newest PROFILING_KEEP profiles are kept in
+# PROFILING_DIR.
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+PROFILING_DIR = os.environ.get("PROFILING_DIR", "/vol/web/profiles")
+PROFILING_KEEP = int(os.environ.get("PROFILING_KEEP", 100))
+
+# Responses of orders sent with an Idempotency-Key header are replayed
+# for this long
+IDEMPOTENCY_KEY_TTL = timedelta(
+    hours=int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+)
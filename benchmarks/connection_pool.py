@@ -0,0 +1,139 @@
+"""Per-request connections against the pooled backend.
+
+Every client thread runs requests the way a worker thread serves them:
+take the connection, look a user up by primary key, close the connection
+as the end of the request does. The plain backend connects to Postgres
+for every request, the pooled one shares --pool-size connections between
+all clients. Requests over the max_connections of the server fail.
+
+    python -m benchmarks.connection_pool --clients 200 --requests 25
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.utils import (
+    benchmark_database,
+    latency_summary,
+    report,
+    setup_django,
+)
+
+QUERY = "SELECT id, email, is_staff FROM user_user WHERE id = %s"
+BACKENDS = {
+    "connect_per_request": "django.db.backends.postgresql",
+    "pooled": "airport_system.db_pool",
+}
+
+
+def client(backend, settings_dict, requests, start, results):
+    from django.db import DatabaseError
+    from django.db.utils import load_backend
+
+    database = load_backend(backend).DatabaseWrapper(settings_dict, "bench")
+    latencies = []
+    errors = 0
+    start.wait()
+    for number in range(requests):
+        started = time.perf_counter()
+        try:
+            with database.cursor() as cursor:
+                cursor.execute(QUERY, [number])
+                cursor.fetchall()
+        except DatabaseError:
+            errors += 1
+        finally:
+            database.close()
+        latencies.append(time.perf_counter() - started)
+    results.append((latencies, errors))
+
+
+def run_backend(name, clients, requests, pool_size):
+    from django.db import connection
+
+    from airport_system.db_pool.base import close_pools, pool_stats
+
+    settings_dict = {
+        **connection.settings_dict,
+        "ENGINE": BACKENDS[name],
+        "CONN_MAX_AGE": 0,
+        "POOL": {"MIN_SIZE": 0, "MAX_SIZE": pool_size},
+    }
+    start = threading.Barrier(clients + 1)
+    results = []
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(BACKENDS[name], settings_dict, requests, start, results),
+        )
+        for _ in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [
+        latency
+        for client_latencies, _ in results
+        for latency in client_latencies
+    ]
+    result = {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "elapsed_s": round(elapsed, 2),
+        "requests_per_s": round(len(latencies) / elapsed),
+        "latency_ms": latency_summary(latencies),
+    }
+    if name == "pooled":
+        stats = pool_stats()[("bench", settings_dict["NAME"])]
+        result["pool"] = {
+            key: stats[key]
+            for key in (
+                "connections_num",
+                "connections_ms",
+                "requests_waiting",
+                "requests_wait_ms",
+                "requests_errors",
+            )
+        }
+        close_pools()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=25)
+    parser.add_argument("--pool-size", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        from django.db import connection
+
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW max_connections")
+            max_connections = int(cursor.fetchone()[0])
+        results = {
+            name: run_backend(
+                name, args.clients, args.requests, args.pool_size
+            )
+            for name in BACKENDS
+        }
+    report(
+        {
+            "clients": args.clients,
+            "requests_per_client": args.requests,
+            "pool_size": args.pool_size,
+            "max_connections": max_connections,
+            **results,
+        }
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Connecting-flight search over an in-memory FlightGraph.
+
+Builds a synthetic network (hub airports get more flights, Zipf-like) and
+times graph construction and itinerary searches. No database is used, the
+graph is fed with the same leg tuples FlightGraph.for_day reads.
+
+    python -m benchmarks.connections --airports 10000 --flights 1000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.utils import latency_summary, report, setup_django
+
+DAY = datetime(2024, 5, 1)
+
+
+def synthetic_legs(airports, flights, seed):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(airports)]
+    sources = rng.choices(range(airports), weights=weights, k=flights)
+    destinations = rng.choices(range(airports), weights=weights, k=flights)
+    window = int(timedelta(days=2).total_seconds() // 60)
+
+    for flight_id, (source, destination) in enumerate(
+        zip(sources, destinations), start=1
+    ):
+        if source == destination:
+            destination = (destination + 1) % airports
+        departure = DAY + timedelta(minutes=rng.randrange(window))
+        yield (
+            flight_id,
+            source,
+            destination,
+            departure,
+            departure + timedelta(minutes=rng.randint(45, 720)),
+        )
+
+
+def run(airports, flights, searches, max_stops, seed):
+    from airport.connections import FlightGraph
+
+    started = time.perf_counter()
+    legs = list(synthetic_legs(airports, flights, seed))
+    generated = time.perf_counter() - started
+
+    started = time.perf_counter()
+    graph = FlightGraph(legs)
+    built = time.perf_counter() - started
+    del legs
+
+    rng = random.Random(seed)
+    latencies = []
+    found = 0
+    for _ in range(searches):
+        source, destination = rng.sample(range(airports // 10 or 2), 2)
+        started = time.perf_counter()
+        found += len(
+            graph.itineraries(
+                [source],
+                [destination],
+                DAY,
+                DAY + timedelta(days=1),
+                max_stops=max_stops,
+            )
+        )
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        "airports": airports,
+        "flights": flights,
+        "max_stops": max_stops,
+        "generate_s": round(generated, 2),
+        "graph_build_s": round(built, 2),
+        "searches": searches,
+        "itineraries_found": found,
+        "search_latency_ms": latency_summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--airports", type=int, default=10000)
+    parser.add_argument("--flights", type=int, default=1000000)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--max-stops", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    report(
+        run(
+            args.airports,
+            args.flights,
+            args.searches,
+            args.max_stops,
+            args.seed,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Concurrent auto-assigned group bookings on a single flight.
+
+Every booking goes through OrderViewSet.create in auto-assign mode from its
+own thread and database connection, so they all compete for the row lock
+of the same flight.
+
+    python -m benchmarks.group_booking --bookings 50 --max-group 6
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import (
+    benchmark_database,
+    latency_summary,
+    report,
+    setup_django,
+)
+
+
+def run(bookings, workers, max_group, rows, seats_in_row, seed):
+    from django.contrib.auth import get_user_model
+    from django.db import connections
+    from django.db.models import Count
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from airport.models import (
+        Airplane,
+        AirplaneType,
+        Airport,
+        Flight,
+        Route,
+        Ticket,
+    )
+
+    user = get_user_model().objects.create_user("bench@bench.com", "bench")
+    airports = [
+        Airport.objects.create(
+            name=name, city=name, country=name, icao_code=code, iata_code=code
+        )
+        for name, code in (("Source", "SRC"), ("Destination", "DST"))
+    ]
+    flight = Flight.objects.create(
+        route=Route.objects.create(
+            source=airports[0], destination=airports[1], distance=1000
+        ),
+        airplane=Airplane.objects.create(
+            name="Bench",
+            rows=rows,
+            seats_in_row=seats_in_row,
+            airplane_type=AirplaneType.objects.create(name="Bench"),
+        ),
+        departure_time="2024-05-01T10:00:00",
+        arrival_time="2024-05-01T12:00:00",
+    )
+    url = reverse("airport:order-list")
+    groups = [
+        random.Random(seed + number).randint(1, max_group)
+        for number in range(bookings)
+    ]
+
+    def book(passengers):
+        client = APIClient()
+        client.force_authenticate(user)
+        started = time.perf_counter()
+        try:
+            response = client.post(
+                url,
+                {"flight": flight.id, "passengers": passengers},
+                format="json",
+            )
+            return response.status_code, time.perf_counter() - started
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(book, groups))
+    elapsed = time.perf_counter() - started
+
+    flight.refresh_from_db()
+    double_booked = (
+        Ticket.objects.filter(flight=flight)
+        .values("row", "seat")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .count()
+    )
+    succeeded = [latency for code, latency in results if code == 201]
+    return {
+        "bookings": bookings,
+        "workers": workers,
+        "passengers_requested": sum(groups),
+        "succeeded": len(succeeded),
+        "rejected": len(results) - len(succeeded),
+        "seats_sold": flight.seats_sold,
+        "tickets": Ticket.objects.filter(flight=flight).count(),
+        "double_booked_seats": double_booked,
+        "elapsed_s": round(elapsed, 3),
+        "bookings_per_s": round(len(results) / elapsed, 1),
+        "latency_ms": latency_summary([latency for _, latency in results]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookings", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--max-group", type=int, default=6)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--seats-in-row", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        report(
+            run(
+                args.bookings,
+                args.workers,
+                args.max_group,
+                args.rows,
+                args.seats_in_row,
+                args.seed,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
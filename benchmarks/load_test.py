@@ -0,0 +1,485 @@
+"""End-to-end load test of a running server on a generated dataset.
+
+Virtual users log in and run weighted scenarios (browse flights, view a
+seat map, book an order, view their profile and orders, obtain and
+refresh a token) from their own threads over HTTP for a fixed time. The
+report holds per endpoint p50/p95/p99 latency, throughput, response
+statuses and the number of SQL queries of one request, measured by an
+in-process calibration pass that is rolled back afterwards.
+
+Users, flights and airports are read from the database the server uses,
+so fill it with generate_dataset first and raise the throttle rates:
+
+    python manage.py generate_dataset
+    THROTTLE_RATE_ANON=1000000/hour THROTTLE_RATE_USER=1000000/hour \\
+        python manage.py runserver --noreload
+    python -m benchmarks.load_test run --concurrency 16 --duration 60 \\
+        --output baseline.json
+
+Later runs are checked against a stored report, the exit status is 1 when
+an endpoint got slower or runs more queries than the threshold allows:
+
+    python -m benchmarks.load_test run --baseline baseline.json
+    python -m benchmarks.load_test compare baseline.json current.json
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from benchmarks.utils import latency_summary, report, setup_django
+
+SCENARIO_WEIGHTS = {
+    "browse_flights": 40,
+    "seat_map": 20,
+    "book_order": 10,
+    "me": 15,
+    "my_orders": 5,
+    "tokens": 10,
+}
+LATENCY_METRICS = ("p50", "p95", "p99")
+DEFAULT_THRESHOLD_PERCENT = 20
+SAMPLE_FLIGHTS = 1000
+
+
+class HttpTransport:
+    """Requests to a running server, every call on its own connection"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def __call__(self, method, path, body=None, headers=None):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=None if body is None else json.dumps(body).encode(),
+            headers={"Content-Type": "application/json", **(headers or {})},
+            method=method,
+        )
+        try:
+            with urllib.request.urlopen(
+                request, timeout=self.timeout
+            ) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
+        except (urllib.error.URLError, OSError):
+            return 0, b""
+
+
+class InProcessTransport:
+    """Requests through the Django test client, counting SQL queries of
+    the last one"""
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client(SERVER_NAME="localhost")
+        self.queries = 0
+
+    def __call__(self, method, path, body=None, headers=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        extra = {
+            f"HTTP_{name.upper().replace('-', '_')}": value
+            for name, value in (headers or {}).items()
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.generic(
+                method,
+                path,
+                data=json.dumps(body) if body is not None else "",
+                content_type="application/json",
+                **extra,
+            )
+            content = b"".join(response) if response.streaming else (
+                response.content
+            )
+        self.queries = len(queries)
+        return response.status_code, content
+
+
+class VirtualUser:
+    """A logged in passenger running scenarios one after another"""
+
+    def __init__(self, transport, email, password, sample, rng, record):
+        self.transport = transport
+        self.email = email
+        self.password = password
+        self.sample = sample
+        self.rng = rng
+        self.record = record
+        self.access = self.refresh = None
+
+    def request(self, endpoint, method, path, body=None, auth=True):
+        headers = {}
+        if auth and self.access:
+            headers["Authorization"] = f"Bearer {self.access}"
+        started = time.perf_counter()
+        status, content = self.transport(method, path, body, headers)
+        self.record(endpoint, status, time.perf_counter() - started)
+        return status, content
+
+    def login(self):
+        status, content = self.request(
+            "token-obtain",
+            "POST",
+            "/api/v1/user/token/",
+            {"email": self.email, "password": self.password},
+            auth=False,
+        )
+        if status == 200:
+            tokens = json.loads(content)
+            self.access, self.refresh = tokens["access"], tokens["refresh"]
+        return status == 200
+
+    def browse_flights(self):
+        day = self.sample["start"] + timedelta(
+            days=self.rng.randrange(self.sample["days"])
+        )
+        self.request(
+            "flights-list",
+            "GET",
+            f"/api/v1/airport/flights/?source="
+            f"{self.rng.choice(self.sample['airports'])}"
+            f"&date={day:%Y-%m-%d}",
+        )
+
+    def seat_map(self):
+        self.request(
+            "flights-seats",
+            "GET",
+            f"/api/v1/airport/flights/"
+            f"{self.rng.choice(self.sample['flights'])}/seats/",
+        )
+
+    def book_order(self):
+        self.request(
+            "orders-create",
+            "POST",
+            "/api/v1/airport/orders/",
+            {
+                "flight": self.rng.choice(self.sample["flights"]),
+                "passengers": self.rng.choice((1, 1, 1, 2, 2, 3)),
+            },
+        )
+
+    def me(self):
+        self.request("me", "GET", "/api/v1/user/me/")
+
+    def my_orders(self):
+        self.request("me-orders", "GET", "/api/v1/user/me/orders/")
+
+    def tokens(self):
+        self.login()
+        self.request(
+            "token-refresh",
+            "POST",
+            "/api/v1/user/token/refresh/",
+            {"refresh": self.refresh},
+            auth=False,
+        )
+
+
+def load_sample(users):
+    """Emails of generated users and flights, airports and days to look
+    up, read from the database the server uses"""
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from airport.models import Flight, Route
+
+    now = timezone.now()
+    emails = list(
+        get_user_model()
+        .objects.filter(email__startswith="passenger")
+        .order_by("id")
+        .values_list("email", flat=True)[:users]
+    )
+    flights = list(
+        Flight.objects.filter(departure_time__gte=now)
+        .order_by("id")
+        .values_list("id", flat=True)[:SAMPLE_FLIGHTS]
+    )
+    if not emails or not flights:
+        raise SystemExit(
+            "No generated users or upcoming flights, "
+            "run manage.py generate_dataset first"
+        )
+    last = Flight.objects.order_by("-departure_time").first().departure_time
+    return {
+        "emails": emails,
+        "flights": flights,
+        "airports": sorted(
+            set(
+                Route.objects.values_list(
+                    "source__iata_code", flat=True
+                )[:200]
+            )
+        ),
+        "start": now,
+        "days": max((last - now).days, 1),
+    }
+
+
+def calibrate(sample, password):
+    """SQL queries of one request per endpoint, measured in process inside
+    a transaction that is rolled back"""
+    from django.db import transaction
+
+    transport = InProcessTransport()
+    queries = {}
+    with transaction.atomic():
+        user = VirtualUser(
+            transport,
+            sample["emails"][0],
+            password,
+            sample,
+            random.Random(0),
+            lambda endpoint, status, seconds: queries.__setitem__(
+                endpoint, transport.queries
+            ),
+        )
+        user.login()
+        for scenario in SCENARIO_WEIGHTS:
+            getattr(user, scenario)()
+        transaction.set_rollback(True)
+    return queries
+
+
+def run(
+    base_url,
+    concurrency,
+    duration,
+    users,
+    weights,
+    password,
+    seed,
+):
+    from airport.datasets import DATASET_PASSWORD
+
+    password = password or DATASET_PASSWORD
+    sample = load_sample(users)
+    queries = calibrate(sample, password)
+
+    samples = defaultdict(list)
+    statuses = defaultdict(Counter)
+    lock = threading.Lock()
+
+    def record(endpoint, status, seconds):
+        with lock:
+            statuses[endpoint][status] += 1
+            if 200 <= status < 300:
+                samples[endpoint].append(seconds)
+
+    scenarios, scenario_weights = zip(
+        *((name, weight) for name, weight in weights.items() if weight)
+    )
+    deadline = time.monotonic() + duration
+
+    def virtual_user(number):
+        rng = random.Random(seed + number)
+        user = VirtualUser(
+            HttpTransport(base_url),
+            sample["emails"][number % len(sample["emails"])],
+            password,
+            sample,
+            rng,
+            record,
+        )
+        if not user.login():
+            return
+        while time.monotonic() < deadline:
+            getattr(user, rng.choices(scenarios, scenario_weights)[0])()
+
+    threads = [
+        threading.Thread(target=virtual_user, args=(number,))
+        for number in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for endpoint in sorted(statuses):
+        total = sum(statuses[endpoint].values())
+        endpoints[endpoint] = {
+            "requests": total,
+            "errors": total - len(samples[endpoint]),
+            "statuses": {
+                str(status): count
+                for status, count in sorted(statuses[endpoint].items())
+            },
+            "throughput_rps": round(total / elapsed, 2),
+            "latency_ms": latency_summary(samples[endpoint]),
+            "queries": queries.get(endpoint),
+        }
+
+    requests = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "config": {
+            "base_url": base_url,
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "weights": weights,
+            "seed": seed,
+        },
+        "total": {
+            "requests": requests,
+            "errors": sum(
+                endpoint["errors"] for endpoint in endpoints.values()
+            ),
+            "throughput_rps": round(requests / elapsed, 2),
+            "latency_ms": latency_summary(
+                [seconds for values in samples.values() for seconds in values]
+            ),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Endpoints of current slower than baseline by more than threshold
+    percent at any reported percentile, running more queries or serving
+    fewer requests per second"""
+    regressions = []
+    limit = 1 + threshold / 100
+
+    def check(endpoint, metric, old, new, worse):
+        if old is None or new is None:
+            return
+        if worse(old, new):
+            regressions.append(
+                {
+                    "endpoint": endpoint,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                }
+            )
+
+    pairs = [("total", baseline["total"], current["total"])] + [
+        (name, baseline["endpoints"][name], current["endpoints"][name])
+        for name in sorted(current["endpoints"])
+        if name in baseline["endpoints"]
+    ]
+    for name, old, new in pairs:
+        for metric in LATENCY_METRICS:
+            check(
+                name,
+                f"latency_ms.{metric}",
+                old["latency_ms"].get(metric),
+                new["latency_ms"].get(metric),
+                lambda old_value, new_value: new_value > old_value * limit,
+            )
+        check(
+            name,
+            "throughput_rps",
+            old["throughput_rps"],
+            new["throughput_rps"],
+            lambda old_value, new_value: new_value * limit < old_value,
+        )
+        check(
+            name,
+            "queries",
+            old.get("queries"),
+            new.get("queries"),
+            lambda old_value, new_value: new_value > old_value,
+        )
+    return regressions
+
+
+def parse_weights(value):
+    weights = dict(SCENARIO_WEIGHTS)
+    for item in filter(None, value.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in weights:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name}")
+        weights[name] = int(weight)
+    return weights
+
+
+def load_report(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Load the server")
+    run_parser.add_argument("--url", default="http://127.0.0.1:8000")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument(
+        "--duration", type=float, default=60, help="Seconds"
+    )
+    run_parser.add_argument(
+        "--users", type=int, default=1000, help="Distinct accounts to use"
+    )
+    run_parser.add_argument(
+        "--weights",
+        type=parse_weights,
+        default=dict(SCENARIO_WEIGHTS),
+        help="Scenario weights, ex. book_order=0,tokens=5",
+    )
+    run_parser.add_argument(
+        "--password", help="Password of the users, generated by default"
+    )
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="Save the report as JSON")
+    run_parser.add_argument("--baseline", help="Report to compare against")
+    run_parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD_PERCENT
+    )
+
+    compare_parser = commands.add_parser(
+        "compare", help="Compare two stored reports"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD_PERCENT
+    )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        setup_django()
+        results = run(
+            args.url,
+            args.concurrency,
+            args.duration,
+            args.users,
+            args.weights,
+            args.password,
+            args.seed,
+        )
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=2)
+        baseline = args.baseline and load_report(args.baseline)
+    else:
+        results = load_report(args.current)
+        baseline = load_report(args.baseline)
+
+    if baseline:
+        results["regressions"] = compare(baseline, results, args.threshold)
+    report(results)
+    if baseline and results["regressions"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
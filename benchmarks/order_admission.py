@@ -0,0 +1,217 @@
+"""Lock waits of a burst of orders on one flight, with and without
+admission control.
+
+Every client is a separate process, like a server worker, that places one
+order and retries while it gets 429. A sampler polls pg_stat_activity for
+backends waiting on row locks (orders piling up on the flight row) and on
+the advisory locks of the booking queue, so the report shows how many
+backends wait and for how long.
+
+    python -m benchmarks.order_admission --clients 64 --concurrency 4
+"""
+import argparse
+import logging
+import multiprocessing
+import threading
+import time
+
+from benchmarks.utils import (
+    benchmark_database,
+    latency_summary,
+    report,
+    setup_django,
+)
+
+LOCK_WAITS_SQL = """
+    SELECT wait_event = 'advisory',
+           extract(epoch FROM clock_timestamp() - query_start)
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND wait_event_type = 'Lock'
+"""
+
+
+class LockWaitSampler(threading.Thread):
+    """Samples backends waiting on locks until stopped"""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        from django.db import connections
+
+        try:
+            with connections["default"].cursor() as cursor:
+                while not self.stopped.is_set():
+                    cursor.execute(LOCK_WAITS_SQL)
+                    self.samples.append(cursor.fetchall())
+                    time.sleep(self.interval)
+        finally:
+            connections.close_all()
+
+    def summary(self, advisory):
+        waiters = [
+            [float(wait) for is_advisory, wait in sample
+             if is_advisory == advisory]
+            for sample in self.samples
+        ]
+        waits = [wait for sample in waiters for wait in sample]
+        counts = [len(sample) for sample in waiters]
+        return {
+            "max_waiting_backends": max(counts, default=0),
+            "avg_waiting_backends": (
+                round(sum(counts) / len(counts), 2) if counts else 0
+            ),
+            "max_lock_wait_ms": round(max(waits, default=0) * 1000, 2),
+        }
+
+
+def place_order(user, flight, number, retry_backoff, barrier, results):
+    from django.db import connections
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user)
+    row, seat = divmod(number, flight.airplane.seats_in_row)
+    payload = {
+        "tickets": [{"row": row + 1, "seat": seat + 1, "flight": flight.id}]
+    }
+    barrier.wait()
+    started = time.perf_counter()
+    attempts = 0
+    try:
+        while True:
+            attempts += 1
+            response = client.post(
+                reverse("airport:order-list"), payload, format="json"
+            )
+            if response.status_code != 429:
+                break
+            time.sleep(retry_backoff)
+    finally:
+        connections.close_all()
+    results.put(
+        (response.status_code, attempts, time.perf_counter() - started)
+    )
+
+
+def run_burst(flight, users, retry_backoff, sample_interval):
+    from django.db import connections
+
+    # forked clients must open their own connections
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(len(users) + 1)
+    results = context.Queue()
+    clients = [
+        context.Process(
+            target=place_order,
+            args=(user, flight, number, retry_backoff, barrier, results),
+        )
+        for number, user in enumerate(users)
+    ]
+    for client in clients:
+        client.start()
+
+    sampler = LockWaitSampler(sample_interval)
+    sampler.start()
+    barrier.wait()
+    started = time.perf_counter()
+    results = [results.get() for _ in clients]
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        client.join()
+    sampler.stopped.set()
+    sampler.join()
+
+    return {
+        "booking_concurrency": flight.booking_concurrency,
+        "succeeded": sum(1 for code, *_ in results if code == 201),
+        "failed": sum(1 for code, *_ in results if code != 201),
+        "attempts": sum(attempts for _, attempts, _ in results),
+        "elapsed_s": round(elapsed, 3),
+        "latency_ms": latency_summary([latency for *_, latency in results]),
+        "row_lock_waits": sampler.summary(advisory=False),
+        "queue_lock_waits": sampler.summary(advisory=True),
+    }
+
+
+def run(clients, concurrency, retry_backoff, sample_interval):
+    from django.contrib.auth import get_user_model
+
+    from airport.models import (
+        Airplane,
+        AirplaneType,
+        Airport,
+        Flight,
+        Route,
+    )
+
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(email=f"bench{number}@bench.com")
+        for number in range(clients)
+    )
+    airports = [
+        Airport.objects.create(
+            name=name, city=name, country=name, icao_code=code, iata_code=code
+        )
+        for name, code in (("Source", "SRC"), ("Destination", "DST"))
+    ]
+    route = Route.objects.create(
+        source=airports[0], destination=airports[1], distance=1000
+    )
+    airplane_type = AirplaneType.objects.create(name="Bench")
+
+    results = []
+    for day, booking_concurrency in enumerate((None, concurrency), start=1):
+        flight = Flight.objects.create(
+            route=route,
+            airplane=Airplane.objects.create(
+                name=f"Bench {day}",
+                rows=clients // 6 + 1,
+                seats_in_row=6,
+                airplane_type=airplane_type,
+            ),
+            departure_time=f"2024-05-0{day}T10:00:00",
+            arrival_time=f"2024-05-0{day}T12:00:00",
+            booking_concurrency=booking_concurrency,
+        )
+        results.append(
+            run_burst(flight, users, retry_backoff, sample_interval)
+        )
+
+    return {"clients": clients, "runs": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=0.1,
+        help="Seconds a queued client waits before retrying",
+    )
+    parser.add_argument("--sample-interval", type=float, default=0.005)
+    args = parser.parse_args()
+
+    setup_django()
+    # every queued attempt would be logged as a 429 warning
+    logging.getLogger("django.request").setLevel(logging.ERROR)
+    with benchmark_database():
+        report(
+            run(
+                args.clients,
+                args.concurrency,
+                args.retry_backoff,
+                args.sample_interval,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
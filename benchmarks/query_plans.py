@@ -0,0 +1,412 @@
+"""Query plans of the API endpoints on a generated dataset.
+
+Every case requests a list, retrieve or filter endpoint in-process,
+explains the SELECT statements it ran with EXPLAIN (FORMAT JSON) and
+checks the expectations declared for it: indexes the plans must use,
+tables they must not scan sequentially (airport_ticket never) and a bound
+on the estimated cost of the most expensive statement.
+
+The plan of every case is stored in benchmarks/plans/ for review. A run
+fails when a case misses an expectation or its plans changed shape since
+the stored snapshot; rewrite the snapshots with --update once the new
+plans are reviewed:
+
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --update
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.utils import benchmark_database, report, setup_django
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent / "plans"
+START = datetime(2025, 1, 1)
+AIRPORT_API = "/api/v1/airport"
+# tables no plan may read sequentially
+NO_SEQ_SCAN = ("airport_ticket",)
+
+PLAN_CASES = (
+    {
+        "name": "crew_list",
+        "url": "/crew/",
+        "max_cost": 100,
+    },
+    {
+        "name": "airport_list",
+        "url": "/airports/",
+        "max_cost": 50,
+    },
+    {
+        "name": "airplane_type_list",
+        "url": "/airplane_types/",
+        "max_cost": 10,
+    },
+    {
+        "name": "airplane_list",
+        "url": "/airplanes/",
+        "max_cost": 3000,
+    },
+    {
+        "name": "airplane_list_by_name",
+        "url": "/airplanes/?name=Boeing",
+        "max_cost": 1000,
+    },
+    {
+        "name": "airplane_list_by_types",
+        "url": "/airplanes/?airplane_types={airplane_type}",
+        "max_cost": 1500,
+    },
+    {
+        "name": "airplane_list_capacity_gte",
+        "url": "/airplanes/?capacity_gte=350",
+        "indexes": ("airplane_capacity_idx",),
+        "no_seq_scan": ("airport_airplane",),
+        "max_cost": 1000,
+    },
+    {
+        "name": "airplane_list_capacity_lte",
+        "url": "/airplanes/?capacity_lte=80",
+        "indexes": ("airplane_capacity_idx",),
+        "no_seq_scan": ("airport_airplane",),
+        "max_cost": 1000,
+    },
+    {
+        "name": "airplane_detail",
+        "url": "/airplanes/{airplane}/",
+        "indexes": ("airport_airplane_pkey",),
+        "max_cost": 20,
+    },
+    {
+        "name": "route_list",
+        "url": "/routes/",
+        "max_cost": 300,
+    },
+    {
+        "name": "route_detail",
+        "url": "/routes/{route}/",
+        "indexes": ("airport_route_pkey",),
+        "no_seq_scan": ("airport_flight",),
+        "max_cost": 1500,
+    },
+    {
+        "name": "flight_list",
+        "url": "/flights/",
+        "indexes": ("flight_departure_time_id_idx",),
+        "max_cost": 2500,
+    },
+    {
+        "name": "flight_list_cursor",
+        "url": "/flights/?pagination=cursor",
+        "indexes": ("flight_departure_time_id_idx",),
+        "no_seq_scan": ("airport_flight",),
+        "max_cost": 250,
+    },
+    {
+        "name": "flight_list_by_date",
+        "url": "/flights/?date={date}",
+        "indexes": ("flight_departure_time_id_idx",),
+        "no_seq_scan": ("airport_flight",),
+        "max_cost": 1500,
+    },
+    {
+        "name": "flight_list_by_departure",
+        "url": (
+            "/flights/?departure_after={date}T06:00"
+            "&departure_before={date}T12:00"
+        ),
+        "indexes": ("flight_departure_time_id_idx",),
+        "no_seq_scan": ("airport_flight",),
+        "max_cost": 1500,
+    },
+    {
+        "name": "flight_list_by_airports",
+        "url": "/flights/?source={source}&destination={destination}",
+        "indexes": ("route_source_destination_idx",),
+        "no_seq_scan": ("airport_flight",),
+        "max_cost": 250,
+    },
+    {
+        "name": "flight_list_by_route_and_date",
+        "url": "/flights/?routes={route}&date={date}",
+        "indexes": ("flight_route_departure_idx",),
+        "no_seq_scan": ("airport_flight",),
+        "max_cost": 500,
+    },
+    {
+        "name": "flight_list_by_airplane",
+        "url": "/flights/?airplanes={airplane}",
+        "no_seq_scan": ("airport_flight",),
+        "max_cost": 200,
+    },
+    {
+        "name": "flight_list_min_seats",
+        "url": "/flights/?date={date}&min_seats=50",
+        "no_seq_scan": ("airport_flight",),
+        "max_cost": 3000,
+    },
+    {
+        "name": "flight_detail",
+        "url": "/flights/{flight}/",
+        "indexes": ("airport_flight_pkey",),
+        "max_cost": 100,
+    },
+    {
+        "name": "flight_seats",
+        "url": "/flights/{flight}/seats/",
+        "indexes": ("airport_flight_pkey",),
+        "max_cost": 50,
+    },
+    {
+        "name": "flight_schedule_list",
+        "url": "/flight_schedules/",
+        "max_cost": 100,
+    },
+    {
+        "name": "seat_hold_list",
+        "url": "/seat_holds/",
+        "max_cost": 20,
+    },
+    {
+        "name": "order_list",
+        "url": "/orders/",
+        "indexes": ("order_user_created_at_id_idx",),
+        "no_seq_scan": ("airport_order",),
+        "max_cost": 8000,
+    },
+    {
+        "name": "order_list_expanded",
+        "url": "/orders/?expand=flight&pagination=cursor",
+        "indexes": ("order_user_created_at_id_idx",),
+        "no_seq_scan": ("airport_order", "airport_flight"),
+        "max_cost": 600,
+    },
+)
+
+
+def sample_values(user):
+    """Ids and codes the case URLs are formatted with"""
+    from airport.models import Flight
+
+    flight = (
+        Flight.objects.select_related(
+            "route__source", "route__destination", "airplane"
+        )
+        .filter(tickets__order__user=user)
+        .order_by("id")
+        .first()
+    )
+    return {
+        "flight": flight.id,
+        "route": flight.route_id,
+        "airplane": flight.airplane_id,
+        "airplane_type": flight.airplane.airplane_type_id,
+        # a day of a production timetable holds a small share of its
+        # flights, like the last day of the generated one; its first days
+        # hold most of them
+        "date": Flight.objects.latest("departure_time")
+        .departure_time.date()
+        .isoformat(),
+        "source": flight.route.source.iata_code,
+        "destination": flight.route.destination.icao_code,
+    }
+
+
+def sample_user():
+    """Staff user with the most orders, so the order lists are the
+    largest ones"""
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+
+    user = (
+        get_user_model()
+        .objects.annotate(order_count=Count("orders"))
+        .order_by("-order_count", "id")
+        .first()
+    )
+    user.is_staff = True
+    user.save(update_fields=["is_staff"])
+    return user
+
+
+def plan_shape(node):
+    """Node types, relations and indexes of a plan tree without its
+    estimates, the part of a plan compared to snapshots"""
+    shape = {"node": node["Node Type"]}
+    for key, name in (
+        ("Relation Name", "relation"),
+        ("Index Name", "index"),
+        ("Join Type", "join"),
+    ):
+        if key in node:
+            shape[name] = node[key]
+    if node.get("Plans"):
+        shape["children"] = [plan_shape(child) for child in node["Plans"]]
+    return shape
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from plan_nodes(child)
+
+
+def explain_request(client, url):
+    """Status of the request and the plans of the SELECTs it ran"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+
+    plans = []
+    with connection.cursor() as cursor:
+        for query in queries:
+            if not query["sql"].lstrip().upper().startswith("SELECT"):
+                continue
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {query['sql']}")
+            plans.append(
+                {"sql": query["sql"], "plan": cursor.fetchone()[0][0]["Plan"]}
+            )
+    return response.status_code, plans
+
+
+def check_case(case, status_code, plans):
+    """Expectations the plans of the case miss"""
+    failures = []
+    if status_code != 200:
+        failures.append(f"responded with {status_code}")
+
+    nodes = [node for plan in plans for node in plan_nodes(plan["plan"])]
+    used_indexes = {
+        node["Index Name"] for node in nodes if "Index Name" in node
+    }
+    for index in case.get("indexes", ()):
+        if index not in used_indexes:
+            failures.append(f"does not use {index}")
+
+    scanned = {
+        node["Relation Name"]
+        for node in nodes
+        if node["Node Type"] == "Seq Scan"
+    }
+    for table in NO_SEQ_SCAN + case.get("no_seq_scan", ()):
+        if table in scanned:
+            failures.append(f"reads {table} sequentially")
+
+    cost = max((plan["plan"]["Total Cost"] for plan in plans), default=0)
+    if cost > case["max_cost"]:
+        failures.append(f"estimated cost {cost} is over {case['max_cost']}")
+    return failures
+
+
+def snapshot(case, url, plans):
+    return {
+        "case": case["name"],
+        "url": url,
+        "statements": [
+            {
+                "sql": plan["sql"],
+                # ANALYZE samples rows at random, the estimates vary a
+                # little between runs
+                "total_cost": round(plan["plan"]["Total Cost"]),
+                "plan": plan_shape(plan["plan"]),
+            }
+            for plan in plans
+        ],
+    }
+
+
+def shapes(stored):
+    return [statement["plan"] for statement in stored["statements"]]
+
+
+def run(args):
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    from airport.datasets import DatasetGenerator
+
+    DatasetGenerator(
+        airports=args.airports,
+        routes=args.routes,
+        airplanes=args.airplanes,
+        crew=args.crew,
+        users=args.users,
+        flights=args.flights,
+        tickets=args.tickets,
+        seed=args.seed,
+        start=START,
+    ).run()
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    user = sample_user()
+    values = sample_values(user)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    failures = {}
+    changed = []
+    SNAPSHOT_DIR.mkdir(exist_ok=True)
+    for case in PLAN_CASES:
+        url = AIRPORT_API + case["url"].format(**values)
+        status_code, plans = explain_request(client, url)
+        missed = check_case(case, status_code, plans)
+        if missed:
+            failures[case["name"]] = missed
+
+        current = snapshot(case, url, plans)
+        path = SNAPSHOT_DIR / f"{case['name']}.json"
+        if path.exists():
+            stored = json.loads(path.read_text())
+            if shapes(stored) != shapes(current):
+                changed.append(case["name"])
+        if args.update or not path.exists():
+            path.write_text(json.dumps(current, indent=2) + "\n")
+
+    return {
+        "cases": len(PLAN_CASES),
+        "failures": failures,
+        "changed_plans": changed,
+        "snapshots_updated": args.update,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    for name, default in (
+        ("airports", 300),
+        ("routes", 3000),
+        ("airplanes", 20000),
+        ("crew", 2000),
+        ("users", 20000),
+        ("flights", 50000),
+        ("tickets", 1000000),
+    ):
+        parser.add_argument(f"--{name}", type=int, default=default)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Rewrite the stored plans with the plans of this run",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        results = run(args)
+    report(results)
+    if results["failures"] or (
+        results["changed_plans"] and not args.update
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Bulk route import through the staging table merge.
+
+Airports are imported first, then a generated CSV of routes referencing
+them by IATA code is imported twice: the first run inserts every route,
+the second one changes the distance of a part of them.
+
+    python -m benchmarks.reference_import --routes 1000000
+"""
+import argparse
+import csv
+import io
+import time
+
+from benchmarks.utils import benchmark_database, report, setup_django
+
+AIRPORTS = 2000
+
+
+def airport_code(number):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return (
+        letters[number // 676 % 26]
+        + letters[number // 26 % 26]
+        + letters[number % 26]
+    )
+
+
+def airports_csv():
+    lines = io.StringIO()
+    writer = csv.writer(lines)
+    writer.writerow(["name", "city", "country", "icao_code", "iata_code"])
+    for number in range(AIRPORTS):
+        code = airport_code(number)
+        writer.writerow(
+            [f"Airport {code}", "City", "Country", f"X{code}", code]
+        )
+    return lines.getvalue().splitlines(keepends=True)
+
+
+def routes_csv(routes, changed_every=0):
+    """Routes between distinct airport pairs; every changed_every-th route
+    gets another distance"""
+    yield "source,destination,distance\n"
+    for number in range(routes):
+        source = number % AIRPORTS
+        destination = (source + 1 + number // AIRPORTS) % AIRPORTS
+        distance = 100 + number % 5000
+        if changed_every and number % changed_every == 0:
+            distance += 1
+        yield (
+            f"{airport_code(source)},{airport_code(destination)},"
+            f"{distance}\n"
+        )
+
+
+def timed(kind, lines):
+    from airport.imports import import_reference_data
+
+    started = time.perf_counter()
+    summary = import_reference_data(kind, lines, "csv")
+    elapsed = time.perf_counter() - started
+    summary.pop("errors")
+    return {
+        **summary,
+        "elapsed_s": round(elapsed, 2),
+        "rows_per_s": round(summary["rows"] / elapsed),
+    }
+
+
+def run(routes, changed_percent):
+    if routes > AIRPORTS * (AIRPORTS - 1):
+        raise SystemExit(f"At most {AIRPORTS * (AIRPORTS - 1)} routes")
+    return {
+        "airports": timed("airports", airports_csv()),
+        "routes_insert": timed("routes", routes_csv(routes)),
+        "routes_update": timed(
+            "routes", routes_csv(routes, 100 // max(changed_percent, 1))
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--routes", type=int, default=1000000)
+    parser.add_argument("--changed-percent", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        report(run(args.routes, args.changed_percent))
+
+
+if __name__ == "__main__":
+    main()
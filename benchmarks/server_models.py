@@ -0,0 +1,150 @@
+"""Throughput and latency of the API under every gunicorn worker model.
+
+A dataset is generated in a throw-away database. Then runserver and
+gunicorn with sync, gthread and uvicorn workers (gunicorn.conf.py) serve
+it in turn. Each one runs the load test scenarios of benchmarks.load_test
+for --duration seconds.
+
+    python -m benchmarks.server_models --concurrency 32 --duration 30
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.load_test import SCENARIO_WEIGHTS, run as load_test
+from benchmarks.utils import BASE_DIR, benchmark_database, report, setup_django
+
+SERVER_MODELS = ("runserver", "sync", "gthread", "uvicorn")
+READY_PATH = "/api/v1/airport/flights/"
+READY_TIMEOUT = 60
+
+
+def server_command(model, port):
+    if model == "runserver":
+        return [
+            sys.executable,
+            "manage.py",
+            "runserver",
+            "--noreload",
+            f"127.0.0.1:{port}",
+        ]
+    return [sys.executable, "-m", "gunicorn"]
+
+
+def wait_until_ready(base_url, process):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with {process.returncode}")
+        try:
+            urllib.request.urlopen(base_url + READY_PATH, timeout=1)
+            return
+        except urllib.error.HTTPError:
+            # 401 of the unauthenticated request, the server is up
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"Server did not start in {READY_TIMEOUT} seconds")
+
+
+def run_model(model, args, database):
+    from django.test import override_settings
+
+    env = {
+        **os.environ,
+        "POSTGRES_DB": database,
+        "PORT": str(args.port),
+        "WEB_WORKER_CLASS": model,
+        "THROTTLE_RATE_ANON": "1000000/hour",
+        "THROTTLE_RATE_USER": "1000000/hour",
+    }
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+    process = subprocess.Popen(
+        server_command(model, args.port),
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url, process)
+        # the test environment only allows testserver, the load test
+        # measures queries of every endpoint on localhost first
+        with override_settings(ALLOWED_HOSTS=["localhost"]):
+            result = load_test(
+                base_url,
+                args.concurrency,
+                args.duration,
+                args.users,
+                SCENARIO_WEIGHTS,
+                None,
+                args.seed,
+            )
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+    return result["total"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="WEB_CONCURRENCY of gunicorn, 2 * CPU count + 1 by default",
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--models",
+        default=",".join(SERVER_MODELS),
+        help="Comma separated server models to run",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        from django.db import connection
+
+        from airport.datasets import DatasetGenerator
+
+        DatasetGenerator(
+            airports=50,
+            routes=500,
+            airplanes=50,
+            crew=200,
+            users=args.users,
+            flights=2000,
+            tickets=50000,
+            seed=args.seed,
+        ).run()
+        # the servers connect to the database themselves
+        database = connection.settings_dict["NAME"]
+        connection.close()
+        results = {
+            model: run_model(model, args, database)
+            for model in args.models.split(",")
+        }
+    report(
+        {
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers or os.cpu_count() * 2 + 1,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            **results,
+        }
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Full and incremental timetable exports over a large flights table.
+
+Flights are generated in Postgres with generate_series, then every export
+format is streamed through the staff endpoint and fully consumed. Reports
+time to first byte, total time, compressed size and how much the peak
+resident memory of the process grew while streaming.
+
+    python -m benchmarks.timetable_export --flights 5000000
+"""
+import argparse
+import resource
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.utils import benchmark_database, report, setup_django
+
+START = datetime(2024, 1, 1)
+AIRPLANES = 5000
+ROUTES = 2000
+
+
+def generate(flights):
+    from django.db import connection
+
+    from airport.models import (
+        Airplane,
+        AirplaneType,
+        Airport,
+        Flight,
+        Route,
+    )
+
+    airports = Airport.objects.bulk_create(
+        Airport(
+            name=f"Airport {number}",
+            city="City",
+            country="Country",
+            iata_code=f"{number:03d}"[-3:],
+            icao_code=f"A{number:03d}",
+        )
+        for number in range(200)
+    )
+    routes = Route.objects.bulk_create(
+        Route(
+            source=airports[number % 200],
+            destination=airports[(number * 7 + 1) % 200],
+            distance=500 + number,
+        )
+        for number in range(ROUTES)
+    )
+    airplane_type = AirplaneType.objects.create(name="Bench")
+    airplanes = Airplane.objects.bulk_create(
+        Airplane(
+            name=f"Bench {number}",
+            rows=30,
+            seats_in_row=6,
+            airplane_type=airplane_type,
+        )
+        for number in range(AIRPLANES)
+    )
+
+    # every airplane flies a 2 hour leg every 3 hours, so the
+    # no-overlap constraint holds
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {Flight._meta.db_table} (
+                route_id, airplane_id, departure_time, arrival_time,
+                seats_sold, seats_held, updated_at
+            )
+            SELECT %s + number %% %s,
+                   %s + number %% %s,
+                   %s + (number / %s) * interval '3 hours',
+                   %s + (number / %s) * interval '3 hours'
+                      + interval '2 hours',
+                   0, 0, %s
+            FROM generate_series(0, %s - 1) AS number
+            """,
+            [
+                routes[0].id, ROUTES,
+                airplanes[0].id, AIRPLANES,
+                START, AIRPLANES,
+                START, AIRPLANES,
+                START,
+                flights,
+            ],
+        )
+        cursor.execute(f"ANALYZE {Flight._meta.db_table}")
+
+    last_departure = START + timedelta(hours=3 * (flights // AIRPLANES + 1))
+    return START, last_departure
+
+
+def stream(client, params):
+    from django.urls import reverse
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    response = client.get(reverse("airport:flight-timetable"), params)
+    first_byte = None
+    size = 0
+    for chunk in response.streaming_content:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        "first_byte_ms": round(first_byte * 1000, 2),
+        "elapsed_s": round(elapsed, 2),
+        "gzip_mb": round(size / 2 ** 20, 2),
+        "peak_rss_growth_mb": round((rss_after - rss_before) / 1024, 2),
+    }
+
+
+def run(flights, outputs, changed_percent):
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+
+    from airport.models import Flight
+
+    started = time.perf_counter()
+    date_from, date_to = generate(flights)
+    generated = time.perf_counter() - started
+
+    client = APIClient()
+    client.force_authenticate(
+        get_user_model().objects.create_user(
+            "bench@bench.com", "bench", is_staff=True
+        )
+    )
+    params = {"date_from": date_from, "date_to": date_to}
+
+    results = {}
+    for output in outputs:
+        result = stream(client, {**params, "output": output})
+        result["rows_per_s"] = round(flights / result["elapsed_s"])
+        results[output] = result
+
+    changed_since = datetime.now()
+    changed = Flight.objects.filter(
+        id__in=Flight.objects.order_by("?").values("id")[
+            : flights * changed_percent // 100
+        ]
+    ).update(updated_at=changed_since + timedelta(seconds=1))
+    incremental = stream(
+        client, {**params, "output": "csv", "changed_since": changed_since}
+    )
+    incremental["changed_flights"] = changed
+
+    return {
+        "flights": flights,
+        "generate_s": round(generated, 2),
+        "full": results,
+        "incremental": incremental,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--flights", type=int, default=5000000)
+    parser.add_argument(
+        "--outputs", default="csv,jsonl,columns", help="Comma separated"
+    )
+    parser.add_argument("--changed-percent", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        report(
+            run(
+                args.flights,
+                args.outputs.split(","),
+                args.changed_percent,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
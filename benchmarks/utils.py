@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Configure Django for a standalone benchmark script"""
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "airport_system.settings")
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """Run the benchmark in a throw-away database built from migrations,
+    the same way the test runner does"""
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = round(percent / 100 * len(ordered)) - 1
+    rank = max(0, min(len(ordered) - 1, rank))
+    return ordered[rank]
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/max of latencies in milliseconds"""
+    if not seconds:
+        return {}
+    return {
+        name: round(percentile(seconds, percent) * 1000, 2)
+        for name, percent in (
+            ("p50", 50), ("p95", 95), ("p99", 99), ("max", 100)
+        )
+    }
+
+
+def report(results):
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -0,0 +1,83 @@
+"""Gunicorn configuration of the production server, read by gunicorn from
+the working directory and set up with environment variables:
+
+- WEB_WORKER_CLASS: sync, gthread (default) or uvicorn, which serves
+  airport_system/asgi.py instead of airport_system/wsgi.py
+- WEB_CONCURRENCY: worker processes, 2 * CPU count + 1 by default
+- WEB_THREADS: threads of every gthread worker (4)
+- WEB_PRELOAD: load Django in the master process before the workers are
+  forked, so they share its memory and start faster (True)
+- WEB_MAX_REQUESTS and WEB_MAX_REQUESTS_JITTER: a worker is replaced
+  after serving that many requests plus up to the jitter (1000, 100)
+- WEB_TIMEOUT: seconds a worker may spend on a request before it is
+  killed (30)
+- WEB_GRACEFUL_TIMEOUT: seconds workers get to finish their requests on
+  restart or shutdown (30)
+- PORT: port to listen on (8000)
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# worker class and application served by every WEB_WORKER_CLASS
+WORKER_MODELS = {
+    "sync": ("sync", "airport_system.wsgi:application"),
+    "gthread": ("gthread", "airport_system.wsgi:application"),
+    "uvicorn": (
+        "uvicorn.workers.UvicornWorker",
+        "airport_system.asgi:application",
+    ),
+}
+
+worker_model = os.environ.get("WEB_WORKER_CLASS", "gthread")
+if worker_model not in WORKER_MODELS:
+    raise RuntimeError(
+        f"WEB_WORKER_CLASS must be one of: {', '.join(WORKER_MODELS)}"
+    )
+worker_class, wsgi_app = WORKER_MODELS[worker_model]
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+)
+threads = (
+    int(os.environ.get("WEB_THREADS", 4)) if worker_model == "gthread" else 1
+)
+preload_app = os.environ.get("WEB_PRELOAD", "True") == "True"
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("WEB_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.environ.get("WEB_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Workers write metrics to files of this directory and /metrics merges
+# them. It is set before Django is loaded, prometheus_client reads it on
+# import. A directory created here is deleted on shutdown.
+METRICS_DIR_CREATED = not os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if METRICS_DIR_CREATED:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+        prefix="prometheus-"
+    )
+
+
+def on_starting(server):
+    """Drop metrics of workers of a previous run"""
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+
+
+def child_exit(server, worker):
+    """Stop reporting gauges of the worker once it is gone"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    if METRICS_DIR_CREATED:
+        shutil.rmtree(
+            os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True
+        )
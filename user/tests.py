@@ -1,3 +1,90 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from airport.models import Order, Ticket
+from airport.tests.test_seat_counters import sample_flight
+
+ME_URL = reverse("user:manage")
+ME_ORDERS_URL = reverse("user:manage-orders")
+
+
+class ManageUserApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def create_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(user=self.user)
+            row, seat = divmod(Order.objects.count() - 1, 4)
+            Ticket.objects.create(
+                row=row + 1,
+                seat=seat + 1,
+                flight=self.flight,
+                order=order,
+            )
+
+    def test_me_returns_profile_only(self):
+        self.create_orders(3)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], "test@test.com")
+        self.assertNotIn("orders", res.data)
+
+    def test_me_orders_cursor_pagination(self):
+        self.create_orders(12)
+
+        res = self.client.get(ME_ORDERS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", res.data)
+        ids = [order["id"] for order in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        ids += [order["id"] for order in res.data["results"]]
+
+        expected = Order.objects.order_by("created_at", "id").values_list(
+            "id", flat=True
+        )
+        self.assertEqual(ids, list(expected))
+
+    def test_me_orders_date_filters(self):
+        self.create_orders(2)
+        Order.objects.filter(pk=Order.objects.first().pk).update(
+            created_at="2024-01-15T10:00:00"
+        )
+
+        res = self.client.get(ME_ORDERS_URL, {"created_before": "2024-02-01"})
+        self.assertEqual(len(res.data["results"]), 1)
+
+        res = self.client.get(ME_ORDERS_URL, {"created_after": "2024-02-01"})
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_me_orders_invalid_date_rejected(self):
+        for params in (
+            {"created_after": "last week"},
+            {"created_before": "2024-13-45"},
+        ):
+            res = self.client.get(ME_ORDERS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+    def test_me_orders_only_own(self):
+        Order.objects.create(
+            user=get_user_model().objects.create_user("other@test.com", "pass")
+        )
+
+        res = self.client.get(ME_ORDERS_URL)
+
+        self.assertEqual(res.data["results"], [])
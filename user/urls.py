@@ -5,7 +5,7 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 
-from user.views import CreateUserView, ManageUserView
+from user.views import CreateUserView, ManageUserView, UserOrderListView
 
 
 urlpatterns = [
@@ -18,6 +18,7 @@ urlpatterns = [
         ManageUserView.as_view(actions={"get": "retrieve", "put": "update"}),
         name="manage"
     ),
+    path("me/orders/", UserOrderListView.as_view(), name="manage-orders"),
     path(
         "me/upload-avatar/",
         ManageUserView.as_view(actions={"post": "upload_avatar"}),
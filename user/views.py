@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import generics, mixins, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -6,6 +8,13 @@ from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from airport.models import Order
+from airport.pagination import OrderCursorPagination
+from airport.params import param_to_datetime
+from airport.serializers import (
+    OrderListSerializer,
+    OrderExpandedListSerializer,
+)
 from user.serializers import UserSerializer, UserImageSerializer
 
 
@@ -21,6 +30,7 @@ class ManageUserView(
     queryset = get_user_model().objects.all()
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated,)
+    query_budgets = {"retrieve": 1}
 
     def get_object(self):
         return self.request.user
@@ -44,3 +54,62 @@ class ManageUserView(
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UserOrderListView(generics.ListAPIView):
+    queryset = Order.objects.with_tickets()
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    pagination_class = OrderCursorPagination
+    query_budgets = {"get": 3}
+
+    def get_queryset(self):
+        """Retrieve the user orders with filters"""
+        created_after = self.request.query_params.get("created_after")
+        created_before = self.request.query_params.get("created_before")
+
+        queryset = self.queryset.filter(user=self.request.user)
+
+        if created_after:
+            queryset = queryset.filter(
+                created_at__gte=param_to_datetime(
+                    "created_after", created_after
+                )
+            )
+
+        if created_before:
+            queryset = queryset.filter(
+                created_at__lt=param_to_datetime(
+                    "created_before", created_before
+                )
+            )
+
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.query_params.get("expand") == "flight":
+            return OrderExpandedListSerializer
+        return OrderListSerializer
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "created_after",
+                type=OpenApiTypes.DATETIME,
+                description="Orders created at or after (ex. 2024-05-01)",
+            ),
+            OpenApiParameter(
+                "created_before",
+                type=OpenApiTypes.DATETIME,
+                description="Orders created before (ex. 2024-06-01)",
+            ),
+            OpenApiParameter(
+                "expand",
+                type=OpenApiTypes.STR,
+                enum=["flight"],
+                description="Embed flight summary into tickets",
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)